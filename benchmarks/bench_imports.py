@@ -0,0 +1,70 @@
+"""
+Benchmark of the time it takes to import the package's entry points.
+
+Each module is imported in a fresh interpreter under `-X importtime`; the
+cumulative time of the module itself and of the slowest modules it imports
+directly is reported, so a new eager import of an SDK shows up here first.
+
+Usage (with the package installed, e.g. `pip install -e .`):
+    python benchmarks/bench_imports.py --modules cozmo_companion.cli --top 8
+"""
+
+import argparse
+import subprocess
+import sys
+
+DEFAULT_MODULES = "cozmo_companion.cli,cozmo_companion.server,cozmo_companion.assistant"
+
+
+def import_times(module):
+    """
+    Import `module` in a fresh interpreter.
+
+    Returns:
+        tuple: Its cumulative import time in microseconds, and a dict of the
+        cumulative times of the modules it imported directly.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    lines = result.stderr.splitlines()
+    if result.returncode:
+        errors = [line for line in lines if not line.startswith("import time:")]
+        raise RuntimeError(errors[-1] if errors else f"Cannot import {module}")
+    children = {}
+    for line in lines:
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        # A module is reported after everything it imported
+        if name.strip() == module and depth == 0:
+            return int(cumulative), children
+        if depth == 0:
+            children = {}
+        elif depth == 1:
+            children[name.strip()] = int(cumulative)
+    raise RuntimeError(f"{module} was already imported")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--modules", default=DEFAULT_MODULES)
+    parser.add_argument("--top", type=int, default=5)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    for module in args.modules.split(","):
+        total, times = import_times(module)
+        print(f"{module:<28} {total / 1000:>8.0f} ms")
+        slowest = sorted(times.items(), key=lambda item: item[1], reverse=True)
+        for name, cumulative in slowest[: args.top]:
+            print(f"  {name:<26} {cumulative / 1000:>8.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
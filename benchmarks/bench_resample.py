@@ -0,0 +1,102 @@
+"""
+Benchmark of resampling recordings before they are uploaded for recognition.
+
+For a typical utterance it reports, per upload rate and encoding, the bytes
+sent, the time to resample and encode them and the time the upload takes
+over a given uplink, next to the 44.1 kHz WAV the recorder produces. It
+also compares the polyphase resampler with a per-sample Python loop.
+
+Usage (with the package installed, e.g. `pip install -e .`):
+    python benchmarks/bench_resample.py --seconds 3 --uplink-kbps 2000
+"""
+
+import argparse
+import io
+import timeit
+import wave
+
+import numpy as np
+
+from cozmo_companion.recorder import Recorder
+from cozmo_companion.resample import CONTENT_TYPES, convert_wav, resample
+from cozmo_companion.simulation import speech_like_wav
+
+REPEATS = 20
+
+
+def python_resample(samples, from_rate, to_rate):
+    """Linear interpolation one output sample at a time, as a naive baseline."""
+    step = from_rate / to_rate
+    output = []
+    for index in range(int(len(samples) / step)):
+        position = index * step
+        left = int(position)
+        right = min(left + 1, len(samples) - 1)
+        fraction = position - left
+        output.append(samples[left] * (1 - fraction) + samples[right] * fraction)
+    return output
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--uplink-kbps", type=float, default=2000)
+    parser.add_argument("--rates", default="16000,8000")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    wav = speech_like_wav(args.seconds, Recorder.RATE, Recorder.CHANNELS)
+    uplink = args.uplink_kbps * 125
+
+    print(
+        f"{args.seconds:.1f} s utterance recorded at {Recorder.RATE} Hz, "
+        f"{args.uplink_kbps:.0f} kbit/s uplink\n"
+    )
+    print(
+        f"{'upload':<18} {'bytes':>9} {'ratio':>6} {'convert ms':>11} {'upload ms':>10}"
+    )
+    baseline = len(wav)
+    print(
+        f"{'44100 Hz wav':<18} {baseline:>9} {1.0:>6.2f} {0.0:>11.2f} "
+        f"{baseline / uplink * 1000:>10.0f}"
+    )
+    for rate in [int(rate) for rate in args.rates.split(",")]:
+        for audio_format in CONTENT_TYPES:
+            upload, content_type = convert_wav(wav, rate, audio_format)
+            if content_type != CONTENT_TYPES[audio_format]:
+                # The encoder is not installed; the WAV row already covers it
+                continue
+            seconds = (
+                timeit.timeit(
+                    lambda: convert_wav(wav, rate, audio_format), number=REPEATS
+                )
+                / REPEATS
+            )
+            print(
+                f"{f'{rate} Hz {audio_format}':<18} {len(upload):>9} "
+                f"{len(upload) / baseline:>6.2f} {seconds * 1000:>11.2f} "
+                f"{len(upload) / uplink * 1000:>10.0f}"
+            )
+
+    with wave.open(io.BytesIO(wav), "rb") as wf:
+        samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    polyphase = (
+        timeit.timeit(lambda: resample(samples, Recorder.RATE, 16000), number=REPEATS)
+        / REPEATS
+    )
+    python = (
+        timeit.timeit(
+            lambda: python_resample(samples.tolist(), Recorder.RATE, 16000), number=3
+        )
+        / 3
+    )
+    print(
+        f"\nResampling to 16 kHz: polyphase {polyphase * 1000:.2f} ms, "
+        f"per-sample Python {python * 1000:.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,554 @@
+"""
+End-to-end benchmark of a conversation session with simulated backends.
+
+Drives `VoiceAssistant.start_session` from scripted WAV input through the
+real capture engine, recorder, VAD, turn scheduler, speaker pipeline and
+audio cache, with local stand-ins for Watson STT/TTS, the chat model, the
+sentiment classifier and the LLM exit check. Each stand-in draws its delays
+from a seeded distribution, so runs are repeatable and comparable across
+commits. No microphone, speakers, network or credentials are needed.
+
+Per turn it reports the response latency (end of the user's speech to the
+first reply audio), time to first audio, the whole turn, CPU time and
+resident memory, plus the per-stage breakdown from the tracer.
+
+Usage (with the package installed, e.g. `pip install -e .`):
+    python benchmarks/bench_session.py --sessions 3 --output results.json
+    python benchmarks/bench_session.py --llm lognormal:1.2:0.4 --streaming
+    python benchmarks/bench_session.py --compare baseline.json
+    python benchmarks/bench_session.py --stt-backend local --streaming-stt
+    python benchmarks/bench_session.py --local-tts --tts lognormal:1.5:1.0
+    python benchmarks/bench_session.py --error-rate 0.1 --stall-rate 0.05
+
+A script is a JSON list of {"transcript": ..., "wav": ...} turns; "wav" is
+optional and a speech-like WAV is generated when it is missing. The last
+turn should be an exit phrase such as "goodbye" so the session ends.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import deque
+
+# The assistant reads its model name at startup; nothing is sent anywhere
+os.environ.setdefault("MARVIN_OPENAI_API_KEY", "simulated")
+os.environ.setdefault("MARVIN_CHAT_COMPLETIONS_MODEL", "simulated")
+
+from cozmo_companion import assistant as assistant_module  # noqa: E402
+from cozmo_companion.assistant import Sentiment, VoiceAssistant  # noqa: E402
+from cozmo_companion.capture import FileCaptureDevice  # noqa: E402
+from cozmo_companion.intent import ExitIntentDetector  # noqa: E402
+from cozmo_companion.recorder import Recorder  # noqa: E402
+from cozmo_companion.resilience import RemoteService  # noqa: E402
+from cozmo_companion.services import ServiceLayer  # noqa: E402
+from cozmo_companion.stt import LocalSpeechToText  # noqa: E402
+from cozmo_companion.tts import LocalTextToSpeech  # noqa: E402
+from cozmo_companion.simulation import (  # noqa: E402
+    FaultModel,
+    LatencyModel,
+    SimulatedChatbot,
+    SimulatedPlayer,
+    SimulatedRecognitionEngine,
+    SimulatedSpeechToText,
+    SimulatedSynthesisEngine,
+    SimulatedTextToSpeech,
+    speech_like_wav,
+)
+from cozmo_companion.tracing import tracer  # noqa: E402
+
+DEFAULT_SCRIPT = [
+    "hi there, i had a really long day at work",
+    "my manager moved the deadline up by a whole week",
+    "can you tell me something to cheer me up",
+    "that actually helps, thank you for listening",
+    "goodbye",
+]
+DEFAULT_REPLIES = [
+    "I'm sorry to hear that. Long days can be exhausting. "
+    "Do you want to tell me what made it so hard?",
+    "That sounds really stressful. It's completely understandable to feel "
+    "overwhelmed when plans change suddenly.",
+    "Of course! Did you know that otters hold hands while they sleep so they "
+    "don't drift apart? I hope that brings a smile to your face.",
+    "I'm always happy to listen. I'm so glad you are feeling a bit better!",
+]
+# Seconds of scripted speech per word in generated input
+SECONDS_PER_WORD = 0.3
+# Metrics summarized per run and compared against a baseline
+METRICS = ("response_ms", "time_to_first_audio_ms", "turn_ms", "cpu_ms", "rss_mb")
+# Slowdowns smaller than this are scheduler noise, whatever their relative size
+MIN_REGRESSION_MS = 5.0
+
+
+class SimulatedAssistant(VoiceAssistant):
+    """
+    VoiceAssistant wired to simulated backends.
+
+    With a script it hears the scripted WAVs through a fake microphone;
+    without one (as in served sessions) it listens to its capture device.
+    """
+
+    def __init__(self, script, backends, capture_speed=1.0, **kwargs):
+        self.script = deque(script) if script is not None else None
+        self.backends = backends
+        self.capture_speed = capture_speed
+        kwargs.setdefault("play_audio", backends["player"])
+        super().__init__(**kwargs)
+        self.chatbot = backends["chatbot"]
+        # Evicted turns are summarized locally rather than by the LLM
+        self.history.summarize = None
+        self.exit_detector = ExitIntentDetector(
+            assistant_module.bounded_exit_check(self._llm_check_exit),
+            extra_phrases=assistant_module.EXIT_PHRASES,
+        )
+
+    def _configure_services(self):
+        # Only the HTTP session is created; no Watson or OpenAI client is set up
+        self.services = ServiceLayer()
+        self.SPEECH_TO_TEXT = self.backends["speech_to_text"]
+        self.TEXT_TO_SPEECH = self.backends["text_to_speech"]
+
+    def _create_speech_recognizer(self):
+        engine = self.backends["speech_to_text"]
+        if isinstance(engine, SimulatedRecognitionEngine):
+            return LocalSpeechToText(engine)
+        return super()._create_speech_recognizer()
+
+    def _create_local_voice(self):
+        engine = self.backends.get("local_voice")
+        return LocalTextToSpeech(engine) if engine is not None else None
+
+    def _create_capture_device(self):
+        return FileCaptureDevice(
+            Recorder.RATE,
+            Recorder.CHANNELS,
+            Recorder.CHUNK_SIZE,
+            speed=self.capture_speed,
+        )
+
+    async def _listen(self):
+        if self.script is None:
+            return await super()._listen()
+        if not self.script:
+            # Ends the session even if the script's exit phrase was misheard
+            return "goodbye"
+        # The user only starts talking once they are prompted
+        turn = self.script.popleft()
+        self.backends["speech_to_text"].queue_transcript(turn["transcript"])
+        self.capture.device.queue_file(turn["wav"])
+        return await super()._listen()
+
+    @tracer.traced("exit_check")
+    def _check_exit(self, user_input):
+        return self.exit_detector(user_input)
+
+    def _llm_check_exit(self, user_input):
+        self.backends["faults"]["exit_check"].inject()
+        self.backends["exit_check"].sleep()
+        return False
+
+    def _classify_sentiment(self, user_input):
+        self.backends["faults"]["sentiment"].inject()
+        self.backends["sentiment"].sleep()
+        return Sentiment.NEUTRAL
+
+    def _stream_reply_tokens(self, user_input):
+        return self.chatbot.stream(user_input, **self._run_kwargs())
+
+
+class TurnCollector:
+    """Tracer exporter that turns each finished turn into a row of metrics."""
+
+    def __init__(self):
+        self.rows = []
+        self._spans = {}
+        self._cpu = time.process_time()
+
+    def export(self, span):
+        if span.turn is not None and span.turn is not span:
+            self._spans.setdefault(span.turn.span_id, []).append(span)
+
+    def export_turn(self, span, breakdown):
+        spans = self._spans.pop(span.span_id, [])
+        cpu = time.process_time()
+        row = {
+            "turn_ms": span.duration * 1000,
+            "response_ms": _response_ms(spans),
+            "time_to_first_audio_ms": breakdown.get("time_to_first_audio", 0) * 1000,
+            "cpu_ms": (cpu - self._cpu) * 1000,
+            "rss_mb": _rss_mb(),
+            "stages_ms": {
+                name: seconds * 1000
+                for name, seconds in breakdown.items()
+                if name != "time_to_first_audio"
+            },
+        }
+        self._cpu = cpu
+        self.rows.append(row)
+
+    def flush(self):
+        pass
+
+
+def _response_ms(spans):
+    """Milliseconds from the end of the recording to the first playback after it."""
+    recorded = [span.end for span in spans if span.name == "record"]
+    if not recorded:
+        return None
+    end_of_speech = max(recorded)
+    playback = [
+        span.start
+        for span in spans
+        if span.name == "playback" and span.start >= end_of_speech
+    ]
+    return (min(playback) - end_of_speech) / 1e6 if playback else None
+
+
+def _rss_mb():
+    """Current resident set size in MiB, or the peak where it cannot be read."""
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Reported in bytes on macOS and in KiB elsewhere
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def load_script(path, directory):
+    """Load a script, generating speech-like WAVs for turns without one."""
+    if path:
+        with open(path) as f:
+            turns = json.load(f)
+        base = os.path.dirname(os.path.abspath(path))
+    else:
+        turns = [{"transcript": transcript} for transcript in DEFAULT_SCRIPT]
+        base = directory
+    for index, turn in enumerate(turns):
+        if turn.get("wav"):
+            turn["wav"] = os.path.join(base, turn["wav"])
+            continue
+        seconds = max(1.0, len(turn["transcript"].split()) * SECONDS_PER_WORD)
+        turn["wav"] = os.path.join(directory, f"turn_{index}.wav")
+        with open(turn["wav"], "wb") as f:
+            f.write(
+                speech_like_wav(seconds, Recorder.RATE, Recorder.CHANNELS, seed=index)
+            )
+    return turns
+
+
+def create_backends(args, seed):
+    """Create the simulated backends, each with its own seeded latency model."""
+
+    def latency(spec, offset):
+        return LatencyModel.parse(spec, seed=seed * 100 + offset)
+
+    # Every service fails independently, at the same rates
+    faults = {
+        name: FaultModel(
+            args.error_rate,
+            args.stall_rate,
+            args.stall_seconds,
+            seed=seed * 100 + 50 + offset,
+        )
+        for offset, name in enumerate(
+            ("recognize", "synthesize", "reply", "sentiment", "exit_check")
+        )
+    }
+
+    if args.stt_backend == "local":
+        speech_to_text = SimulatedRecognitionEngine(
+            seconds_per_audio_second=args.local_stt_per_second
+        )
+    else:
+        speech_to_text = SimulatedSpeechToText(
+            latency(args.stt, 1),
+            seconds_per_audio_second=args.stt_per_second,
+            upload_bytes_per_second=args.uplink_kbps * 125 or None,
+            faults=faults["recognize"],
+        )
+    return {
+        "speech_to_text": speech_to_text,
+        "text_to_speech": SimulatedTextToSpeech(
+            latency(args.tts, 2), faults=faults["synthesize"]
+        ),
+        "local_voice": SimulatedSynthesisEngine() if args.local_tts else None,
+        "chatbot": SimulatedChatbot(
+            DEFAULT_REPLIES,
+            latency(args.llm, 3),
+            first_token_latency=latency(args.first_token, 4),
+            token_latency=latency(args.token, 5),
+            faults=faults["reply"],
+        ),
+        "sentiment": latency(args.sentiment, 6),
+        "exit_check": latency(args.exit_check, 7),
+        "faults": faults,
+        "player": SimulatedPlayer(speed=args.playback_speed),
+    }
+
+
+def run_session(args, script, seed):
+    """Run one scripted session and return the metrics of each turn."""
+    collector = TurnCollector()
+    assistant = SimulatedAssistant(
+        [dict(turn) for turn in script], create_backends(args, seed), args.speed
+    )
+    tracer.configure(enabled=True, exporter=collector)
+    started = time.perf_counter()
+    # The recorder and speaker report progress with print
+    quiet = (
+        contextlib.nullcontext()
+        if args.verbose
+        else contextlib.redirect_stdout(io.StringIO())
+    )
+    with quiet:
+        asyncio.run(assistant.start_session())
+    tracer.configure(enabled=False)
+    print(
+        f"Session {seed}: {len(collector.rows)} turns in "
+        f"{time.perf_counter() - started:.1f} s"
+    )
+    return collector.rows
+
+
+def summarize(rows):
+    """Return mean, p50, p95 and max of every metric over the turns."""
+    summary = {}
+    for metric in METRICS:
+        values = sorted(row[metric] for row in rows if row[metric] is not None)
+        if not values:
+            continue
+        summary[metric] = {
+            "n": len(values),
+            "mean": statistics.fmean(values),
+            "p50": _percentile(values, 50),
+            "p95": _percentile(values, 95),
+            "max": values[-1],
+        }
+    stages = {}
+    for row in rows:
+        for name, milliseconds in row["stages_ms"].items():
+            stages.setdefault(name, []).append(milliseconds)
+    for name, values in stages.items():
+        values.sort()
+        summary[f"stage:{name}"] = {
+            "n": len(values),
+            "mean": statistics.fmean(values),
+            "p50": _percentile(values, 50),
+            "p95": _percentile(values, 95),
+            "max": values[-1],
+        }
+    return summary
+
+
+def _percentile(values, percentile):
+    """Nearest-rank percentile of sorted values."""
+    index = min(len(values) - 1, round(percentile / 100 * (len(values) - 1)))
+    return values[index]
+
+
+def print_summary(summary):
+    print(f"\n{'metric':<28} {'n':>4} {'mean':>9} {'p50':>9} {'p95':>9} {'max':>9}")
+    for metric, stats in summary.items():
+        print(
+            f"{metric:<28} {stats['n']:>4} {stats['mean']:>9.1f} "
+            f"{stats['p50']:>9.1f} {stats['p95']:>9.1f} {stats['max']:>9.1f}"
+        )
+
+
+def compare(summary, baseline, threshold):
+    """
+    Print the change of every p50 and p95 against a baseline run.
+
+    Returns:
+        list[str]: The metrics that got slower by more than the threshold.
+    """
+    regressions = []
+    print(f"\nAgainst {baseline.get('commit') or 'baseline'}:")
+    for metric, stats in summary.items():
+        old = baseline["summary"].get(metric)
+        if old is None:
+            continue
+        for key in ("p50", "p95"):
+            if not old[key]:
+                continue
+            change = stats[key] / old[key] - 1
+            flag = ""
+            # Memory is reported for information only; it is dominated by imports
+            slower = stats[key] - old[key] > MIN_REGRESSION_MS
+            if change > threshold and slower and metric != "rss_mb":
+                flag = "  REGRESSION"
+                regressions.append(f"{metric} {key}")
+            print(
+                f"{metric + ' ' + key:<32} {old[key]:>9.1f} -> {stats[key]:>9.1f}"
+                f" ({change:+.1%}){flag}"
+            )
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def add_latency_arguments(parser):
+    """Add the simulated backends' latency options, as "distribution:mean[:jitter]" in seconds."""
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--playback-speed", type=float, default=4.0)
+    parser.add_argument(
+        "--stt-backend",
+        choices=("watson", "local"),
+        default="watson",
+        help="recognize with the simulated Watson service or an on-device engine",
+    )
+    parser.add_argument("--stt", default="lognormal:0.45:0.15")
+    parser.add_argument("--stt-per-second", type=float, default=0.05)
+    parser.add_argument(
+        "--uplink-kbps",
+        type=float,
+        default=2000,
+        help="upload bandwidth to the recognizer in kbit/s; 0 for instant uploads",
+    )
+    parser.add_argument(
+        "--local-stt-per-second",
+        type=float,
+        default=0.15,
+        help="on-device decoding time per second of speech, with --stt-backend local",
+    )
+    parser.add_argument("--tts", default="lognormal:0.3:0.1")
+    parser.add_argument(
+        "--local-tts",
+        action="store_true",
+        help="route short phrases and slow Watson calls to an on-device voice",
+    )
+    parser.add_argument("--llm", default="lognormal:1.2:0.4")
+    parser.add_argument("--first-token", default="lognormal:0.5:0.15")
+    parser.add_argument("--token", default="normal:0.02:0.005")
+    parser.add_argument("--sentiment", default="lognormal:0.6:0.2")
+    parser.add_argument("--exit-check", default="lognormal:0.6:0.2")
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        help="fraction of remote calls that fail with a transient error",
+    )
+    parser.add_argument(
+        "--stall-rate",
+        type=float,
+        default=0.0,
+        help="fraction of remote calls that hang for --stall-seconds",
+    )
+    parser.add_argument("--stall-seconds", type=float, default=10.0)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--script", help="JSON script of turns; a default is used")
+    parser.add_argument("--sessions", type=int, default=3)
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="capture speed relative to real time; higher also shortens the silence "
+        "that ends each recording",
+    )
+    parser.add_argument("--streaming", action="store_true", help="stream replies")
+    parser.add_argument(
+        "--no-resilience",
+        action="store_true",
+        help="call the remote services without deadlines, retries or hedging",
+    )
+    parser.add_argument(
+        "--streaming-stt",
+        action="store_true",
+        help="recognize while the user speaks; needs --stt-backend local",
+    )
+    parser.add_argument(
+        "--stt-rate",
+        type=int,
+        default=assistant_module.STT_SAMPLE_RATE,
+        help="rate recordings are resampled to before upload; 0 uploads 44.1 kHz",
+    )
+    add_latency_arguments(parser)
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--compare", help="JSON results of a baseline run")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="relative slowdown reported as a regression",
+    )
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    if args.streaming_stt and args.stt_backend != "local":
+        parser.error("--streaming-stt needs --stt-backend local")
+    return args
+
+
+def main():
+    args = parse_args()
+    # Offline runs must not warm up real services or reuse a stale disk cache
+    assistant_module.WARM_UP = False
+    assistant_module.AUDIO_CACHE_DIR = ""
+    # Every run starts a fresh conversation
+    assistant_module.SESSION_DB = ""
+    assistant_module.STREAMING_REPLIES = args.streaming
+    assistant_module.STT_SAMPLE_RATE = args.stt_rate
+    assistant_module.STREAMING_STT = args.streaming_stt
+    if args.no_resilience:
+        for name in assistant_module.remote_services:
+            assistant_module.remote_services[name] = RemoteService(name)
+
+    previous_directory = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        script = load_script(args.script, directory)
+        # Recordings and logs are written relative to the working directory
+        os.chdir(directory)
+        try:
+            rows = []
+            for session in range(args.sessions):
+                rows.extend(run_session(args, script, args.seed + session))
+        finally:
+            os.chdir(previous_directory)
+
+    summary = summarize(rows)
+    print_summary(summary)
+    results = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "options": vars(args),
+        "turns": rows,
+        "summary": summary,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(summary, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
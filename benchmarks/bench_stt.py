@@ -0,0 +1,189 @@
+"""
+Latency and accuracy comparison of the speech recognition backends.
+
+Every WAV in a directory is transcribed by each backend and compared with
+the reference transcript next to it (`hello.wav` and `hello.txt`). Per
+backend it reports the model load time, the word error rate over all
+files, the recognition latency and its real-time factor (latency divided by
+the length of the speech). With `--streaming` the recordings are fed in
+chunks at the pace they were spoken, as from the microphone, and the
+latency is measured from the end of speech to the final transcript.
+
+The Watson backend reads its credentials like the assistant does (`.env`
+or the environment); the on-device backends need `vosk` or
+`faster-whisper` and a model.
+
+Usage (with the package installed, e.g. `pip install -e .`):
+    python benchmarks/bench_stt.py --wavs recordings/ --backends watson,vosk \\
+        --vosk-model models/vosk-model-small-en-us-0.15
+    python benchmarks/bench_stt.py --wavs recordings/ --backends whisper \\
+        --whisper-model tiny.en --streaming --speed 4
+"""
+
+import argparse
+import glob
+import io
+import os
+import statistics
+import time
+import wave
+
+from cozmo_companion.stt import (
+    LocalSpeechToText,
+    VoskEngine,
+    WatsonSpeechToText,
+    WhisperEngine,
+    word_error_rate,
+)
+
+# Frames per chunk fed to streaming recognizers, as the recorder captures them
+CHUNK_FRAMES = 1024
+
+
+def load_recordings(directory):
+    """Return (name, wav bytes, reference transcript, seconds) for every pair found."""
+    recordings = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.wav"))):
+        reference_path = os.path.splitext(path)[0] + ".txt"
+        if not os.path.exists(reference_path):
+            print(f"Skipping {path}: no reference transcript")
+            continue
+        with open(path, "rb") as f:
+            wav = f.read()
+        with open(reference_path) as f:
+            reference = f.read().strip()
+        with wave.open(io.BytesIO(wav), "rb") as wf:
+            seconds = wf.getnframes() / wf.getframerate()
+        recordings.append((os.path.basename(path), wav, reference, seconds))
+    return recordings
+
+
+def create_backend(name, args):
+    """Create a backend by name from the command-line options."""
+    if name == "watson":
+        from decouple import config
+
+        from cozmo_companion.services import ServiceLayer
+
+        service = ServiceLayer().watson_service(
+            config("IAM_APIKEY_STT"), config("URL_STT")
+        )
+        return WatsonSpeechToText(service, sample_rate=args.watson_rate or None)
+    if name == "vosk":
+        return LocalSpeechToText(VoskEngine(args.vosk_model))
+    if name == "whisper":
+        return LocalSpeechToText(WhisperEngine(args.whisper_model))
+    raise ValueError(f"Unknown backend: {name}")
+
+
+def transcribe_streaming(backend, wav, speed):
+    """
+    Feed a recording chunk by chunk at `speed` times real time.
+
+    Returns:
+        tuple: The transcript and the seconds from the last chunk to the transcript.
+    """
+    with wave.open(io.BytesIO(wav), "rb") as wf:
+        rate, channels, width = wf.getframerate(), wf.getnchannels(), wf.getsampwidth()
+        pcm = wf.readframes(wf.getnframes())
+    recognizer = backend.create_streaming_recognizer(rate, channels)
+    recognizer.start()
+    chunk_bytes = CHUNK_FRAMES * channels * width
+    started = time.perf_counter()
+    for offset in range(0, len(pcm), chunk_bytes):
+        recognizer.feed(pcm[offset : offset + chunk_bytes])
+        # Chunks arrive no faster than they would from the microphone
+        due = started + (offset + chunk_bytes) / (rate * channels * width) / speed
+        time.sleep(max(0.0, due - time.perf_counter()))
+    transcript = recognizer.finish(timeout=30)
+    return transcript, recognizer.finalize_latency
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_backend(name, recordings, args):
+    """Transcribe every recording with one backend and return its summary row."""
+    backend = create_backend(name, args)
+    started = time.perf_counter()
+    if isinstance(backend, LocalSpeechToText):
+        backend.load()
+    load_seconds = time.perf_counter() - started
+
+    errors = words = 0
+    latencies, factors = [], []
+    for file_name, wav, reference, seconds in recordings:
+        if args.streaming:
+            transcript, latency = transcribe_streaming(backend, wav, args.speed)
+        else:
+            started = time.perf_counter()
+            transcript = backend.transcribe(wav)
+            latency = time.perf_counter() - started
+        reference_words = len(reference.split())
+        errors += word_error_rate(reference, transcript) * reference_words
+        words += reference_words
+        latencies.append(latency)
+        factors.append(latency / seconds if seconds else 0.0)
+        if args.verbose:
+            print(
+                f"  {name:<8} {file_name:<24} {latency * 1000:>7.0f} ms  {transcript!r}"
+            )
+    backend.close()
+    return {
+        "backend": name,
+        "load_s": load_seconds,
+        "wer": errors / words if words else 0.0,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "rtf": statistics.mean(factors),
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--wavs", required=True, help="directory of WAVs and .txt references"
+    )
+    parser.add_argument("--backends", default="watson,vosk,whisper")
+    parser.add_argument("--vosk-model", help="directory of an unpacked Vosk model")
+    parser.add_argument("--whisper-model", default="base.en")
+    parser.add_argument(
+        "--watson-rate",
+        type=int,
+        default=16000,
+        help="rate recordings are resampled to before upload; 0 keeps their rate",
+    )
+    parser.add_argument("--streaming", action="store_true")
+    parser.add_argument(
+        "--speed", type=float, default=1.0, help="streaming pace relative to real time"
+    )
+    parser.add_argument("--verbose", action="store_true")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    recordings = load_recordings(args.wavs)
+    if not recordings:
+        raise SystemExit(f"No WAVs with reference transcripts in {args.wavs}")
+    audio_seconds = sum(seconds for *_, seconds in recordings)
+    mode = "streaming" if args.streaming else "whole recordings"
+    print(f"{len(recordings)} recordings, {audio_seconds:.1f} s of speech, {mode}\n")
+
+    rows = [run_backend(name, recordings, args) for name in args.backends.split(",")]
+    latency = "final after speech" if args.streaming else "latency"
+    print(
+        f"{'backend':<10} {'load s':>7} {'WER':>7} "
+        f"{f'{latency} p50 ms':>26} {'p95 ms':>8} {'RTF':>6}"
+    )
+    for row in rows:
+        print(
+            f"{row['backend']:<10} {row['load_s']:>7.2f} {row['wer']:>7.1%} "
+            f"{row['p50_ms']:>26.0f} {row['p95_ms']:>8.0f} {row['rtf']:>6.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Micro-benchmark for the per-chunk cost of voice activity detection.
+
+Compares the original pure-Python `max(array("h", chunk))` check with the
+NumPy-backed detector, per chunk and over a whole buffer at once.
+
+Usage (with the package installed, e.g. `pip install -e .`):
+    python benchmarks/bench_vad.py
+"""
+
+import timeit
+from array import array
+
+import numpy as np
+
+from cozmo_companion.vad import VoiceActivityDetector, buffer_energies, chunk_energy
+
+CHUNK_SIZE = 1024
+CHUNKS = 215  # About five seconds at 44.1 kHz
+REPEATS = 200
+
+
+def python_peak(chunk):
+    """The original per-chunk check from `Recorder._is_audio_loud`."""
+    return max(array("h", chunk)) >= 500
+
+
+def main():
+    rng = np.random.default_rng(0)
+    buffer = rng.integers(-3000, 3000, CHUNK_SIZE * CHUNKS, dtype=np.int16).tobytes()
+    chunk = buffer[: CHUNK_SIZE * 2]
+    vad = VoiceActivityDetector()
+
+    results = {
+        "python max(array)": timeit.timeit(lambda: python_peak(chunk), number=REPEATS),
+        "numpy chunk_energy": timeit.timeit(
+            lambda: chunk_energy(chunk), number=REPEATS
+        ),
+        "VoiceActivityDetector.is_speech": timeit.timeit(
+            lambda: vad.is_speech(chunk), number=REPEATS
+        ),
+        "numpy buffer_energies (per chunk)": timeit.timeit(
+            lambda: buffer_energies(buffer, CHUNK_SIZE), number=REPEATS
+        )
+        / CHUNKS,
+    }
+    for name, seconds in results.items():
+        print(f"{name:<36} {seconds / REPEATS * 1e6:8.2f} us/chunk")
+
+
+if __name__ == "__main__":
+    main()
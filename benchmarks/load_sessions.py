@@ -0,0 +1,302 @@
+"""
+Load generator for `cozmo serve`: how many concurrent sessions can one core sustain?
+
+Starts the session server in a subprocess pinned to a single CPU, with the
+simulated backends from `bench_session.py`, then connects increasing numbers
+of clients. Every client streams speech-like audio in real time, waits for
+the spoken reply and repeats for a few turns, like a person talking to a
+robot. For each concurrency level it reports the reply latency seen by the
+clients, the server's CPU use and its resident memory.
+
+A level is sustained while the p95 reply latency stays within a tolerance
+of the single-session latency and the server's core is not saturated.
+
+Usage (with the package installed, e.g. `pip install -e .`):
+    python benchmarks/load_sessions.py --levels 1,4,16,32,64 --turns 3
+"""
+
+import argparse
+import asyncio
+import contextlib
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_session import (
+    DEFAULT_REPLIES,
+    SimulatedAssistant,
+    _percentile,
+    add_latency_arguments,
+    create_backends,
+)
+from cozmo_companion import assistant as assistant_module
+from cozmo_companion.recorder import Recorder
+from cozmo_companion.server import (
+    AUDIO,
+    BUSY,
+    SPEECH,
+    STOP,
+    CompanionServer,
+    read_frame,
+    write_frame,
+)
+from cozmo_companion.simulation import (
+    SimulatedChatbot,
+    speech_like_wav,
+    wav_duration,
+)
+
+# Seconds of speech the simulated user says per turn
+UTTERANCE_SECONDS = 2.0
+# Silence the recorder waits for before it ends a recording
+ENDPOINT_SECONDS = Recorder.SILENCE_THRESHOLD * Recorder.CHUNK_SIZE / Recorder.RATE
+# The bot is done talking once nothing has played for this long
+QUIET_SECONDS = 0.5
+# Seconds a client waits for a reply before counting the turn as failed
+REPLY_TIMEOUT = 30.0
+CHUNK_SECONDS = Recorder.CHUNK_SIZE / Recorder.RATE
+
+
+class LoadClient:
+    """A simulated user talking to the server over one connection."""
+
+    def __init__(self, port, speech, turns):
+        self.port = port
+        self.speech = speech
+        self.turns = turns
+        self.response_ms = []
+        self.failed = 0
+        self.rejected = False
+        self._pending = bytearray()
+        self._speech_sent = asyncio.Event()
+        self._playing_until = 0.0
+        self._last_speech = None
+        self._speech_arrived = asyncio.Event()
+
+    async def run(self, delay):
+        await asyncio.sleep(delay)
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        receiving = asyncio.create_task(self._receive(reader))
+        sending = asyncio.create_task(self._send(writer))
+        try:
+            # The greeting plays before the session starts listening
+            if not await self._wait_for_reply(time.perf_counter()):
+                return
+            await self._wait_until_quiet()
+            for _ in range(self.turns):
+                self._speech_sent.clear()
+                self._pending += self.speech
+                await self._speech_sent.wait()
+                spoken = time.perf_counter()
+                reply = await self._wait_for_reply(spoken)
+                if reply is None:
+                    self.failed += 1
+                    return
+                self.response_ms.append((reply - spoken - ENDPOINT_SECONDS) * 1000)
+                await self._wait_until_quiet()
+        finally:
+            for task in (receiving, sending):
+                task.cancel()
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def _send(self, writer):
+        """Stream microphone audio in real time: speech when queued, silence otherwise."""
+        silence = bytes(Recorder.CHUNK_SIZE * Recorder.CHANNELS * 2)
+        next_tick = time.perf_counter()
+        while True:
+            if self._pending:
+                chunk = bytes(self._pending[: len(silence)])
+                del self._pending[: len(silence)]
+                if not self._pending:
+                    self._speech_sent.set()
+            else:
+                chunk = silence
+            await write_frame(writer, AUDIO, chunk)
+            next_tick += CHUNK_SECONDS
+            await asyncio.sleep(max(0.0, next_tick - time.perf_counter()))
+
+    async def _receive(self, reader):
+        while True:
+            kind, payload = await read_frame(reader)
+            now = time.perf_counter()
+            if kind is None:
+                return
+            if kind == BUSY:
+                self.rejected = True
+            elif kind == SPEECH:
+                self._last_speech = now
+                self._playing_until = max(self._playing_until, now) + wav_duration(
+                    payload
+                )
+                self._speech_arrived.set()
+            elif kind == STOP:
+                self._playing_until = now
+
+    async def _wait_for_reply(self, since):
+        """Return when the first speech after `since` arrived, or None on timeout."""
+        deadline = since + REPLY_TIMEOUT
+        while self._last_speech is None or self._last_speech < since:
+            self._speech_arrived.clear()
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0 or self.rejected:
+                return None
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._speech_arrived.wait(), remaining)
+        return self._last_speech
+
+    async def _wait_until_quiet(self):
+        while time.perf_counter() < self._playing_until + QUIET_SECONDS:
+            await asyncio.sleep(0.05)
+
+
+async def run_level(port, sessions, turns, seed):
+    """Run `sessions` clients at once and return them once all are done."""
+    rng = random.Random(seed)
+    speech = speech_like_wav(UTTERANCE_SECONDS, Recorder.RATE, Recorder.CHANNELS)
+    # The WAV header is dropped; the server expects raw PCM
+    pcm = speech[44:]
+    clients = [LoadClient(port, pcm, turns) for _ in range(sessions)]
+    # Staggered starts keep the clients from talking in lockstep
+    await asyncio.gather(*(client.run(rng.uniform(0, 2.0)) for client in clients))
+    return clients
+
+
+def _cpu_seconds(pid):
+    """User plus system CPU seconds used by a process, where /proc is available."""
+    try:
+        with open(f"/proc/{pid}/stat") as stat:
+            fields = stat.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/statm") as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return None
+
+
+def run_server(args):
+    """Serve simulated sessions until killed; prints the port once listening."""
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {args.cpu})
+    assistant_module.WARM_UP = False
+    assistant_module.AUDIO_CACHE_DIR = ""
+    assistant_module.SESSION_DB = ""
+    os.chdir(tempfile.mkdtemp(prefix="cozmo-serve-"))
+
+    backends = create_backends(args, args.seed)
+    # Served users say whatever they like, so every recording gets a transcript
+    backends["speech_to_text"].default_transcript = "tell me something about your day"
+    host = SimulatedAssistant(None, backends)
+
+    def create_session(device, player, user_id):
+        # Each session gets its own chatbot, like its own Marvin thread
+        chatbot = SimulatedChatbot(
+            DEFAULT_REPLIES,
+            backends["chatbot"].latency,
+            first_token_latency=backends["chatbot"].first_token_latency,
+            token_latency=backends["chatbot"].token_latency,
+        )
+        return SimulatedAssistant(
+            None,
+            dict(backends, chatbot=chatbot),
+            shared=host,
+            capture_device=device,
+            play_audio=player,
+            user_id=user_id,
+        )
+
+    server = CompanionServer(
+        create_session, max_sessions=args.max_sessions, workers=args.workers
+    )
+
+    async def serve():
+        listening = await server.start("127.0.0.1", 0)
+        print(f"PORT {listening.sockets[0].getsockname()[1]}", flush=True)
+        # The recorder and speaker report progress with print
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            async with listening:
+                await listening.serve_forever()
+
+    asyncio.run(serve())
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--levels", default="1,2,4,8,16,32,64")
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--cpu", type=int, default=0, help="core the server runs on")
+    parser.add_argument("--workers", type=int, default=64)
+    parser.add_argument("--max-sessions", type=int, default=256)
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed p95 slowdown relative to a single session",
+    )
+    parser.add_argument("--server", action="store_true", help=argparse.SUPPRESS)
+    add_latency_arguments(parser)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.server:
+        return run_server(args)
+
+    server = subprocess.Popen(
+        [sys.executable, __file__, "--server"] + sys.argv[1:],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        port = int(server.stdout.readline().split()[1])
+        print(
+            f"{'sessions':>8} {'turns':>6} {'failed':>6} {'p50 ms':>8} {'p95 ms':>8} "
+            f"{'cpu %':>6} {'rss MB':>7}"
+        )
+        baseline, sustained = None, 0
+        for level in [int(level) for level in args.levels.split(",")]:
+            cpu_before, started = _cpu_seconds(server.pid), time.perf_counter()
+            clients = asyncio.run(run_level(port, level, args.turns, args.seed))
+            elapsed = time.perf_counter() - started
+            cpu_after = _cpu_seconds(server.pid)
+            cpu = (
+                (cpu_after - cpu_before) / elapsed * 100
+                if cpu_before is not None and cpu_after is not None
+                else float("nan")
+            )
+            latencies = sorted(ms for client in clients for ms in client.response_ms)
+            failed = sum(client.failed + client.rejected for client in clients)
+            if not latencies:
+                print(f"{level:>8} {0:>6} {failed:>6}  no replies")
+                break
+            p50, p95 = statistics.median(latencies), _percentile(latencies, 95)
+            rss = _rss_mb(server.pid) or float("nan")
+            print(
+                f"{level:>8} {len(latencies):>6} {failed:>6} {p50:>8.0f} {p95:>8.0f} "
+                f"{cpu:>6.0f} {rss:>7.1f}"
+            )
+            baseline = baseline or p95
+            if failed or p95 > baseline * (1 + args.tolerance) or cpu > 90:
+                break
+            sustained = level
+        print(f"\nOne core sustained {sustained} concurrent session(s).")
+    finally:
+        server.kill()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import itertools
+import logging
+import os
+import queue
+import threading
+import time
+import wave
+from datetime import datetime
+
+from .resample import convert_wav
+
+ARCHIVE_FORMATS = ("wav", "flac")
+ARCHIVE_SUFFIXES = tuple(f".{audio_format}" for audio_format in ARCHIVE_FORMATS)
+
+# Marks the end of the writer's queue
+_CLOSE = object()
+
+
+class AudioArchiver:
+    """
+    Keeps recordings of the conversation on disk without slowing it down.
+
+    Recordings are queued and written by a background thread, optionally
+    downsampled or compressed to FLAC. After every write the oldest files
+    are deleted until the archive fits its size and age limits.
+    """
+
+    def __init__(
+        self,
+        directory,
+        audio_format="wav",
+        sample_rate=None,
+        max_bytes=None,
+        max_age=None,
+    ):
+        """
+        Initialize the archiver and start its writer thread.
+
+        Args:
+            directory (str): Where recordings are stored.
+            audio_format (str): One of `ARCHIVE_FORMATS`; FLAC needs the `soundfile`
+                package and falls back to WAV without it.
+            sample_rate (int, optional): Rate recordings are downsampled to before saving.
+            max_bytes (int, optional): Total size the archive is trimmed to.
+            max_age (float, optional): Seconds after which recordings are deleted.
+
+        Raises:
+            ValueError: If the format is unknown.
+        """
+        if audio_format not in ARCHIVE_FORMATS:
+            raise ValueError(
+                f"Unknown archive format: {audio_format}. "
+                f"Expected one of {', '.join(ARCHIVE_FORMATS)}."
+            )
+        if audio_format == "flac":
+            try:
+                # Optional dependency, only needed for compressed archives
+                import soundfile  # noqa: F401
+            except ImportError:
+                logging.error("soundfile is not installed; archiving as WAV instead")
+                audio_format = "wav"
+        self.directory = directory
+        self.audio_format = audio_format
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.written = 0
+        self.deleted = 0
+        # Disambiguates files created within the same microsecond
+        self._sequence = itertools.count()
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(
+            target=self._write_recordings, name="audio-archiver", daemon=True
+        )
+        self._writer.start()
+
+    def archive(self, prefix, wav):
+        """
+        Queue WAV bytes for the archive.
+
+        Args:
+            prefix (str): Start of the file name, e.g. "user_<session id>".
+            wav (bytes): A complete WAV file.
+
+        Returns:
+            str: Path the recording will be written to.
+        """
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        path = os.path.join(
+            self.directory,
+            f"{prefix}_{timestamp}_{next(self._sequence)}.{self.audio_format}",
+        )
+        self._queue.put((path, wav))
+        return path
+
+    def flush(self, timeout=None):
+        """Block until every queued recording is written."""
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self):
+        """Write queued recordings and stop the writer thread."""
+        if self._writer.is_alive():
+            self._queue.put(_CLOSE)
+            self._writer.join()
+
+    def _write_recordings(self):
+        os.makedirs(self.directory, exist_ok=True)
+        while True:
+            item = self._queue.get()
+            if item is _CLOSE:
+                return
+            if isinstance(item, threading.Event):
+                item.set()
+                continue
+            path, wav = item
+            try:
+                self._write(path, wav)
+                self.written += 1
+            except (OSError, wave.Error, RuntimeError) as e:
+                logging.error(f"Failed to archive {path}: {e}")
+                continue
+            self._enforce_retention()
+
+    def _write(self, path, wav):
+        audio, _ = convert_wav(wav, self.sample_rate, self.audio_format)
+        with open(path, "wb") as archived:
+            archived.write(audio)
+
+    def _enforce_retention(self):
+        """Delete the oldest recordings beyond the age and size limits."""
+        if self.max_bytes is None and self.max_age is None:
+            return
+        files = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith(ARCHIVE_SUFFIXES):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        oldest_allowed = time.time() - self.max_age if self.max_age else None
+        for modified, size, path in files:
+            too_old = oldest_allowed is not None and modified < oldest_allowed
+            too_big = self.max_bytes is not None and total > self.max_bytes
+            if not (too_old or too_big):
+                break
+            try:
+                os.remove(path)
+                self.deleted += 1
+                total -= size
+            except OSError as e:
+                logging.error(f"Failed to delete old recording {path}: {e}")
@@ -1,23 +1,54 @@
+import asyncio
+import functools
+import io
 import logging
-import os
-from datetime import datetime
+import threading
+import uuid
 from enum import Enum
 from pydantic import BaseModel
 
 import marvin
+import openai
 import webbrowser
 from decouple import config
-from ibm_cloud_sdk_core.authenticators import IAMAuthenticator
-from ibm_watson import ApiException, SpeechToTextV1, TextToSpeechV1
+from ibm_watson import ApiException
 from marvin.beta.applications import Application
-from pydub import AudioSegment
-from pydub.playback import play
+from .archive import AudioArchiver
+from .audio_cache import AudioCache
+from .capture import CaptureEngine, FileCaptureDevice, PyAudioDevice
+from .history import ConversationHistory
+from .intent import ExitIntentDetector
 from .logging_config import setup_logging
+from .pictures import PictureService
 
 from .recorder import Recorder
+from .resilience import CircuitBreaker, RemoteCallError, RemoteService, is_retryable
+from .response_cache import ResponseCache
+from .sentiment import (
+    LABEL_SCORES,
+    LexiconSentiment,
+    SentimentBatcher,
+    SentimentScore,
+    load_lexicon,
+    smooth_mood,
+)
+from .settings import STT_BACKEND
+from .services import ServiceLayer, run_coroutine
+from .vad import VoiceActivityDetector, chunk_energy
+from .speaker import PipelinedSpeaker, split_sentences
+from .store import SessionStore
+from .stt import LocalSpeechToText, WatsonSpeechToText, create_local_engine
+from .tts import (
+    LocalTextToSpeech,
+    TextToSpeechRouter,
+    WatsonTextToSpeech,
+    create_local_voice,
+)
+from .streaming import speak_token_stream, stream_assistant_reply
+from .tracing import JsonLinesExporter, OTLPJsonExporter, tracer
+from .turns import TurnScheduler, cancel_tasks
 
 # Watson Speech to Text Configuration
-CONTENT_TYPE = config("CONTENT_TYPE", default="audio/wav")
 WORD_ALTERNATIVE_THRESHOLDS = config(
     "WORD_ALTERNATIVE_THRESHOLDS", default=0.9, cast=float
 )
@@ -25,21 +56,217 @@ KEYWORDS = config("KEYWORDS", default="hey,hi,watson,friend,meet").split(",")
 KEYWORDS_THRESHOLD = config("KEYWORDS_THRESHOLD", default=0.5, cast=float)
 MAX_TOKENS = config("MAX_TOKENS", default=1000, cast=int)
 TEMPERATURE = config("TEMPERATURE", default=1.2, cast=float)
+# Watson recordings are resampled to the recognizer's native rate before upload; 0 keeps 44.1 kHz
+STT_SAMPLE_RATE = config("STT_SAMPLE_RATE", default=16000, cast=int)
+# "wav", "flac" or "opus"; the compressed encodings need the soundfile package
+STT_ENCODING = config("STT_ENCODING", default="wav")
+# Vosk model directory or Whisper model size for the on-device backends
+STT_MODEL = config("STT_MODEL", default="")
+# Recordings the on-device backends decode at the same time
+STT_WORKERS = config("STT_WORKERS", default=1, cast=int)
+# Stream microphone chunks to the recognizer while the user is speaking
+STREAMING_STT = config("STREAMING_STT", default=False, cast=bool)
+STREAMING_FINAL_TIMEOUT = config("STREAMING_FINAL_TIMEOUT", default=5.0, cast=float)
+# Speak the GPT response while it is still being generated
+STREAMING_REPLIES = config("STREAMING_REPLIES", default=False, cast=bool)
+# WAV files replayed as a fake microphone for headless runs; empty uses the microphone
+CAPTURE_FILES = [
+    path for path in config("CAPTURE_FILES", default="").split(",") if path
+]
+# Keep-alive connection pools shared by the Watson and OpenAI clients
+HTTP_POOL_SIZE = config("HTTP_POOL_SIZE", default=4, cast=int)
+HTTP_KEEPALIVE_SECONDS = config("HTTP_KEEPALIVE_SECONDS", default=120.0, cast=float)
+# Seconds a request may wait for a server outside of the remote call budgets below
+HTTP_TIMEOUT = config("HTTP_TIMEOUT", default=60.0, cast=float)
+# Open every connection and fetch IAM tokens at startup instead of on the first turn
+WARM_UP = config("WARM_UP", default=True, cast=bool)
+# Per-turn latency tracing; empty disables it. Format is "jsonl" or "otlp"
+TRACE_FILE = config("TRACE_FILE", default="")
+TRACE_FORMAT = config("TRACE_FORMAT", default="jsonl")
+# Let the user interrupt the bot by talking over it. There is no echo cancellation,
+# so only enable it with headphones or a microphone that cancels the speaker's echo
+BARGE_IN = config("BARGE_IN", default=False, cast=bool)
+# Consecutive loud chunks (about 23 ms each) needed before the bot stops talking
+BARGE_IN_MIN_CHUNKS = config("BARGE_IN_MIN_CHUNKS", default=3, cast=int)
+# How far above the noise floor, or the echo of the bot's voice, speech must be to interrupt
+BARGE_IN_NOISE_RATIO = config("BARGE_IN_NOISE_RATIO", default=6.0, cast=float)
+# Chunks at the start of playback that measure how loud the bot's own voice is picked up
+BARGE_IN_ECHO_CHUNKS = config("BARGE_IN_ECHO_CHUNKS", default=8, cast=int)
 VOICE = config("VOICE", default="en-US_AllisonV3Voice")
 # Watson Text to Speech Configuration
 AUDIO_FORMAT = config("AUDIO_FORMAT", default="audio/wav")
+# On-device voice for short phrases and for when Watson is slow or failing:
+# "piper", "espeak", or empty to always use Watson
+TTS_LOCAL_ENGINE = config("TTS_LOCAL_ENGINE", default="")
+# Piper voice model (.onnx) or eSpeak voice name
+TTS_LOCAL_VOICE = config("TTS_LOCAL_VOICE", default="")
+# Utterances up to this many characters are spoken by the local voice
+TTS_LOCAL_MAX_CHARACTERS = config("TTS_LOCAL_MAX_CHARACTERS", default=40, cast=int)
+# Seconds to wait for Watson before a sentence is spoken by the local voice
+TTS_REMOTE_TIMEOUT = config("TTS_REMOTE_TIMEOUT", default=2.0, cast=float)
+# Seconds Watson is skipped after it failed or timed out
+TTS_FAILURE_COOLDOWN = config("TTS_FAILURE_COOLDOWN", default=30.0, cast=float)
+# Synthesized Speech Cache Configuration
+AUDIO_CACHE_DIR = config("AUDIO_CACHE_DIR", default="audio_cache")
+AUDIO_CACHE_MEMORY_MB = config("AUDIO_CACHE_MEMORY_MB", default=16, cast=int)
+AUDIO_CACHE_DISK_MB = config("AUDIO_CACHE_DISK_MB", default=64, cast=int)
+# Seconds before cached audio is re-synthesized; 0 keeps entries until evicted
+AUDIO_CACHE_TTL = config("AUDIO_CACHE_TTL", default=0, cast=float)
+
+
+# Conversation History Configuration
+# Estimated tokens of recent turns sent verbatim; older turns are summarized
+HISTORY_TOKEN_BUDGET = config("HISTORY_TOKEN_BUDGET", default=1500, cast=int)
+# Summarize older turns with the LLM instead of keeping extracts of them
+HISTORY_LLM_SUMMARY = config("HISTORY_LLM_SUMMARY", default=True, cast=bool)
+# Detected sentiments kept in the chatbot's state, which is sent with every run
+SENTIMENT_HISTORY = config("SENTIMENT_HISTORY", default=10, cast=int)
+# Weight of the newest utterance in the smoothed mood, from 0 (never moves) to 1 (latest only)
+SENTIMENT_SMOOTHING = config("SENTIMENT_SMOOTHING", default=0.3, cast=float)
+# Utterances scored locally with less confidence are classified by the LLM; 0 never asks it
+SENTIMENT_LLM_CONFIDENCE = config("SENTIMENT_LLM_CONFIDENCE", default=0.5, cast=float)
+# Lexicon in VADER's format replacing the built-in one; empty uses the built-in one
+SENTIMENT_LEXICON = config("SENTIMENT_LEXICON", default="")
+
+# Recording Archive Configuration
+ARCHIVE_AUDIO = config("ARCHIVE_AUDIO", default=True, cast=bool)
+ARCHIVE_DIR = config("ARCHIVE_DIR", default="wav_output")
+# "wav", or "flac" for lossless compression (needs the soundfile package)
+ARCHIVE_FORMAT = config("ARCHIVE_FORMAT", default="wav")
+# Recordings are downsampled to this rate before saving; 0 keeps the capture rate
+ARCHIVE_SAMPLE_RATE = config("ARCHIVE_SAMPLE_RATE", default=0, cast=int)
+# Oldest recordings are deleted beyond these limits; 0 disables a limit
+ARCHIVE_MAX_MB = config("ARCHIVE_MAX_MB", default=512, cast=int)
+ARCHIVE_MAX_DAYS = config("ARCHIVE_MAX_DAYS", default=30, cast=float)
+
+# Response Cache Configuration (opt-in; cached replies skip the LLM entirely)
+RESPONSE_CACHE = config("RESPONSE_CACHE", default=False, cast=bool)
+RESPONSE_CACHE_SIZE = config("RESPONSE_CACHE_SIZE", default=256, cast=int)
+RESPONSE_CACHE_TTL = config("RESPONSE_CACHE_TTL", default=3600, cast=float)
+# Cosine similarity at which a different utterance reuses a reply; 0 matches exactly only
+RESPONSE_CACHE_SIMILARITY = config("RESPONSE_CACHE_SIMILARITY", default=0.0, cast=float)
+
+# Picture Configuration
+PICTURE_CONCURRENCY = config("PICTURE_CONCURRENCY", default=2, cast=int)
+# Pictures ready later than this after being asked for are not shown
+PICTURE_TIMEOUT = config("PICTURE_TIMEOUT", default=60.0, cast=float)
+PICTURE_CACHE_SIZE = config("PICTURE_CACHE_SIZE", default=32, cast=int)
+# Seconds a painted picture is reused; its URL expires an hour after painting
+PICTURE_CACHE_TTL = config("PICTURE_CACHE_TTL", default=3000.0, cast=float)
 
+# Remote Call Resilience Configuration
+# Seconds each remote stage may take in total, retries and hedged requests included
+RECOGNIZE_BUDGET = config("RECOGNIZE_BUDGET", default=8.0, cast=float)
+SYNTHESIZE_BUDGET = config("SYNTHESIZE_BUDGET", default=6.0, cast=float)
+SENTIMENT_BUDGET = config("SENTIMENT_BUDGET", default=5.0, cast=float)
+EXIT_CHECK_BUDGET = config("EXIT_CHECK_BUDGET", default=5.0, cast=float)
+REPLY_BUDGET = config("REPLY_BUDGET", default=30.0, cast=float)
+# Retries of a failed call, each after a random wait below a doubling backoff
+REMOTE_RETRIES = config("REMOTE_RETRIES", default=2, cast=int)
+REMOTE_BACKOFF = config("REMOTE_BACKOFF", default=0.2, cast=float)
+# Send a second request when one runs past the service's p95 latency
+REMOTE_HEDGING = config("REMOTE_HEDGING", default=True, cast=bool)
+# Consecutive failures that stop calls to a service, and seconds until it is tried again
+BREAKER_FAILURES = config("BREAKER_FAILURES", default=5, cast=int)
+BREAKER_RESET_SECONDS = config("BREAKER_RESET_SECONDS", default=30.0, cast=float)
+
+# Session Persistence Configuration (empty SESSION_DB disables persistence)
+SESSION_DB = config("SESSION_DB", default="sessions/companion.db")
+# Whose conversation a local session continues, e.g. the robot's serial number
+SESSION_USER = config("SESSION_USER", default="default")
+
+# Additional phrases that end the conversation without asking the LLM
+EXIT_PHRASES = [
+    phrase for phrase in config("EXIT_PHRASES", default="").split(",") if phrase
+]
 
 # Dialogue Constants
+GREETING_MESSAGE = "Hello! Chat with GPT and I will speak its responses!"
+REPEAT_MESSAGE = "I didn't catch that, could you please repeat?"
+ERROR_MESSAGE = "Sorry, I encountered an error processing your request."
+HEARING_ERROR_MESSAGE = (
+    "Sorry, I'm having trouble hearing you right now. Please try again in a moment."
+)
+GOODBYE_MESSAGE = "Alright, I understand. It was great talking to you. I am always here for you if you want to talk. Goodbye!"
+STATIC_MESSAGES = (
+    GREETING_MESSAGE,
+    REPEAT_MESSAGE,
+    ERROR_MESSAGE,
+    HEARING_ERROR_MESSAGE,
+    GOODBYE_MESSAGE,
+)
 DEFAULT_SENTIMENT_RESPONSE = "default_sentiment_response"
 DEFAULT_REQUEST_TYPE_RESPONSE = "default_request_type_response"
 
 
-def send_picture_to_user(user_input: str) -> None:
-    """Send a picture to the user based on the user's input."""
-    image = marvin.paint(user_input)
-    url = image.data[0].url
-    webbrowser.open(url)
+def llm_retryable(error):
+    """Whether a failed LLM call may be retried, dropped connections included."""
+    return is_retryable(error) or isinstance(error, openai.APIConnectionError)
+
+
+def create_remote_service(name, budget, idempotent=True, retry_on=is_retryable):
+    """
+    Apply the configured retries, hedging and circuit breaker to a remote service.
+
+    Args:
+        name (str): Service name used in logs and errors.
+        budget (float): Seconds a call may take in total.
+        idempotent (bool): Whether repeating a call is harmless; calls that are
+            not get a deadline and a circuit breaker only.
+        retry_on (callable): Returns whether a failed call may be retried.
+    """
+    return RemoteService(
+        name,
+        budget=budget,
+        retries=REMOTE_RETRIES if idempotent else 0,
+        backoff=REMOTE_BACKOFF,
+        hedge=REMOTE_HEDGING and idempotent,
+        breaker=CircuitBreaker(BREAKER_FAILURES, BREAKER_RESET_SECONDS),
+        retry_on=retry_on,
+    )
+
+
+# One policy per service, so every session shares its latency history and circuit
+remote_services = {
+    "recognize": create_remote_service("recognize", RECOGNIZE_BUDGET),
+    "synthesize": create_remote_service("synthesize", SYNTHESIZE_BUDGET),
+    "sentiment": create_remote_service(
+        "sentiment", SENTIMENT_BUDGET, retry_on=llm_retryable
+    ),
+    "exit_check": create_remote_service(
+        "exit_check", EXIT_CHECK_BUDGET, retry_on=llm_retryable
+    ),
+    # Running the assistant again would post the user's message to its thread twice
+    "reply": create_remote_service(
+        "reply", REPLY_BUDGET, idempotent=False, retry_on=llm_retryable
+    ),
+    # A picture is slow and paid for, so a slow one is never painted twice at once
+    "paint": RemoteService(
+        "paint",
+        budget=PICTURE_TIMEOUT,
+        retries=1,
+        backoff=REMOTE_BACKOFF,
+        breaker=CircuitBreaker(BREAKER_FAILURES, BREAKER_RESET_SECONDS),
+        retry_on=llm_retryable,
+    ),
+}
+
+
+def paint_picture(prompt: str) -> str:
+    """Paint a picture with Marvin and return its URL."""
+    image = remote_services["paint"].call(marvin.paint, prompt)
+    return image.data[0].url
+
+
+# Paints in the background so the reply that asked for a picture is not held up
+picture_service = PictureService(
+    paint_picture,
+    webbrowser.open,
+    max_concurrent=PICTURE_CONCURRENCY,
+    timeout=PICTURE_TIMEOUT,
+    cache_size=PICTURE_CACHE_SIZE,
+    cache_ttl=PICTURE_CACHE_TTL,
+)
 
 
 class Sentiment(Enum):
@@ -54,10 +281,12 @@ class SentimentState(BaseModel):
     """Represents the state of the user's sentiment."""
 
     sentiment: list[Sentiment] = []
+    # Exponentially smoothed sentiment score, from -1 (negative) to 1 (positive)
+    mood: float = 0.0
 
 
 @marvin.fn  # type: ignore
-def check_exit_command(user_input: str) -> bool:
+async def llm_check_exit_command(user_input: str) -> bool:
     """
     Analyze the user's input to detect intentions to end the conversation.
 
@@ -74,6 +303,60 @@ def check_exit_command(user_input: str) -> bool:
     """
 
 
+@marvin.fn  # type: ignore
+async def llm_summarize_conversation(summary: str, transcript: str) -> str:
+    """
+    Update the running summary of a conversation between a user and their
+    supportive chatbot companion with the exchanges that just happened.
+
+    Keep what matters for continuing the conversation: how the user feels and
+    how their mood changed, what they asked for and anything the companion
+    offered or promised. Write at most 120 words.
+
+    The summary so far is: {{ summary }}.
+
+    The new exchanges are: {{ transcript }}.
+
+    Returns:
+        str: The updated summary.
+    """
+
+
+async def summarize_turns(summary, turns):
+    """Fold evicted turns into the conversation summary with the LLM."""
+    transcript = "\n".join(turn.transcript() for turn in turns)
+    return await llm_summarize_conversation(summary, transcript)
+
+
+def ask_llm_exit_command(user_input: str) -> bool:
+    """Run the LLM exit check on the shared event loop so its connection is reused."""
+    return run_coroutine(llm_check_exit_command(user_input))
+
+
+def bounded_exit_check(llm_check):
+    """
+    Run an LLM exit check within its budget.
+
+    An LLM that cannot answer in time counts as no exit, so an outage
+    neither ends the conversation nor fails the turn.
+    """
+
+    def check(user_input):
+        try:
+            return remote_services["exit_check"].call(llm_check, user_input)
+        except RemoteCallError as e:
+            logging.error(f"Exit check unavailable, continuing the conversation: {e}")
+            return False
+
+    return check
+
+
+# Resolves clear exit intents locally and only asks the LLM about ambiguous input
+check_exit_command = ExitIntentDetector(
+    bounded_exit_check(ask_llm_exit_command), extra_phrases=EXIT_PHRASES
+)
+
+
 class VoiceAssistant:
 
     """
@@ -82,13 +365,110 @@ class VoiceAssistant:
     and speaking the GPT response.
     """
 
-    def __init__(self):
-        """Initialize the VoiceAssistant and its services."""
+    def __init__(
+        self,
+        shared=None,
+        capture_device=None,
+        play_audio=None,
+        user_id=None,
+        show_picture=None,
+    ):
+        """
+        Initialize the VoiceAssistant and its services.
+
+        Args:
+            shared (VoiceAssistant, optional): Assistant whose service clients and
+                speech cache are reused, so many sessions can run in one process.
+                Its owner is responsible for warming up and closing them.
+            capture_device (optional): Audio input for the session; defaults to the
+                microphone, or to `CAPTURE_FILES` when configured.
+            play_audio (callable, optional): Audio output for the session, as taken
+                by `PipelinedSpeaker`; defaults to the local speakers.
+            user_id (str, optional): Whose saved conversation the session continues;
+                defaults to `SESSION_USER` for local sessions. Served sessions
+                without one are not saved.
+            show_picture (callable, optional): Shows a picture's URL to the user;
+                defaults to opening it in the local browser.
+        """
         # Setup logging
         setup_logging(log_file="logs/chatbot_log.txt")
+        # Distinguishes the recordings of sessions that run at the same time
+        self.session_id = uuid.uuid4().hex[:8]
+        self.owns_services = shared is None
+        if not self.owns_services:
+            self.services = shared.services
+            self.SPEECH_TO_TEXT = shared.SPEECH_TO_TEXT
+            self.speech_recognizer = shared.speech_recognizer
+            self.speech_synthesizer = shared.speech_synthesizer
+            self.sentiment_scorer = shared.sentiment_scorer
+            self.TEXT_TO_SPEECH = shared.TEXT_TO_SPEECH
+            self.audio_cache = shared.audio_cache
+            self.store = shared.store
+            self.archiver = shared.archiver
+        else:
+            if TRACE_FILE:
+                exporter_class = (
+                    OTLPJsonExporter if TRACE_FORMAT == "otlp" else JsonLinesExporter
+                )
+                tracer.configure(enabled=True, exporter=exporter_class(TRACE_FILE))
 
-        # Configure and initialize external services (IBM, Marvin, etc.)
-        self._configure_services()
+            # Configure and initialize external services (IBM, Marvin, etc.)
+            self._configure_services()
+            self.speech_recognizer = self._create_speech_recognizer()
+            # On-device models load in the background while the greeting plays
+            self.speech_recognizer.warm_up()
+            self.speech_synthesizer = self._create_speech_synthesizer()
+            self.speech_synthesizer.warm_up()
+            # Scores the utterances of every session locally, together
+            self.sentiment_scorer = SentimentBatcher(self._create_sentiment_analyzer())
+            if WARM_UP:
+                # Runs in the background while the rest of the setup and the greeting happen
+                self.services.warm_up()
+            # Cache synthesized speech so repeated phrases skip the network round trip
+            self.audio_cache = AudioCache(
+                memory_max_bytes=AUDIO_CACHE_MEMORY_MB * 2**20,
+                disk_dir=AUDIO_CACHE_DIR or None,
+                disk_max_bytes=AUDIO_CACHE_DISK_MB * 2**20,
+                ttl=AUDIO_CACHE_TTL or None,
+            )
+            self._prewarm_audio_cache()
+            # Turns and summaries outlive the process so the next session can resume
+            self.store = SessionStore(SESSION_DB) if SESSION_DB else None
+            # Recordings are written in the background and pruned by size and age
+            self.archiver = (
+                AudioArchiver(
+                    ARCHIVE_DIR,
+                    audio_format=ARCHIVE_FORMAT,
+                    sample_rate=ARCHIVE_SAMPLE_RATE or None,
+                    max_bytes=ARCHIVE_MAX_MB * 2**20 or None,
+                    max_age=ARCHIVE_MAX_DAYS * 86400 or None,
+                )
+                if ARCHIVE_AUDIO
+                else None
+            )
+        if user_id is None and self.owns_services:
+            user_id = SESSION_USER
+        self.user_id = user_id if self.store is not None else None
+        # The microphone stays open for the whole session and feeds the event loop
+        self.capture = CaptureEngine(capture_device or self._create_capture_device())
+        # Shared across turns so the learned noise floor carries over
+        self.vad = VoiceActivityDetector(min_threshold=Recorder.THRESHOLD)
+        # Ring position where the user talked over the bot; the next turn starts there
+        self.barge_in_position = None
+        # Pipelined speaker that plays sentence N while sentence N+1 is synthesized
+        self.speaker = PipelinedSpeaker(self._synthesize, play_audio=play_audio)
+        # Pictures go to this session's user, not to whoever runs the process
+        self.show_picture = show_picture or webbrowser.open
+        # The sentiment recorded for the current turn, before any refinement
+        self._turn_sentiment = None
+        # Scores sentiment first, then runs the exit check and any LLM fallback for the
+        # sentiment concurrently with the reply
+        self.turn_scheduler = TurnScheduler(
+            self._check_exit,
+            self._detect_turn_sentiment,
+            self._reply,
+            refine_sentiment=self._refine_sentiment,
+        )
         # Setting up the chatbot with instructions, state, and tools.
         self.chatbot = Application(
             name="Companion",
@@ -97,7 +477,8 @@ class VoiceAssistant:
             You must ensure to track the user's sentiment state, using the values
             from the `Sentiment` Enum, which includes 'POSITIVE', 'NEGATIVE', and 'NEUTRAL.'
             You must be sure to update the application's state accordingly with the detected value
-            from the Enum. You should always provide emotionally aware and context-sensitive
+            from the Enum. The state's `mood` is the user's smoothed sentiment over the conversation,
+            from -1 (negative) to 1 (positive). You should always provide emotionally aware and context-sensitive
             responses. If you detect that the user is feeling negative or down, offer a caring
             and empathetic response that acknowledges their emotions. For example, if the user
             expresses sadness, frustration, or anxiety, respond with comfort, reassurance, or
@@ -115,11 +496,28 @@ class VoiceAssistant:
             supportive companion, ready to listen, empathize, and respond with both understanding
             and positivity.""",
             state=SentimentState(),
-            tools=[send_picture_to_user],
+            tools=[self._track_tool(self._picture_tool())],
         )
         # self.last_sentiment = Sentiment.NEUTRAL  # Initialize last sentiment as NEUTRAL
-        # Initializing conversation history to store user and bot interactions
-        self.conversation_history = []
+        # Recent turns verbatim plus a rolling summary, so prompts stay bounded
+        self.history = ConversationHistory(
+            token_budget=HISTORY_TOKEN_BUDGET,
+            summarize=summarize_turns if HISTORY_LLM_SUMMARY else None,
+        )
+        # Background task folding evicted turns into the summary
+        self._summarizing = None
+        # Replies to repeated small talk; per session, since replies may be personal
+        self.response_cache = (
+            ResponseCache(
+                max_entries=RESPONSE_CACHE_SIZE,
+                ttl=RESPONSE_CACHE_TTL or None,
+                similarity_threshold=RESPONSE_CACHE_SIMILARITY or None,
+            )
+            if RESPONSE_CACHE
+            else None
+        )
+        # Tool calls so far; replies of turns that ran a tool are never cached
+        self.tool_calls = 0
 
     def __str__(self) -> str:
         """Return a string representation of the VoiceAssistant object."""
@@ -137,17 +535,61 @@ class VoiceAssistant:
         """Logs the chatbot object and conversation history."""
         # Log chatbot details
         logging.info(str(self))
+        logging.info(
+            f"Exit checks resolved locally: {check_exit_command.short_circuited} "
+            f"of {sum(check_exit_command.stats.values())}"
+        )
 
-        # Log conversation history
-        logging.info("Conversation History:")
-        for entry in self.conversation_history:
-            logging.info(f"{entry['role']}: {entry['content']}")
+        # Turns were logged as they were recorded; older ones only live on in the summary
+        if self.history.summary:
+            logging.info(f"Conversation summary: {self.history.summary}")
+        if self.response_cache is not None:
+            logging.info(
+                f"Response cache: {self.response_cache.hits} hits, "
+                f"{self.response_cache.misses} misses"
+            )
+            for mood, utterance, _, hits in self.response_cache.entries():
+                if hits:
+                    logging.info(f"  {hits} hits: {utterance!r} ({mood})")
+        if self.speech_synthesizer.local is not None:
+            logging.info(
+                f"Speech synthesis fell back to the local voice "
+                f"{self.speech_synthesizer.fallbacks} times"
+            )
+            for name, stats in self.speech_synthesizer.latency_summary().items():
+                logging.info(
+                    f"  {name}: {stats['count']} calls, p50 {stats['p50_ms']:.0f} ms, "
+                    f"p95 {stats['p95_ms']:.0f} ms"
+                )
+        logging.info(
+            f"Mood: {self.chatbot.state.value.mood:.2f}; "
+            f"{self.sentiment_scorer.scored} utterances scored locally "
+            f"in {self.sentiment_scorer.batches} batches"
+        )
+        for service in remote_services.values():
+            if service.stats["calls"]:
+                counts = ", ".join(f"{n} {stat}" for stat, n in service.stats.items())
+                circuit = service.breaker.state if service.breaker else "none"
+                logging.info(f"Remote {service.name}: {counts}; circuit {circuit}")
+
+        if tracer.enabled:
+            logging.info("Latency percentiles:")
+            tracer.log_summary()
 
     def _configure_services(self):
         """Configure and initialize external services (IBM, Marvin, etc.)."""
-        # Initialize IBM services for speech-to-text and text-to-speech
-        self.SPEECH_TO_TEXT = self._initialize_ibm_service(
-            config("IAM_APIKEY_STT"), config("URL_STT")
+        # Long-lived, pooled clients shared by every call to the services
+        self.services = ServiceLayer(
+            pool_size=HTTP_POOL_SIZE,
+            keepalive_seconds=HTTP_KEEPALIVE_SECONDS,
+            timeout=HTTP_TIMEOUT,
+        )
+        # Initialize IBM services for speech-to-text and text-to-speech;
+        # on-device recognition needs no Speech to Text credentials
+        self.SPEECH_TO_TEXT = (
+            self._initialize_ibm_service(config("IAM_APIKEY_STT"), config("URL_STT"))
+            if STT_BACKEND == WatsonSpeechToText.name
+            else None
         )
         self.TEXT_TO_SPEECH = self._initialize_ibm_service(
             config("IAM_APIKEY_TTS"), config("URL_TTS")
@@ -161,23 +603,57 @@ class VoiceAssistant:
         Helper method to initialize IBM services.
         :param api_key: The API key for the service.
         :param url: The URL for the service.
-        :return: Initialized IBM service.
+        :return: Initialized IBM service sharing the pooled HTTP session.
         """
-        # Creating an IAM authenticator using the provided API key
-        authenticator = IAMAuthenticator(api_key)
-        service = None
-        # Determine the type of service based on the URL and initialize it
-        if "speech-to-text" in url:
-            service = SpeechToTextV1(authenticator=authenticator)
-        elif "text-to-speech" in url:
-            service = TextToSpeechV1(authenticator=authenticator)
-        else:
-            raise ValueError(
-                f"Invalid service URL: {url}. Expected 'speech-to-text' "
-                f"or 'text-to-speech' in the URL."
+        # The service type is determined by the URL; IAM tokens refresh in the background
+        return self.services.watson_service(api_key, url)
+
+    def _create_speech_recognizer(self):
+        """Create the speech recognition backend selected by `STT_BACKEND`."""
+        if STT_BACKEND == WatsonSpeechToText.name:
+            return WatsonSpeechToText(
+                self.SPEECH_TO_TEXT,
+                sample_rate=STT_SAMPLE_RATE or None,
+                encoding=STT_ENCODING,
+                word_alternatives_threshold=WORD_ALTERNATIVE_THRESHOLDS,
+                keywords=KEYWORDS,
+                keywords_threshold=KEYWORDS_THRESHOLD,
+                policy=remote_services["recognize"],
             )
-        service.set_service_url(url)
-        return service
+        return LocalSpeechToText(
+            create_local_engine(STT_BACKEND, STT_MODEL), workers=STT_WORKERS
+        )
+
+    def _create_speech_synthesizer(self):
+        """Route speech between Watson and the local voice selected by `TTS_LOCAL_ENGINE`."""
+        return TextToSpeechRouter(
+            WatsonTextToSpeech(
+                self.TEXT_TO_SPEECH,
+                VOICE,
+                AUDIO_FORMAT,
+                policy=remote_services["synthesize"],
+            ),
+            self._create_local_voice(),
+            max_local_characters=TTS_LOCAL_MAX_CHARACTERS,
+            remote_timeout=TTS_REMOTE_TIMEOUT,
+            failure_cooldown=TTS_FAILURE_COOLDOWN,
+            # Said when something already went wrong, so they must not wait on Watson
+            local_phrases=(REPEAT_MESSAGE, ERROR_MESSAGE, HEARING_ERROR_MESSAGE),
+        )
+
+    @staticmethod
+    def _create_sentiment_analyzer():
+        """Create the local sentiment analyzer, with `SENTIMENT_LEXICON` if set."""
+        return LexiconSentiment(
+            load_lexicon(SENTIMENT_LEXICON) if SENTIMENT_LEXICON else None
+        )
+
+    @staticmethod
+    def _create_local_voice():
+        """Create the on-device voice selected by `TTS_LOCAL_ENGINE`, if any."""
+        if not TTS_LOCAL_ENGINE:
+            return None
+        return LocalTextToSpeech(create_local_voice(TTS_LOCAL_ENGINE, TTS_LOCAL_VOICE))
 
     def _configure_marvin_settings(self):
         """Configure Marvin settings for the voice assistant."""
@@ -186,88 +662,515 @@ class VoiceAssistant:
         marvin.settings.openai.chat.completions.model = config(
             "MARVIN_CHAT_COMPLETIONS_MODEL"
         )
+        # Route Marvin's OpenAI calls through the pooled keep-alive clients
+        self.services.install_openai_clients()
 
-    @staticmethod
-    def _create_wav_file(prefix=""):
-        """Create a WAV file in the designated directory based on timestamp."""
-        # Check if the directory exists, if not create it
-        if not os.path.exists("wav_output"):
-            os.makedirs("wav_output")
-
-        # Generate filename based on current timestamp and provided prefix
-        curr_time = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{prefix}_{curr_time}.wav"
-        speech_file = os.path.join(os.getcwd(), "wav_output", filename)
+    def _archive_recording(self, wav):
+        """Queue a recording of the user for the archive, if archiving is on."""
+        if self.archiver is not None:
+            self.archiver.archive(f"user_{self.session_id}", wav)
 
-        return speech_file
+    @staticmethod
+    def _create_capture_device():
+        """Create the audio input device, replaying files instead when configured."""
+        device_class = FileCaptureDevice if CAPTURE_FILES else PyAudioDevice
+        device = device_class(Recorder.RATE, Recorder.CHANNELS, Recorder.CHUNK_SIZE)
+        for path in CAPTURE_FILES:
+            device.queue_file(path)
+        return device
 
-    def _listen(self):
+    async def _listen(self):
         """Record audio and transcribe the recorded speech."""
-        # Create a WAV file to store the user's speech
-        user_speech_file = VoiceAssistant._create_wav_file(prefix="user")
+        if STREAMING_STT:
+            return await self._listen_streaming()
+
+        # The user's speech is kept in memory; archiving it happens in the background
+        recording = io.BytesIO()
 
         logging.info("Starting recording process")
         # Initialize the recorder
-        recorder = Recorder(user_speech_file)
+        recorder = Recorder(recording, vad=self.vad)
 
         logging.info("Please say something to the microphone\n")
-        # Start recording
-        recorder.record()
+        # Record from the session's capture engine without blocking the event loop
+        await recorder.record_async(self.capture, start=self._take_barge_in_position())
+        user_speech = recording.getvalue()
+        self._archive_recording(user_speech)
 
         logging.info("Transcribing audio....\n")
-        # Transcribe the recorded audio using IBM's Speech-to-Text service
-        try:
-            with open((user_speech_file), "rb") as audio:
-                speech_result = self.SPEECH_TO_TEXT.recognize(
-                    audio=audio,
-                    content_type=CONTENT_TYPE,
-                    word_alternatives_threshold=WORD_ALTERNATIVE_THRESHOLDS,
-                    keywords=KEYWORDS,
-                    keywords_threshold=KEYWORDS_THRESHOLD,
-                ).get_result()
-                # Check if there are any results in the transcription
-                if speech_result["results"]:
-                    # Extract the transcribed text from the result
-                    result_alternative = speech_result["results"][0]["alternatives"][0]
-                    user_speech_text = result_alternative["transcript"]
-
-                    return user_speech_text
-                else:
-                    logging.info("No speech detected. Please try again.")
-                    return None
+        with tracer.span("recognize", backend=self.speech_recognizer.name):
+            user_speech_text = await self.speech_recognizer.transcribe_async(
+                user_speech
+            )
+        if not user_speech_text:
+            logging.info("No speech detected. Please try again.")
+        return user_speech_text
 
-        # Handle exceptions from the IBM service
-        except ApiException as ex:
-            logging.error(f"Method failed with status code {ex.code}: " f"{ex.message}")
+    def _take_barge_in_position(self):
+        """Return where interrupting speech began, if the user talked over the last reply."""
+        position, self.barge_in_position = self.barge_in_position, None
+        return position
+
+    def _create_streaming_recognizer(self):
+        """Create a streaming recognizer bound to the speech recognition backend."""
+        return self.speech_recognizer.create_streaming_recognizer(
+            Recorder.RATE,
+            Recorder.CHANNELS,
+            on_interim=lambda hypothesis: logging.info(f"Interim: {hypothesis}"),
+        )
+
+    async def _listen_streaming(self):
+        """
+        Record audio while streaming each chunk to the recognizer.
+
+        Recognition runs while the user is still speaking, so only the
+        finalization of the last phrase remains once recording stops.
+        """
+        # The recording is still archived so it can be reviewed later
+        recording = io.BytesIO()
+
+        recognizer = self._create_streaming_recognizer()
+        recognizer.start()
+
+        logging.info("Please say something to the microphone\n")
+        recorder = Recorder(recording, on_chunk=recognizer.feed, vad=self.vad)
+        await recorder.record_async(self.capture, start=self._take_barge_in_position())
+        self._archive_recording(recording.getvalue())
+
+        logging.info("Waiting for final transcript....\n")
+        with tracer.span("recognize", streaming=True):
+            user_speech_text = await asyncio.to_thread(
+                recognizer.finish, timeout=STREAMING_FINAL_TIMEOUT
+            )
+        if not user_speech_text:
+            logging.info("No speech detected. Please try again.")
+        return user_speech_text
+
+    @tracer.traced("exit_check")
+    def _check_exit(self, user_input: str) -> bool:
+        """Return True if the user wants to end the conversation."""
+        return check_exit_command(user_input)
 
     def detect_sentiment(self, user_input: str) -> Sentiment:
-        """Detect the sentiment of the user's input using Marvin."""
-        return marvin.classify(user_input, Sentiment)
+        """Detect the sentiment of the user's input."""
+        return Sentiment(self.score_sentiment(user_input).label)
 
+    def score_sentiment(self, user_input: str) -> SentimentScore:
+        """
+        Score the sentiment of the user's input locally, asking Marvin only when unsure.
+
+        Returns:
+            SentimentScore: The label, a score from -1 to 1 and the confidence.
+        """
+        return self._refine_sentiment(user_input, self._score_locally(user_input))
+
+    @tracer.traced("sentiment")
+    def _score_locally(self, user_input: str) -> SentimentScore:
+        """Score the input with the local analyzer, taking microseconds for the lexicon."""
+        return self.sentiment_scorer.score(user_input)
+
+    def _detect_turn_sentiment(self, user_input: str) -> SentimentScore:
+        """Score the input locally and record it, so this turn's reply sees the mood."""
+        self._turn_sentiment = None
+        score = self._score_locally(user_input)
+        self._record_sentiment(score)
+        self._turn_sentiment = score
+        return score
+
+    def _refine_sentiment(
+        self, user_input: str, local: SentimentScore
+    ) -> SentimentScore:
+        """Return the local score, or Marvin's label when the local one is unsure."""
+        if local.confidence >= SENTIMENT_LLM_CONFIDENCE:
+            return local
+        try:
+            with tracer.span("sentiment_llm", confidence=round(local.confidence, 2)):
+                sentiment = remote_services["sentiment"].call(
+                    self._classify_sentiment, user_input
+                )
+        except RemoteCallError as e:
+            logging.error(
+                f"Sentiment classifier unavailable, using the local score: {e}"
+            )
+            return local
+        return SentimentScore.from_label(sentiment.value, "llm")
+
+    def _classify_sentiment(self, user_input: str) -> Sentiment:
+        """Classify the input on the shared event loop so its connection is reused."""
+        return run_coroutine(marvin.classify_async(user_input, Sentiment))
+
+    def _prewarm_audio_cache(self):
+        """Synthesize the fixed dialogue sentences in the background if they are not cached."""
+        sentences = [
+            sentence
+            for message in STATIC_MESSAGES
+            for sentence in split_sentences(message)
+        ]
+        threading.Thread(
+            target=self.audio_cache.prewarm,
+            args=(
+                sentences,
+                VOICE,
+                AUDIO_FORMAT,
+                self.speech_synthesizer.remote.synthesize,
+            ),
+            daemon=True,
+        ).start()
+
+    def _synthesize(self, text):
+        """Return cached audio for the text, synthesizing and caching it on a miss."""
+        audio = self.audio_cache.get(text, VOICE, AUDIO_FORMAT)
+        if audio is None:
+            audio, backend = self.speech_synthesizer.synthesize(text)
+            # Local speech is cheap to redo, and cached it would outlive a Watson outage
+            if backend is self.speech_synthesizer.remote:
+                self.audio_cache.put(text, VOICE, AUDIO_FORMAT, audio)
+        return audio
+
+    @tracer.traced("speak")
     def _speak(self, text):
         """Convert text input to speech."""
-        # Create a WAV file to store the bot's speech
-        bot_speech_file = VoiceAssistant._create_wav_file(prefix="bot")
-        # Convert the text to speech using IBM's Text-to-Speech service
+        # Sentences are synthesized one ahead of playback, straight from memory
         try:
-            with open(bot_speech_file, "wb") as audio_out:
-                audio_out.write(
-                    self.TEXT_TO_SPEECH.synthesize(
-                        text,
-                        voice=VOICE,
-                        accept=AUDIO_FORMAT,
-                    )
-                    .get_result()
-                    .content
-                )
-            # Play the generated speech
-            bot_speech_response = AudioSegment.from_wav(bot_speech_file)
-            play(bot_speech_response)
+            with self.speech_synthesizer.utterance(text):
+                self.speaker.speak(text)
         except ApiException as ex:
             # Handle exceptions from the IBM service
             logging.error(
                 "Method failed with status code " + str(ex.code) + ": " + ex.message
             )
+        except RemoteCallError as e:
+            logging.error(f"Speech synthesis unavailable: {e}")
+
+    def _run_kwargs(self):
+        """Extra run arguments giving the chatbot the context its thread lacks."""
+        context = self.history.context()
+        return {"additional_instructions": context} if context else {}
+
+    def _stream_reply_tokens(self, user_input: str):
+        """Return an async iterator over the chatbot's reply tokens."""
+        return stream_assistant_reply(
+            self.chatbot, user_input, timeout=REPLY_BUDGET, **self._run_kwargs()
+        )
+
+    async def _stream_reply(self, user_input: str, speech_allowed=None) -> str:
+        """
+        Generate a GPT response and speak it clause by clause as it streams in.
+
+        Args:
+            user_input (str): The user's transcribed speech.
+            speech_allowed (asyncio.Event, optional): Speaking waits until this is set.
+
+        Returns:
+            str: The full text of the GPT response.
+
+        Raises:
+            TimeoutError: If the reply takes longer than `REPLY_BUDGET` to generate.
+        """
+        try:
+            return await speak_token_stream(
+                self._stream_reply_tokens(user_input),
+                self.speaker,
+                speech_allowed=speech_allowed,
+            )
+        except TimeoutError:
+            self._abandon_run()
+            raise
+        except ApiException as ex:
+            # Handle exceptions from the IBM service
+            logging.error(
+                "Method failed with status code " + str(ex.code) + ": " + ex.message
+            )
+            return ""
+
+    async def _generate_reply(self, user_input: str, speech_allowed=None) -> str:
+        """Generate a GPT response and speak it once it is complete."""
+        with tracer.span("llm"):
+            try:
+                gpt_response = await remote_services["reply"].call_async(
+                    self.chatbot.say_async, user_input, **self._run_kwargs()
+                )
+            except RemoteCallError:
+                self._abandon_run()
+                raise
+        # Extract the text from the GPT response
+        gpt_response_text = gpt_response.messages[-1].content[0].text.value
+        if speech_allowed is not None:
+            await speech_allowed.wait()
+        # Speak the GPT response on a worker thread so the event loop can hear barge-ins
+        await asyncio.to_thread(self._speak, gpt_response_text)
+        return gpt_response_text
+
+    @tracer.traced("reply")
+    async def _reply(self, user_input: str, speech_allowed=None) -> str:
+        """
+        Generate and speak a GPT response using the configured reply path.
+
+        While the reply is generated and spoken, the microphone is watched for
+        the user talking over the bot. If they do, playback stops, the pending
+        generation and synthesis are cancelled and only the part that was
+        actually spoken is returned.
+        """
+        mood = self._current_mood()
+        cached = (
+            self.response_cache.get(user_input, mood)
+            if self.response_cache is not None
+            else None
+        )
+        if cached is not None:
+            logging.info("Replying from the response cache")
+            generate = functools.partial(self._speak_cached_reply, cached)
+        else:
+            generate = self._stream_reply if STREAMING_REPLIES else self._generate_reply
+        tool_calls = self.tool_calls
+        reply = await self._interruptible_reply(generate, user_input, speech_allowed)
+        # Partial replies and replies that depended on a tool are not worth repeating
+        if (
+            self.response_cache is not None
+            and cached is None
+            and self.barge_in_position is None
+            and self.tool_calls == tool_calls
+        ):
+            self.response_cache.put(user_input, reply, mood)
+        return reply
+
+    async def _interruptible_reply(self, generate, user_input, speech_allowed=None):
+        """Run `generate`, stopping it if the user talks over the bot."""
+        if not BARGE_IN:
+            return await generate(user_input, speech_allowed)
+
+        reply = asyncio.create_task(generate(user_input, speech_allowed))
+        monitor = asyncio.create_task(self._watch_for_barge_in())
+        try:
+            done, _ = await asyncio.wait(
+                {reply, monitor}, return_when=asyncio.FIRST_COMPLETED
+            )
+            if reply in done or self.barge_in_position is None:
+                return await reply
+            logging.info("User barged in; abandoning the reply")
+            await cancel_tasks(reply)
+            # Let the playback thread record how far it got
+            await asyncio.to_thread(self.speaker.idle.wait, 1.0)
+            return self.speaker.utterance.text
+        finally:
+            await cancel_tasks(monitor, reply)
+
+    async def _speak_cached_reply(self, reply, user_input, speech_allowed=None):
+        """Speak a reply from the response cache instead of generating one."""
+        if speech_allowed is not None:
+            await speech_allowed.wait()
+        await asyncio.gather(
+            asyncio.to_thread(self._speak, reply),
+            self._add_to_thread(user_input, reply),
+        )
+        return reply
+
+    async def _add_to_thread(self, user_input, reply):
+        """Add an exchange the chatbot did not run to its thread, so later replies know it."""
+        thread = self.chatbot.default_thread
+        try:
+            for message, role in ((user_input, "user"), (reply, "assistant")):
+                # Like a reply, a message added twice would be in the thread twice
+                await remote_services["reply"].call_async(
+                    thread.add_async, message, role=role
+                )
+        except RemoteCallError as e:
+            logging.error(f"Failed to add the cached reply to the thread: {e}")
+
+    def _current_mood(self):
+        """Return this turn's detected sentiment, part of the response cache key."""
+        sentiments = self.chatbot.state.value.sentiment
+        return sentiments[-1] if sentiments else None
+
+    def _picture_tool(self):
+        """Return the chatbot's picture tool, showing pictures to this session's user."""
+
+        def send_picture_to_user(user_input: str) -> str:
+            """Send a picture to the user based on the user's input."""
+            return picture_service.request(user_input, deliver=self.show_picture)
+
+        return send_picture_to_user
+
+    def _track_tool(self, tool):
+        """Wrap a chatbot tool so its calls are counted."""
+
+        @functools.wraps(tool)
+        def tracked(*args, **kwargs):
+            self.tool_calls += 1
+            return tool(*args, **kwargs)
+
+        return tracked
+
+    async def _watch_for_barge_in(self):
+        """
+        Interrupt the speaker as soon as the user starts talking over it.
+
+        Only speech while the bot's audio plays counts. Its first chunks
+        measure the echo of the bot's voice, and speech then has to be well
+        above that echo, which stands in for echo cancellation as far as an
+        energy detector can.
+
+        Sets `barge_in_position` to where the interrupting speech began, so the
+        next recording picks it up instead of losing its first words.
+        """
+        vad = VoiceActivityDetector(
+            min_threshold=Recorder.THRESHOLD,
+            noise_ratio=BARGE_IN_NOISE_RATIO,
+            hangover_chunks=0,
+        )
+        vad.noise_floor = self.vad.noise_floor
+        onset, loud_chunks, echo_chunks = None, 0, 0
+        chunks = self.capture.chunks()
+        try:
+            async for position, chunk in chunks:
+                if not self.speaker.playing.is_set():
+                    onset, loud_chunks, echo_chunks = None, 0, 0
+                    continue
+                if echo_chunks < BARGE_IN_ECHO_CHUNKS:
+                    echo_chunks += 1
+                    vad.noise_floor = max(vad.noise_floor, chunk_energy(chunk)[0])
+                    continue
+                if not vad.is_speech(chunk):
+                    onset, loud_chunks = None, 0
+                    continue
+                if onset is None:
+                    onset = position
+                loud_chunks += 1
+                if loud_chunks >= BARGE_IN_MIN_CHUNKS:
+                    self.speaker.interrupt()
+                    pre_roll = Recorder.PRE_ROLL_CHUNKS * self.capture.buffer.frame_size
+                    self.barge_in_position = max(onset - pre_roll, 0)
+                    return
+        finally:
+            await chunks.aclose()
+
+    def _record_sentiment(self, score: SentimentScore) -> Sentiment:
+        """Add a scored utterance to the chatbot's sentiment state and return its label."""
+        sentiment = Sentiment(score.label)
+        state = self.chatbot.state.value
+        state.mood = round(smooth_mood(state.mood, score.score, SENTIMENT_SMOOTHING), 3)
+        logging.info(
+            f"Detected user sentiment: {sentiment} ({score.source}, "
+            f"score {score.score:.2f}, confidence {score.confidence:.2f}); "
+            f"mood {state.mood:.2f}"
+        )
+        state.sentiment.append(sentiment)
+        # The state is rendered into every run's instructions, so only recent moods are kept
+        del state.sentiment[:-SENTIMENT_HISTORY]
+        return sentiment
+
+    def _revise_sentiment(self, score: SentimentScore) -> Sentiment:
+        """Replace this turn's recorded sentiment with a refined score and return its label."""
+        recorded = self._turn_sentiment
+        if recorded is None or score is recorded:
+            return Sentiment(score.label)
+        state = self.chatbot.state.value
+        # Smoothing is linear, so the mood moves by the weighted difference of the scores
+        state.mood = round(
+            state.mood + SENTIMENT_SMOOTHING * (score.score - recorded.score), 3
+        )
+        state.sentiment[-1] = Sentiment(score.label)
+        logging.info(
+            f"Revised user sentiment: {state.sentiment[-1]} ({score.source}); "
+            f"mood {state.mood:.2f}"
+        )
+        return state.sentiment[-1]
+
+    def _record_turn(self, user_input, reply, sentiment=None, interrupted=False):
+        """
+        Add a finished turn to the history and keep the chatbot's thread bounded.
+
+        Once the thread holds more than the token budget the chatbot moves to a
+        fresh one; the summary and recent turns then reach it as instructions.
+        """
+        turn = self.history.add(
+            user_input, reply, sentiment=sentiment, interrupted=interrupted
+        )
+        # Logged now, as the turn may be summarized away before the session ends
+        logging.info(
+            f"Turn {turn.index}: user: {turn.user} | gpt: {turn.reply}"
+            + (" (interrupted)" if interrupted else "")
+        )
+        self._save_turn(turn)
+        if interrupted:
+            # The cancelled run goes on server-side; the new thread gets this turn as context
+            self._abandon_run()
+        elif self.history.rotate_thread():
+            logging.info("Conversation outgrew its thread; starting a new one")
+            self.chatbot.clear_default_thread()
+        if self.history.needs_summary and (
+            self._summarizing is None or self._summarizing.done()
+        ):
+            # Summarizing is off the critical path; the next reply uses it once ready
+            self._summarizing = asyncio.create_task(self.history.summarize_evicted())
+
+    def _abandon_run(self):
+        """
+        Move the chatbot to a fresh thread after giving up on a run.
+
+        The run goes on server-side and keeps its thread busy, so the next
+        message could not be added to it. The new thread gets the conversation
+        so far as instructions.
+        """
+        logging.info("Abandoned the chatbot's run; starting a new thread")
+        self.history.new_thread()
+        self.chatbot.clear_default_thread()
+
+    def _save_turn(self, turn):
+        """Queue a turn for the session store; the write is committed in the background."""
+        if self.user_id is not None:
+            self.store.save_turn(self.user_id, turn, self.history.summary)
+
+    def _restore_session(self):
+        """Load the user's earlier conversation so this session continues it."""
+        if self.user_id is None:
+            return
+        with tracer.span("restore"):
+            saved = self.store.load(self.user_id, HISTORY_TOKEN_BUDGET)
+            sentiments = self.store.sentiments(self.user_id, SENTIMENT_HISTORY)
+        if not saved.total_turns:
+            return
+        for turn in saved.turns:
+            if turn.sentiment is not None:
+                turn.sentiment = Sentiment(turn.sentiment)
+        self.history.restore(saved.summary, saved.turns, saved.total_turns)
+        state = self.chatbot.state.value
+        state.sentiment = [Sentiment(s) for s in sentiments]
+        # Stored turns keep only their label, which is enough to resume the mood
+        for sentiment in sentiments:
+            state.mood = smooth_mood(
+                state.mood, LABEL_SCORES[sentiment], SENTIMENT_SMOOTHING
+            )
+        state.mood = round(state.mood, 3)
+        logging.info(
+            f"Resumed the conversation of {self.user_id} after {saved.total_turns} turns"
+        )
+
+    async def _end_session(self):
+        """Save the final summary and release what the session owns."""
+        if self._summarizing is not None:
+            await cancel_tasks(self._summarizing)
+        if self.history.needs_summary:
+            # No time to wait for the LLM; extracts keep the turns in the summary
+            await self.history.summarize_evicted(local=True)
+        if self.user_id is not None:
+            self.store.save_summary(
+                self.user_id, self.history.summary, self.history.total_turns
+            )
+        self.speaker.close()
+        if self.owns_services:
+            await asyncio.to_thread(self.close_services)
+
+    def close_services(self):
+        """Close the service clients and backends this assistant created for its sessions."""
+        self.services.close()
+        self.speech_recognizer.close()
+        self.speech_synthesizer.close()
+        self.sentiment_scorer.close()
+        if self.store is not None:
+            self.store.close()
+        if self.archiver is not None:
+            self.archiver.close()
 
     def terminate_session(self, user_input: str):
         """
@@ -277,65 +1180,87 @@ class VoiceAssistant:
         Args:
             user_input (str): The final input from the user that triggered session termination.
         """
-        # Update conversation history with the user's exit input
-        self.conversation_history.append({"role": "user", "content": user_input})
         logging.info(f"User is exiting the session with input: {user_input}")
 
         # Chatbot speaks a goodbye message
-        gpt_exit_message = "Alright, I understand. It was great talking to you. I am always here for you if you want to talk. Goodbye!"
+        gpt_exit_message = GOODBYE_MESSAGE
         self._speak(gpt_exit_message)
 
-        # Update conversation history with the bot's exit message
-        self.conversation_history.append({"role": "gpt", "content": gpt_exit_message})
+        # Update conversation history with the user's exit input and the goodbye
+        self._save_turn(self.history.add(user_input, gpt_exit_message))
 
         # Log the chatbot details and conversation history before ending the session
         self.log_chatbot_details()
 
     async def start_session(self):
         """Handle the conversation with the user."""
-        # Start the session by speaking a greeting
-        self._speak("Hello! Chat with GPT and I will speak its responses!")
-        while True:
-            # Listen to the user's speech and transcribe it
-            user_input = self._listen()
-            logging.info(f"User Speech Text: {user_input} \n")
-
-            # Check if user_speech_text is not None
-            if user_input:
-                user_input = user_input.lower()
-                # Exit the loop if the user says "exit"
-                if check_exit_command(user_input):
-                    # Terminate the session if an exit command is detected
-                    self.terminate_session(user_input)
-                    break
-                # Process the input through Marvin
-                try:
-                    # detect user sentiment
-                    self.detect_sentiment(user_input)
-
-                    # Generate a GPT response based on the user's input
-                    gpt_response = await self.chatbot.say_async(user_input)
-                    # Extract the text from the GPT response
-                    gpt_response_text = gpt_response.messages[-1].content[0].text.value
-                    logging.info(f"GPT Response Message: {gpt_response_text} \n")  #
-                    # Speak the GPT response
-                    self._speak(gpt_response_text)
-                    # Update the conversation history with the user's input and the GPT response
-                    self.conversation_history.append(
-                        {"role": "user", "content": user_input}
-                    )
-                    self.conversation_history.append(
-                        {"role": "gpt", "content": gpt_response_text}
-                    )
-                except Exception as e:
-                    logging.error(f"Failed to process input through Marvin: {e}")
-                    self._speak(
-                        "Sorry, I encountered an error processing your request."
-                    )
-            else:
-                # If user_speech_text is None, handle the case appropriately
-                logging.info("No valid input received. Please try speaking again.")
-                self._speak("I didn't catch that, could you please repeat?")
+        # Served sessions share clients that the server warms up and closes
+        warm_up_here = WARM_UP and self.owns_services
+        if warm_up_here:
+            # The reply client lives on this loop, so it is warmed up here
+            warm_up = asyncio.create_task(self.services.warm_up_openai())
+        # Start the session by speaking a greeting while the earlier conversation loads
+        await asyncio.gather(
+            asyncio.to_thread(self._speak, GREETING_MESSAGE),
+            asyncio.to_thread(self._restore_session),
+        )
+        self.capture.start()
+        try:
+            await self._converse()
+        finally:
+            self.capture.stop()
+            if warm_up_here:
+                await warm_up
+            await self._end_session()
 
         # Log the chatbot details and conversation history at the end of the session
         self.log_chatbot_details()
+
+    async def _converse(self):
+        """Run conversation turns until the user asks to end the session."""
+        while True:
+            # Everything until the next listen belongs to this turn's trace
+            with tracer.turn():
+                # Speaking is only silenced for the rest of the turn that was interrupted
+                self.speaker.resume()
+                # Listen to the user's speech and transcribe it
+                try:
+                    user_input = await self._listen()
+                except RemoteCallError as e:
+                    # Asking the user to repeat would not help while recognition is down
+                    logging.error(f"Speech recognition unavailable: {e}")
+                    await asyncio.to_thread(self._speak, HEARING_ERROR_MESSAGE)
+                    continue
+                logging.info(f"User Speech Text: {user_input} \n")
+
+                # Check if user_speech_text is not None
+                if user_input:
+                    user_input = user_input.lower()
+                    # Run the exit check and sentiment detection alongside the reply
+                    try:
+                        turn = await self.turn_scheduler.run(user_input)
+                    except Exception as e:
+                        logging.error(f"Failed to process input through Marvin: {e}")
+                        await asyncio.to_thread(self._speak, ERROR_MESSAGE)
+                        continue
+                    # Exit the loop if the user wants to end the conversation
+                    if turn.exit_requested:
+                        # Terminate the session if an exit command is detected
+                        await asyncio.to_thread(self.terminate_session, user_input)
+                        break
+                    sentiment = None
+                    if turn.sentiment is not None:
+                        sentiment = self._revise_sentiment(turn.sentiment)
+                    gpt_response_text = turn.reply
+                    # Update the conversation history with the user's input and the GPT response;
+                    # after a barge-in only the text spoken before the user cut in is recorded
+                    self._record_turn(
+                        user_input,
+                        gpt_response_text,
+                        sentiment=sentiment,
+                        interrupted=self.barge_in_position is not None,
+                    )
+                else:
+                    # If user_speech_text is None, handle the case appropriately
+                    logging.info("No valid input received. Please try speaking again.")
+                    await asyncio.to_thread(self._speak, REPEAT_MESSAGE)
@@ -0,0 +1,170 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+def cache_key(text, voice, audio_format):
+    """Return the content address for a piece of synthesized speech."""
+    return hashlib.sha256(f"{voice}\0{audio_format}\0{text}".encode()).hexdigest()
+
+
+class AudioCache:
+    """
+    Bounded cache for synthesized speech keyed on (text, voice, audio format).
+
+    Entries live in an in-memory LRU tier and, optionally, in an on-disk tier
+    that survives restarts. Both tiers evict least recently used entries once
+    their size cap is reached, and entries older than the TTL are ignored.
+    """
+
+    def __init__(
+        self,
+        memory_max_bytes=16 * 2**20,
+        disk_dir=None,
+        disk_max_bytes=64 * 2**20,
+        ttl=None,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            memory_max_bytes (int): Maximum total size of the in-memory tier.
+            disk_dir (str, optional): Directory for the on-disk tier; disabled when None.
+            disk_max_bytes (int): Maximum total size of the on-disk tier.
+            ttl (float, optional): Seconds an entry stays valid; never expires when None.
+        """
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.ttl = ttl
+        # key -> (audio bytes, time stored), least recently used first
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def get(self, text, voice, audio_format):
+        """
+        Look up synthesized audio.
+
+        Returns:
+            bytes or None: The cached audio, or None on a miss.
+        """
+        key = cache_key(text, voice, audio_format)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and not self._expired(entry[1]):
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry:
+                self._evict(key)
+
+        audio, stored_at = self._read_disk(key)
+        with self._lock:
+            if audio is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._store_memory(key, audio, stored_at)
+        return audio
+
+    def put(self, text, voice, audio_format, audio):
+        """Store synthesized audio in every enabled tier."""
+        key = cache_key(text, voice, audio_format)
+        with self._lock:
+            self._store_memory(key, audio, time.time())
+        self._write_disk(key, audio)
+
+    def prewarm(self, phrases, voice, audio_format, synthesize):
+        """
+        Make sure the given phrases are cached, synthesizing only the missing ones.
+
+        Args:
+            phrases (iterable[str]): Texts that are spoken often, e.g. greetings.
+            voice (str): The synthesis voice.
+            audio_format (str): The synthesis audio format.
+            synthesize (callable): Converts text into audio bytes on a miss.
+        """
+        for text in phrases:
+            if self.get(text, voice, audio_format) is None:
+                try:
+                    self.put(text, voice, audio_format, synthesize(text))
+                except Exception as e:
+                    logging.error(f"Failed to prewarm audio for '{text}': {e}")
+
+    def _expired(self, stored_at):
+        return self.ttl is not None and time.time() - stored_at > self.ttl
+
+    def _store_memory(self, key, audio, stored_at):
+        """Insert an entry in the memory tier and evict old entries beyond the cap."""
+        if key in self._memory:
+            self._evict(key)
+        self._memory[key] = (audio, stored_at)
+        self._memory_bytes += len(audio)
+        while self._memory_bytes > self.memory_max_bytes and len(self._memory) > 1:
+            self._evict(next(iter(self._memory)))
+
+    def _evict(self, key):
+        audio, _ = self._memory.pop(key)
+        self._memory_bytes -= len(audio)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.audio")
+
+    def _read_disk(self, key):
+        """
+        Read an entry from the disk tier, refreshing its access time for LRU eviction.
+
+        Returns:
+            tuple: The audio bytes and the time they were stored, or (None, None).
+        """
+        if not self.disk_dir:
+            return None, None
+        path = self._disk_path(key)
+        try:
+            stored_at = os.path.getmtime(path)
+            if self._expired(stored_at):
+                os.remove(path)
+                return None, None
+            with open(path, "rb") as f:
+                audio = f.read()
+            os.utime(path, (time.time(), stored_at))
+            return audio, stored_at
+        except FileNotFoundError:
+            return None, None
+
+    def _write_disk(self, key, audio):
+        """Atomically write an entry to the disk tier and enforce its size cap."""
+        if not self.disk_dir:
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(audio)
+        os.replace(tmp_path, self._disk_path(key))
+        self._enforce_disk_cap()
+
+    def _enforce_disk_cap(self):
+        """Remove the least recently used files until the disk tier fits its cap."""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.disk_dir):
+            if entry.name.endswith(".audio"):
+                stat = entry.stat()
+                entries.append((stat.st_atime, stat.st_size, entry.path))
+                total += stat.st_size
+        for _, size, path in sorted(entries):
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
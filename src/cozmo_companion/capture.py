@@ -0,0 +1,283 @@
+import asyncio
+import logging
+import threading
+import time
+import wave
+from collections import namedtuple
+
+from .ring_buffer import AudioRingBuffer
+
+# A captured chunk: its absolute position in the engine's ring and a view of its bytes
+CapturedChunk = namedtuple("CapturedChunk", ["position", "data"])
+
+
+class PyAudioDevice:
+    """Microphone input through PyAudio in callback mode."""
+
+    def __init__(self, rate, channels, chunk_size):
+        """
+        Initialize the device.
+
+        Args:
+            rate (int): Sample rate in Hz.
+            channels (int): Number of input channels.
+            chunk_size (int): Frames delivered per callback.
+        """
+        self.rate = rate
+        self.channels = channels
+        self.chunk_size = chunk_size
+        self._pyaudio = None
+        self._stream = None
+
+    def open(self, on_chunk):
+        """Open an input-only stream that calls `on_chunk` from PortAudio's thread."""
+        # Imported here so headless environments never need PortAudio
+        import pyaudio
+
+        def callback(in_data, frame_count, time_info, status):
+            on_chunk(in_data)
+            return None, pyaudio.paContinue
+
+        self._pyaudio = pyaudio.PyAudio()
+        self._stream = self._pyaudio.open(
+            format=pyaudio.paInt16,
+            channels=self.channels,
+            rate=self.rate,
+            input=True,
+            frames_per_buffer=self.chunk_size,
+            stream_callback=callback,
+        )
+        self._stream.start_stream()
+
+    def close(self):
+        """Stop the stream and release the audio backend."""
+        if self._stream is not None:
+            self._stream.stop_stream()
+            self._stream.close()
+            self._stream = None
+        if self._pyaudio is not None:
+            self._pyaudio.terminate()
+            self._pyaudio = None
+
+
+class FileCaptureDevice:
+    """
+    Fake microphone that replays WAV files, for headless runs and tests.
+
+    Queued files are played one after another from a dedicated thread, with
+    silence between and after them so silence detection can end each turn.
+    """
+
+    def __init__(self, rate, channels, chunk_size, paths=(), speed=1.0):
+        """
+        Initialize the device.
+
+        Args:
+            rate (int): Sample rate in Hz; files must already use this rate.
+            channels (int): Number of channels; files must already use this layout.
+            chunk_size (int): Frames delivered per chunk.
+            paths (iterable[str]): WAV files to queue immediately.
+            speed (float): Playback speed relative to real time; 0 delivers as fast as possible.
+        """
+        self.rate = rate
+        self.channels = channels
+        self.chunk_size = chunk_size
+        self.speed = speed
+        self._pending = list(paths)
+        self._lock = threading.Lock()
+        self._running = threading.Event()
+        self._thread = None
+
+    def queue_file(self, path):
+        """Queue a WAV file to be "spoken" after the ones already queued."""
+        with self._lock:
+            self._pending.append(path)
+
+    def open(self, on_chunk):
+        """Start the replay thread."""
+        self._running.set()
+        self._thread = threading.Thread(target=self._run, args=(on_chunk,), daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Stop the replay thread."""
+        self._running.clear()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _next_file(self):
+        with self._lock:
+            return self._pending.pop(0) if self._pending else None
+
+    def _run(self, on_chunk):
+        chunk_bytes = self.chunk_size * self.channels * 2
+        silence = bytes(chunk_bytes)
+        interval = self.chunk_size / self.rate / self.speed if self.speed else 0
+        next_tick = time.perf_counter()
+        while self._running.is_set():
+            path = self._next_file()
+            chunks = self._read_chunks(path, chunk_bytes) if path else [silence]
+            for chunk in chunks:
+                if not self._running.is_set():
+                    return
+                on_chunk(chunk)
+                # Pace delivery like a real sound card
+                next_tick += interval
+                delay = next_tick - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+    def _read_chunks(self, path, chunk_bytes):
+        """Read a WAV file as fixed-size chunks, padding the last one with silence."""
+        with wave.open(path, "rb") as wf:
+            if wf.getframerate() != self.rate or wf.getnchannels() != self.channels:
+                logging.error(
+                    f"Skipping {path}: expected {self.rate} Hz, {self.channels} channel audio"
+                )
+                return
+            data = wf.readframes(wf.getnframes())
+        for start in range(0, len(data), chunk_bytes):
+            yield data[start : start + chunk_bytes].ljust(chunk_bytes, b"\0")
+
+
+class NetworkCaptureDevice:
+    """
+    Audio input that arrives over a network connection instead of a sound card.
+
+    The connection handler passes whatever it receives to `feed`, which cuts
+    it into chunks of `chunk_size` frames for the capture engine.
+    """
+
+    def __init__(self, rate, channels, chunk_size):
+        """
+        Initialize the device.
+
+        Args:
+            rate (int): Sample rate in Hz the client sends.
+            channels (int): Number of channels the client sends.
+            chunk_size (int): Frames delivered per chunk.
+        """
+        self.rate = rate
+        self.channels = channels
+        self.chunk_size = chunk_size
+        self._on_chunk = None
+        self._pending = bytearray()
+
+    def open(self, on_chunk):
+        """Start delivering received audio to `on_chunk`."""
+        self._on_chunk = on_chunk
+
+    def close(self):
+        """Stop delivering audio and drop any partial chunk."""
+        self._on_chunk = None
+        self._pending.clear()
+
+    def feed(self, data):
+        """Deliver received 16-bit PCM of any length as whole chunks."""
+        # Audio received while the device is closed, e.g. during the greeting, is dropped
+        if self._on_chunk is None:
+            return
+        chunk_bytes = self.chunk_size * self.channels * 2
+        self._pending += data
+        while len(self._pending) >= chunk_bytes:
+            self._on_chunk(bytes(self._pending[:chunk_bytes]))
+            del self._pending[:chunk_bytes]
+
+
+class CaptureEngine:
+    """
+    Session-long audio capture feeding an asyncio event loop.
+
+    The device delivers chunks on its own thread; each chunk is written into
+    a preallocated ring buffer and its position is published to every
+    subscriber's asyncio queue, so the event loop never blocks on audio I/O.
+    """
+
+    def __init__(self, device, buffer_seconds=30):
+        """
+        Initialize the engine.
+
+        Args:
+            device: A `PyAudioDevice`, `FileCaptureDevice`, `NetworkCaptureDevice`
+                or compatible object.
+            buffer_seconds (float): Seconds of audio retained in the ring buffer.
+        """
+        self.device = device
+        chunk_bytes = device.chunk_size * device.channels * 2
+        self.buffer = AudioRingBuffer(
+            int(device.rate * buffer_seconds) * device.channels * 2, chunk_bytes
+        )
+        self._loop = None
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self.running = False
+
+    def start(self):
+        """Open the device; must be called from the event loop that consumes chunks."""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self.device.open(self._on_chunk)
+        self.running = True
+
+    def stop(self):
+        """Close the device and end every active subscription."""
+        if not self.running:
+            return
+        self.device.close()
+        self.running = False
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for queue in subscribers:
+            self._loop.call_soon_threadsafe(queue.put_nowait, None)
+
+    def _on_chunk(self, data):
+        """Store a chunk from the device thread and notify subscribers."""
+        with self._lock:
+            position = self.buffer.write(data)
+            subscribers = list(self._subscribers)
+        for queue in subscribers:
+            self._loop.call_soon_threadsafe(queue.put_nowait, position)
+
+    async def chunks(self, start=None):
+        """
+        Yield chunks captured from now on, optionally replaying retained audio first.
+
+        Args:
+            start (int, optional): Ring position to replay from, e.g. where the user
+                started talking over the bot; chunks no longer retained are skipped.
+
+        Yields:
+            CapturedChunk: The chunk's position in `buffer` and a memoryview of its bytes.
+        """
+        frame_size = self.buffer.frame_size
+        queue = asyncio.Queue()
+        with self._lock:
+            self._subscribers.add(queue)
+            # Chunks before this position are replayed from the ring, later ones arrive live
+            live_from = self.buffer.position if start is not None else 0
+        try:
+            if start is not None:
+                for position in range(
+                    max(start, self.buffer.oldest), live_from, frame_size
+                ):
+                    yield CapturedChunk(position, self._view(position))
+            while True:
+                position = await queue.get()
+                if position is None:
+                    return
+                if position < live_from:
+                    continue
+                view = self._view(position)
+                # A consumer that fell a whole ring behind has lost this chunk
+                if view is not None:
+                    yield CapturedChunk(position, view)
+        finally:
+            with self._lock:
+                self._subscribers.discard(queue)
+
+    def _view(self, position):
+        """Return a view of the chunk at the position, or None once it was overwritten."""
+        segments = self.buffer.segments(position, position + self.buffer.frame_size)
+        return segments[0] if segments else None
@@ -1,13 +1,31 @@
+import importlib.util
+
 import typer
-import asyncio
 
-# Importing the VoiceAssistant class from the assistant module
-from .assistant import VoiceAssistant
+# Only light modules are imported here; the assistant and its SDKs are loaded
+# by the commands that need them, so `cozmo --help` and `cozmo check` stay fast
+from .settings import (
+    BACKEND_PACKAGES,
+    OPTIONAL_PACKAGES,
+    SERVE_MAX_SESSIONS,
+    SERVE_PORT,
+    SERVE_WORKERS,
+    missing_settings,
+)
 
 # Initializing the Typer application for command-line interface
 app = typer.Typer()
 
 
+@app.callback(invoke_without_command=True)
+def main(ctx: typer.Context):
+    """
+    Converse with the companion; `cozmo` on its own starts a local session.
+    """
+    if ctx.invoked_subcommand is None:
+        converse()
+
+
 # Defining a command for the Typer application
 @app.command()
 def converse():
@@ -17,6 +35,10 @@ def converse():
     initiates its session. If interrupted with a keyboard command
     (like Ctrl+C), it provides a graceful exit message.
     """
+    import asyncio
+
+    from .assistant import VoiceAssistant
+
     # Creating an instance of the VoiceAssistant
     assistant = VoiceAssistant()
     try:
@@ -25,3 +47,64 @@ def converse():
     except KeyboardInterrupt:
         # Handling keyboard interrupt to gracefully exit the application
         print("\nClosing via keyboard interrupt.")
+
+
+@app.command()
+def serve(
+    host: str = "0.0.0.0",
+    port: int = SERVE_PORT,
+    max_sessions: int = SERVE_MAX_SESSIONS,
+    workers: int = SERVE_WORKERS,
+):
+    """
+    Serve many concurrent conversation sessions over TCP from one process.
+    Each connection streams microphone audio in and receives speech back;
+    the sessions share one set of service clients and one thread pool.
+    """
+    import asyncio
+
+    from .assistant import VoiceAssistant
+    from .server import CompanionServer
+
+    # Owns the service clients and speech cache that every session reuses
+    host_assistant = VoiceAssistant()
+    server = CompanionServer(
+        lambda device, player, user_id: VoiceAssistant(
+            shared=host_assistant,
+            capture_device=device,
+            play_audio=player,
+            user_id=user_id,
+            show_picture=player.show_picture,
+        ),
+        max_sessions=max_sessions,
+        workers=workers,
+    )
+    try:
+        asyncio.run(server.serve(host, port))
+    except KeyboardInterrupt:
+        print("\nClosing via keyboard interrupt.")
+    finally:
+        host_assistant.close_services()
+
+
+@app.command()
+def check():
+    """
+    Check the configuration and installed packages without starting a session.
+    Nothing is imported or contacted, so this is safe to run on any host.
+    """
+    missing = missing_settings()
+    for name in missing:
+        print(f"missing setting: {name}")
+    unavailable = []
+    for packages, required in ((BACKEND_PACKAGES, True), (OPTIONAL_PACKAGES, False)):
+        for package, purpose in packages.items():
+            # Finding a package does not import it
+            found = importlib.util.find_spec(package) is not None
+            status = "ok" if found else "missing" if required else "not installed"
+            print(f"{package:<12} {status:<14} {purpose}")
+            if required and not found:
+                unavailable.append(package)
+    if missing or unavailable:
+        raise typer.Exit(code=1)
+    print("Ready to converse.")
@@ -0,0 +1,256 @@
+import asyncio
+import logging
+import re
+import time
+
+# Tokens of recent turns kept verbatim; older turns are folded into the summary
+TOKEN_BUDGET = 1500
+# Upper bound on the rolling summary itself
+SUMMARY_TOKEN_BUDGET = 300
+# Rough size of an English token, close enough for budgeting without a tokenizer
+CHARS_PER_TOKEN = 4
+
+_FIRST_SENTENCE = re.compile(r"^(.+?[.!?])(\s|$)")
+
+
+def estimate_tokens(text):
+    """Estimate the number of model tokens in a piece of text."""
+    return max(1, len(text) // CHARS_PER_TOKEN) if text else 0
+
+
+class Turn:
+    """One exchange of the conversation: what the user said and what the bot answered."""
+
+    __slots__ = (
+        "index",
+        "user",
+        "reply",
+        "sentiment",
+        "interrupted",
+        "started",
+        "ended",
+        "tokens",
+    )
+
+    def __init__(
+        self,
+        index,
+        user,
+        reply=None,
+        sentiment=None,
+        interrupted=False,
+        started=None,
+        tokens=0,
+    ):
+        self.index = index
+        self.user = user
+        self.reply = reply
+        self.sentiment = sentiment
+        self.interrupted = interrupted
+        self.started = started if started is not None else time.time()
+        self.ended = time.time()
+        self.tokens = tokens
+
+    def transcript(self):
+        """Render the turn as prompt text."""
+        lines = [f"User: {self.user}"]
+        if self.reply:
+            suffix = " (interrupted by the user)" if self.interrupted else ""
+            lines.append(f"Companion: {self.reply}{suffix}")
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return f"Turn({self.index}, user={self.user!r}, reply={self.reply!r})"
+
+
+def extractive_summary(summary, turns, token_budget=SUMMARY_TOKEN_BUDGET):
+    """
+    Fold turns into a summary without a model call.
+
+    Keeps the first sentence of what the user said and the detected sentiment,
+    dropping the oldest lines once the summary exceeds its budget.
+
+    Args:
+        summary (str): The summary so far.
+        turns (list[Turn]): Turns to add, oldest first.
+        token_budget (int): Maximum estimated tokens of the result.
+
+    Returns:
+        str: The updated summary.
+    """
+    lines = summary.splitlines() if summary else []
+    for turn in turns:
+        match = _FIRST_SENTENCE.match(turn.user.strip())
+        said = match.group(1) if match else turn.user.strip()
+        mood = f" ({turn.sentiment.value.lower()})" if turn.sentiment else ""
+        lines.append(f"- The user said: {said}{mood}")
+    while len(lines) > 1 and estimate_tokens("\n".join(lines)) > token_budget:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+class ConversationHistory:
+    """
+    Token-budgeted record of the conversation with a rolling summary.
+
+    The most recent turns are kept verbatim while they fit the token budget;
+    older ones are evicted and later folded into a running summary, so the
+    context handed to the model stays bounded however long the session runs.
+
+    The store also tracks which turns live in the chatbot's current thread.
+    Once that thread holds more than the budget, `rotate_thread` reports a new
+    thread should be started, and `context` then carries the summary and the
+    recent turns the new thread has not seen.
+    """
+
+    def __init__(
+        self,
+        token_budget=TOKEN_BUDGET,
+        summarize=None,
+        count_tokens=estimate_tokens,
+    ):
+        """
+        Initialize the history.
+
+        Args:
+            token_budget (int): Estimated tokens of verbatim turns to keep.
+            summarize (callable, optional): Coroutine function taking the current
+                summary and a list of evicted turns and returning the new summary,
+                e.g. an LLM call. Defaults to `extractive_summary`.
+            count_tokens (callable): Estimates the tokens of a piece of text.
+        """
+        self.token_budget = token_budget
+        self.summarize = summarize
+        self.count_tokens = count_tokens
+        self.summary = ""
+        self.turns = []
+        self.window_tokens = 0
+        # Estimated tokens the chatbot's current thread holds, evicted turns included
+        self.thread_tokens = 0
+        self.total_turns = 0
+        self._evicted = []
+        self._thread_start = 0
+
+    def add(self, user, reply=None, sentiment=None, interrupted=False, started=None):
+        """
+        Record a finished turn, evicting the oldest turns beyond the budget.
+
+        Returns:
+            Turn: The new record.
+        """
+        turn = Turn(
+            self.total_turns,
+            user,
+            reply=reply,
+            sentiment=sentiment,
+            interrupted=interrupted,
+            started=started,
+        )
+        turn.tokens = self.count_tokens(turn.transcript())
+        self.total_turns += 1
+        self.turns.append(turn)
+        self.window_tokens += turn.tokens
+        self.thread_tokens += turn.tokens
+        # The newest turn always stays, even if it alone exceeds the budget
+        while len(self.turns) > 1 and self.window_tokens > self.token_budget:
+            evicted = self.turns.pop(0)
+            self.window_tokens -= evicted.tokens
+            self._evicted.append(evicted)
+        return turn
+
+    def restore(self, summary, turns, total_turns):
+        """
+        Resume a conversation from an earlier session.
+
+        The restored turns are not in the chatbot's new thread, so they reach
+        it through `context` along with the summary.
+
+        Args:
+            summary (str): The summary of the earlier sessions.
+            turns (list[Turn]): Their most recent turns, oldest first.
+            total_turns (int): Turns recorded so far; new turns are numbered from here.
+        """
+        self.summary = summary
+        self.turns = list(turns)
+        self.window_tokens = sum(turn.tokens for turn in self.turns)
+        self.thread_tokens = 0
+        self.total_turns = total_turns
+        self._evicted = []
+        self._thread_start = total_turns
+
+    @property
+    def needs_summary(self):
+        """Whether evicted turns are waiting to be folded into the summary."""
+        return bool(self._evicted)
+
+    async def summarize_evicted(self, local=False):
+        """
+        Fold evicted turns into the summary, falling back to an extractive one.
+
+        Args:
+            local (bool): Use the extractive summary even if a summarizer is set,
+                e.g. when the session is ending and cannot wait for a model.
+        """
+        if not self._evicted:
+            return
+        turns, self._evicted = self._evicted, []
+        if self.summarize is not None and not local:
+            try:
+                self.summary = await self.summarize(self.summary, turns)
+                return
+            except asyncio.CancelledError:
+                # The session is ending; keep the turns in the summary regardless
+                self.summary = extractive_summary(self.summary, turns)
+                raise
+            except Exception as e:
+                logging.error(f"Failed to summarize the conversation: {e}")
+        self.summary = extractive_summary(self.summary, turns)
+
+    def rotate_thread(self):
+        """
+        Start counting a new chatbot thread once the current one exceeds the budget.
+
+        Returns:
+            bool: True if the caller should switch the chatbot to a fresh thread.
+        """
+        if self.thread_tokens <= self.token_budget:
+            return False
+        self.new_thread()
+        return True
+
+    def new_thread(self):
+        """Start counting a new chatbot thread, holding none of the turns so far."""
+        self._thread_start = self.total_turns
+        self.thread_tokens = 0
+
+    def context(self):
+        """
+        Return what the model needs to know beyond its current thread.
+
+        Returns:
+            str: The summary and the recent turns from before the thread started,
+                or an empty string while the thread holds the whole conversation.
+        """
+        parts = []
+        if self.summary:
+            parts.append(f"Summary of the earlier conversation:\n{self.summary}")
+        earlier = self.turns[: self._thread_position()]
+        if earlier:
+            parts.append(
+                "Most recent exchanges before this thread:\n"
+                + "\n".join(turn.transcript() for turn in earlier)
+            )
+        return "\n\n".join(parts)
+
+    def _thread_position(self):
+        """Index into `turns` of the first turn in the current thread."""
+        for position, turn in enumerate(self.turns):
+            if turn.index >= self._thread_start:
+                return position
+        return len(self.turns)
+
+    def __len__(self):
+        return len(self.turns)
+
+    def __iter__(self):
+        return iter(self.turns)
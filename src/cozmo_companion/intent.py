@@ -0,0 +1,223 @@
+import difflib
+import logging
+import re
+from collections import Counter
+
+# Phrases that end the conversation when they end a short utterance, e.g. "ok bye"
+DEFAULT_EXIT_PHRASES = (
+    "got to go",
+    "gotta go",
+    "have to go",
+    "goodbye",
+    "good bye",
+    "bye",
+    "see you later",
+    "talk later",
+    "talk to you later",
+    "done for today",
+    "end conversation",
+    "end the conversation",
+    "end our conversation",
+    "good night",
+)
+
+# Phrases that only signal an exit when they make up the whole utterance,
+# e.g. "thanks" on its own versus "thanks for the joke, tell me another"
+STANDALONE_EXIT_PHRASES = (
+    "exit",
+    "stop",
+    "quit",
+    "thanks",
+    "thank you",
+    "that's all",
+    "i'm done",
+    "we're done",
+)
+
+# Words that may accompany a standalone phrase without changing its meaning
+FILLER_WORDS = frozenset(
+    "ok okay alright all right well so then now please for the that is it and "
+    "cozmo buddy friend robot very much a lot you".split()
+)
+
+# Words that suggest the user might want to leave; without any of them the
+# utterance is treated as a clear non-exit and the LLM is not consulted, so
+# the ways of leaving without saying goodbye ("i need to head out", "i have to
+# run", "off to bed") are listed too
+EXIT_SIGNAL_WORDS = frozenset(
+    "bye goodbye exit stop quit leave leaving end ending done go going gotta "
+    "later thanks thank finish finished enough night goodnight cya farewell "
+    "head heading out off run running jet bounce late sleep bed care soon ttyl "
+    "wrap sign signing log logging".split()
+)
+
+FUZZY_CUTOFF = 0.85
+
+# Words an exit phrase may follow and still be a clear exit, as in "i really
+# have to go"; in longer sentences such as "i never got to say goodbye" the
+# phrase is often about something else, so the LLM decides
+MAX_LEADING_WORDS = 2
+
+
+def normalize(text):
+    """Lowercase the text, drop apostrophes and collapse punctuation into single spaces."""
+    text = text.lower().replace("'", "").replace("’", "")
+    return " ".join(re.findall(r"[a-z0-9]+", text))
+
+
+class ExitIntentDetector:
+    """
+    Tiered detector for the user's intention to end the conversation.
+
+    Clear cases are resolved locally: known exit phrases ending a short
+    utterance, standalone phrases surrounded only by filler words, close
+    fuzzy matches to those and utterances containing no exit-related words
+    at all. Only ambiguous input falls through to the LLM check.
+    """
+
+    def __init__(
+        self,
+        llm_check,
+        phrases=DEFAULT_EXIT_PHRASES,
+        standalone_phrases=STANDALONE_EXIT_PHRASES,
+        extra_phrases=(),
+        fuzzy_cutoff=FUZZY_CUTOFF,
+    ):
+        """
+        Initialize the detector.
+
+        Args:
+            llm_check (callable): Fallback returning True if the input is an exit command.
+            phrases (iterable[str]): Phrases that signal an exit at the end of a
+                short input.
+            standalone_phrases (iterable[str]): Phrases that signal an exit only on their own.
+            extra_phrases (iterable[str]): Additional configured exit phrases.
+            fuzzy_cutoff (float): Minimum similarity ratio for a fuzzy phrase match.
+        """
+        self.llm_check = llm_check
+        self.phrases = [
+            normalize(phrase)
+            for phrase in list(phrases) + list(extra_phrases)
+            if normalize(phrase)
+        ]
+        self.standalone_phrases = [normalize(phrase) for phrase in standalone_phrases]
+        self.fuzzy_cutoff = fuzzy_cutoff
+        # Configured phrases contribute their words to the exit vocabulary
+        self.signal_words = EXIT_SIGNAL_WORDS.union(
+            word
+            for phrase in extra_phrases
+            for word in normalize(phrase).split()
+            if word not in FILLER_WORDS
+        )
+        # Memoizes the fuzzy signal-word lookup; conversational vocabulary is small
+        self._signal_word_cache = {}
+        # Counts how each call was resolved: "phrase", "standalone", "fuzzy", "no_signal" or "llm"
+        self.stats = Counter()
+
+    def __call__(self, user_input):
+        """
+        Decide whether the user wants to end the conversation.
+
+        Args:
+            user_input (str): The user's transcribed speech.
+
+        Returns:
+            bool: True if an exit intention is detected, otherwise False.
+        """
+        resolution, is_exit = self.classify_locally(user_input)
+        if resolution is None:
+            resolution, is_exit = "llm", bool(self.llm_check(user_input))
+        self.stats[resolution] += 1
+        logging.info(f"Exit intent {is_exit} resolved by {resolution}")
+        return is_exit
+
+    def classify_locally(self, user_input):
+        """
+        Try to resolve the exit intention without calling the LLM.
+
+        Returns:
+            tuple: The name of the rule that decided and its verdict, or (None, None)
+            if the input is ambiguous.
+        """
+        words = normalize(user_input).split()
+        # Filler is only dropped around the utterance, as phrases may contain filler words
+        core = _strip_fillers(words)
+        if any(_ends_short(core, phrase.split()) for phrase in self.phrases):
+            return "phrase", True
+
+        content = " ".join(word for word in words if word not in FILLER_WORDS)
+        if content in self.standalone_phrases:
+            return "standalone", True
+
+        signal_positions = [
+            index for index, word in enumerate(words) if self._is_signal_word(word)
+        ]
+        if not signal_positions:
+            return "no_signal", False
+
+        if self._fuzzy_match(core, content):
+            return "fuzzy", True
+        return None, None
+
+    @property
+    def short_circuited(self):
+        """Number of calls resolved without an LLM round trip."""
+        return sum(count for name, count in self.stats.items() if name != "llm")
+
+    def _fuzzy_match(self, core, content):
+        """Check the end of a short utterance against the phrases for near matches."""
+        if self._similar(content, self.standalone_phrases):
+            return True
+        for phrase in self.phrases:
+            size = len(phrase.split())
+            if len(core) - size > MAX_LEADING_WORDS:
+                continue
+            # Compare windows one word shorter and longer to tolerate split or merged words
+            for window in {max(size - 1, 1), size, size + 1}:
+                if window > len(core):
+                    continue
+                if self._similar(" ".join(core[-window:]), [phrase]):
+                    return True
+        return False
+
+    def _similar(self, candidate, phrases):
+        """Return True if the candidate is close to any of the phrases."""
+        for phrase in phrases:
+            # Short phrases like "bye" or "exit" are too easy to hit by accident
+            if len(phrase) < 6 or abs(len(candidate) - len(phrase)) > 3:
+                continue
+            matcher = difflib.SequenceMatcher(None, candidate, phrase)
+            # The cheap upper bounds rule out most candidates before the full ratio
+            if (
+                matcher.real_quick_ratio() >= self.fuzzy_cutoff
+                and matcher.quick_ratio() >= self.fuzzy_cutoff
+                and matcher.ratio() >= self.fuzzy_cutoff
+            ):
+                return True
+        return False
+
+    def _is_signal_word(self, word):
+        """Return True if the word is, or closely resembles, an exit-related word."""
+        if word in self.signal_words:
+            return True
+        if word not in self._signal_word_cache:
+            self._signal_word_cache[word] = len(word) >= 5 and bool(
+                difflib.get_close_matches(word, self.signal_words, n=1, cutoff=0.85)
+            )
+        return self._signal_word_cache[word]
+
+
+def _strip_fillers(words):
+    """Drop filler words from both ends of an utterance."""
+    start, end = 0, len(words)
+    while start < end and words[start] in FILLER_WORDS:
+        start += 1
+    while end > start and words[end - 1] in FILLER_WORDS:
+        end -= 1
+    return words[start:end]
+
+
+def _ends_short(words, phrase_words):
+    """Whether the phrase ends the utterance after at most `MAX_LEADING_WORDS` words."""
+    leading = len(words) - len(phrase_words)
+    return 0 <= leading <= MAX_LEADING_WORDS and words[leading:] == phrase_words
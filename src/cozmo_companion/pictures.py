@@ -0,0 +1,152 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .response_cache import normalize_utterance
+from .tracing import tracer
+
+# What the chatbot is told while the picture is being painted
+PAINTING_MESSAGE = "The picture is being painted and will open on its own when ready."
+ALREADY_PAINTING_MESSAGE = "That picture is already being painted."
+CACHED_MESSAGE = "The picture has been sent to the user."
+# Painted pictures' URLs stop working an hour after painting, so they are cached for less
+CACHE_TTL = 50 * 60
+
+
+class PictureService:
+    """
+    Paints pictures in the background and shows them when they are ready.
+
+    Requests return immediately so the reply that asked for the picture keeps
+    being spoken. At most `max_concurrent` pictures are painted at once,
+    later requests queue, and a picture that is not ready within `timeout`
+    seconds of being asked for is not shown. Painted pictures are cached by
+    prompt until their URL is about to expire, so asking again shows them
+    instantly. Each request may name who the picture is shown to, so one
+    service can paint for many sessions.
+    """
+
+    def __init__(
+        self,
+        paint,
+        deliver,
+        max_concurrent=2,
+        timeout=60.0,
+        cache_size=32,
+        cache_ttl=CACHE_TTL,
+    ):
+        """
+        Initialize the service.
+
+        Args:
+            paint (callable): Takes a prompt and returns the picture's URL; blocking.
+            deliver (callable): Shows a URL to the user, e.g. `webbrowser.open`, unless
+                a request names its own.
+            max_concurrent (int): Pictures painted at the same time.
+            timeout (float): Seconds after the request a picture may still be shown.
+            cache_size (int): Painted pictures remembered by prompt.
+            cache_ttl (float): Seconds a painted picture's URL is reused.
+        """
+        self.paint = paint
+        self.deliver = deliver
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.delivered = 0
+        self.timed_out = 0
+        self.failed = 0
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrent, thread_name_prefix="painter"
+        )
+        self._cache = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def request(self, prompt, deliver=None):
+        """
+        Start painting a picture for the prompt without waiting for it.
+
+        Args:
+            prompt (str): What to paint.
+            deliver (callable, optional): Shows the URL to whoever asked; defaults
+                to the service's `deliver`.
+
+        Returns:
+            str: A short status for the chatbot to relay.
+        """
+        deliver = deliver or self.deliver
+        key = normalize_utterance(prompt)
+        with self._lock:
+            url = self._cached(key)
+            if url is None:
+                if key in self._pending:
+                    future, recipients = self._pending[key]
+                    if deliver in recipients:
+                        return ALREADY_PAINTING_MESSAGE
+                    recipients.append(deliver)
+                    return PAINTING_MESSAGE
+                deadline = time.monotonic() + self.timeout
+                future = self._executor.submit(
+                    self._paint_and_deliver, key, prompt, deadline
+                )
+                self._pending[key] = (future, [deliver])
+                return PAINTING_MESSAGE
+        self._executor.submit(self._deliver, url, deliver)
+        return CACHED_MESSAGE
+
+    def wait(self, timeout=None):
+        """Block until the pictures requested so far are delivered or dropped."""
+        with self._lock:
+            pending = [future for future, _ in self._pending.values()]
+        for future in pending:
+            future.exception(timeout)
+
+    def close(self):
+        """Drop queued requests; pictures being painted finish in the background."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _cached(self, key):
+        """Return the cached URL for the key unless it is about to expire; needs the lock."""
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        url, expires = entry
+        if time.monotonic() >= expires:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return url
+
+    def _paint_and_deliver(self, key, prompt, deadline):
+        try:
+            with tracer.span("paint"):
+                url = self.paint(prompt)
+        except Exception as e:
+            with self._lock:
+                self._pending.pop(key, None)
+            self.failed += 1
+            logging.error(f"Failed to paint a picture of {prompt!r}: {e}")
+            return
+        painted = time.monotonic()
+        with self._lock:
+            _, recipients = self._pending.pop(key)
+            self._cache[key] = (url, painted + self.cache_ttl)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        if painted > deadline:
+            # The conversation has moved on; the picture is kept for the next request
+            self.timed_out += 1
+            logging.info(f"Picture of {prompt!r} took longer than {self.timeout}s")
+            return
+        for deliver in recipients:
+            self._deliver(url, deliver)
+
+    def _deliver(self, url, deliver):
+        try:
+            deliver(url)
+            self.delivered += 1
+        except Exception as e:
+            self.failed += 1
+            logging.error(f"Failed to show picture {url}: {e}")
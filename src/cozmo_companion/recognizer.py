@@ -0,0 +1,194 @@
+import logging
+import queue
+import threading
+import time
+
+from ibm_watson.websocket import AudioSource, RecognizeCallback
+
+
+class StreamingRecognizer:
+    """
+    Base class for speech recognizers that consume audio while the user is still speaking.
+
+    Audio chunks are pushed with `feed` as soon as they are captured, interim
+    hypotheses are reported as they arrive and the final transcript is returned
+    by `finish` once the end of speech has been signalled.
+    """
+
+    def __init__(self, on_interim=None):
+        """
+        Initialize the recognizer.
+
+        Args:
+            on_interim (callable, optional): Called with each interim hypothesis.
+        """
+        self.on_interim = on_interim
+        self.interim_results = []
+        # Seconds between the end-of-speech signal and the final transcript
+        self.finalize_latency = None
+
+    def start(self):
+        """Open the recognition stream before the first chunk is fed."""
+
+    def feed(self, chunk):
+        """Send a chunk of raw audio to the recognizer."""
+        raise NotImplementedError
+
+    def _finish(self, timeout):
+        """Signal end of speech and return the final transcript."""
+        raise NotImplementedError
+
+    def finish(self, timeout=None):
+        """
+        Signal end of speech and wait for the final transcript.
+
+        Args:
+            timeout (float, optional): Maximum seconds to wait for the final result.
+
+        Returns:
+            str or None: The final transcript, or None if nothing was recognized.
+        """
+        started = time.perf_counter()
+        transcript = self._finish(timeout)
+        self.finalize_latency = time.perf_counter() - started
+        logging.info(
+            f"Final transcript ready {self.finalize_latency * 1000:.0f} ms after end of speech"
+        )
+        return transcript or None
+
+    def _handle_interim(self, hypothesis):
+        """Record an interim hypothesis and forward it to the callback."""
+        self.interim_results.append(hypothesis)
+        if self.on_interim:
+            self.on_interim(hypothesis)
+
+
+class _WatsonCallback(RecognizeCallback):
+    """Routes Watson websocket events back to the owning recognizer."""
+
+    def __init__(self, recognizer):
+        super().__init__()
+        self.recognizer = recognizer
+
+    def on_data(self, data):
+        # Each message carries either an interim or a final result for the current phrase
+        for result in data.get("results", []):
+            alternatives = result.get("alternatives")
+            if not alternatives:
+                continue
+            transcript = alternatives[0]["transcript"]
+            if result.get("final"):
+                self.recognizer.final_results.append(transcript.strip())
+            else:
+                self.recognizer._handle_interim(transcript.strip())
+
+    def on_error(self, error):
+        logging.error(f"Streaming recognition failed: {error}")
+        self.recognizer.error = error
+        self.recognizer.done.set()
+
+    def on_inactivity_timeout(self, error):
+        logging.info(f"Streaming recognition timed out: {error}")
+
+    def on_close(self):
+        self.recognizer.done.set()
+
+
+class WatsonStreamingRecognizer(StreamingRecognizer):
+    """Streams audio to IBM Watson Speech to Text over its websocket interface."""
+
+    def __init__(self, service, content_type, on_interim=None, **recognize_kwargs):
+        """
+        Initialize the Watson streaming recognizer.
+
+        Args:
+            service (SpeechToTextV1): The initialized Watson Speech to Text service.
+            content_type (str): Content type of the raw audio chunks, e.g. `audio/l16; rate=44100`.
+            on_interim (callable, optional): Called with each interim hypothesis.
+            **recognize_kwargs: Extra options passed to `recognize_using_websocket`.
+        """
+        super().__init__(on_interim=on_interim)
+        self.service = service
+        self.content_type = content_type
+        self.recognize_kwargs = recognize_kwargs
+        self.final_results = []
+        self.error = None
+        self.done = threading.Event()
+        self._audio_queue = queue.Queue()
+        self._audio_source = AudioSource(
+            self._audio_queue, is_recording=True, is_buffer=True
+        )
+        self._thread = None
+
+    def start(self):
+        """Open the websocket in a background thread so audio can be fed immediately."""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        """Run the blocking websocket session until the service closes it."""
+        try:
+            self.service.recognize_using_websocket(
+                audio=self._audio_source,
+                content_type=self.content_type,
+                recognize_callback=_WatsonCallback(self),
+                interim_results=True,
+                **self.recognize_kwargs,
+            )
+        except Exception as e:
+            logging.error(f"Streaming recognition failed: {e}")
+            self.error = e
+        finally:
+            self.done.set()
+
+    def feed(self, chunk):
+        """Queue a chunk of audio for the websocket sender thread."""
+        self._audio_queue.put(bytes(chunk))
+
+    def _finish(self, timeout):
+        """Mark the recording complete and wait for the service to close the stream."""
+        self._audio_source.completed_recording()
+        if not self.done.wait(timeout):
+            logging.error("Timed out waiting for the final transcript")
+        return " ".join(self.final_results)
+
+
+class FakeStreamingRecognizer(StreamingRecognizer):
+    """
+    Offline recognizer that reveals a scripted transcript as audio arrives.
+
+    One more word of the transcript becomes an interim hypothesis every
+    `chunks_per_word` chunks, and the full transcript is returned after
+    `final_delay` seconds once `finish` is called.
+    """
+
+    def __init__(self, transcript, chunks_per_word=1, final_delay=0.0, on_interim=None):
+        """
+        Initialize the fake recognizer.
+
+        Args:
+            transcript (str): The text to "recognize".
+            chunks_per_word (int): Number of fed chunks needed to reveal each word.
+            final_delay (float): Simulated seconds between end of speech and the final result.
+            on_interim (callable, optional): Called with each interim hypothesis.
+        """
+        super().__init__(on_interim=on_interim)
+        self.words = transcript.split()
+        self.chunks_per_word = chunks_per_word
+        self.final_delay = final_delay
+        self.chunks_received = 0
+
+    def feed(self, chunk):
+        """Count the chunk and publish a longer hypothesis when a word boundary is reached."""
+        self.chunks_received += 1
+        if self.chunks_received % self.chunks_per_word == 0:
+            revealed = self.chunks_received // self.chunks_per_word
+            if revealed <= len(self.words):
+                self._handle_interim(" ".join(self.words[:revealed]))
+
+    def _finish(self, timeout):
+        """Return the scripted transcript if any audio was received."""
+        time.sleep(self.final_delay)
+        if not self.chunks_received:
+            return None
+        return " ".join(self.words)
@@ -1,43 +1,65 @@
+import asyncio
 import wave
-from array import array
 
-import pyaudio
+from .ring_buffer import AudioRingBuffer
+from .tracing import tracer
+from .vad import VoiceActivityDetector
 
 
 class Recorder:
     """Recorder class to capture audio with silence detection and a maximum recording duration."""
 
     # Constants defining the audio properties and thresholds
-    FORMAT = pyaudio.paInt16
+    SAMPLE_WIDTH = 2  # 16-bit samples
     RATE = 44100
     CHUNK_SIZE = 1024
-    THRESHOLD = 500
+    THRESHOLD = 200  # Minimum RMS energy for speech; the VAD adapts above it
     CHANNELS = 1
     SILENCE_THRESHOLD = 100  # Stop after consecutive silent chunks
+    PRE_ROLL_CHUNKS = 4  # Chunks kept before the detected speech onset
+    MAX_BUFFER_SECONDS = 30  # Upper bound on captured audio held in memory
 
-    def __init__(self, audio_file, record_seconds=5):
+    def __init__(self, audio_file, record_seconds=5, on_chunk=None, vad=None):
         """
         Initialize the recorder with target audio file and recording duration.
 
         Parameters:
-        - audio_file (str): Path to save the recorded audio.
+        - audio_file (str or file object): Path or writable binary file to save the
+          recorded audio to, e.g. an `io.BytesIO` to keep it in memory.
         - record_seconds (int): Maximum duration to record audio in seconds.
+        - on_chunk (callable): Optional callback receiving every captured chunk,
+          used to stream audio to a recognizer while recording.
+        - vad (VoiceActivityDetector): Optional detector; pass one in to keep its
+          learned noise floor across recordings.
         - is_recording (bool): Flag if recording is in progress
+        - buffer (AudioRingBuffer): Ring holding the captured audio; preallocated by
+          `record`, or shared with the capture engine by `record_async`.
         """
         self.audio_file = audio_file
         self.record_seconds = record_seconds
+        self.on_chunk = on_chunk
+        self.vad = vad or VoiceActivityDetector(min_threshold=self.THRESHOLD)
         self.is_recording = True
-
-    def _is_audio_loud(self, data_chunk):
-        """Check if the audio data is above the threshold.
-
-        Parameters:
-        - data_chunk (array): Array of audio data samples.
-
-        Returns:
-        - bool: True if audio is above the threshold, False otherwise.
-        """
-        return max(data_chunk) >= self.THRESHOLD
+        self.buffer = None
+        # Absolute buffer positions bounding this recording and the detected speech
+        self.first_position = None
+        self.speech_start = None
+        self.speech_end = None
+        self._silent_chunks = 0
+
+    def _allocate_buffer(self):
+        """Preallocate a ring large enough for the whole recording."""
+        chunk_bytes = self.CHUNK_SIZE * self.CHANNELS * self.SAMPLE_WIDTH
+        buffered_seconds = min(self.record_seconds, self.MAX_BUFFER_SECONDS)
+        self.buffer = AudioRingBuffer(
+            int(self.RATE * buffered_seconds) * self.CHANNELS * self.SAMPLE_WIDTH,
+            chunk_bytes,
+        )
+
+    @property
+    def max_chunks(self):
+        """Number of chunks in the maximum recording duration."""
+        return int(self.RATE / self.CHUNK_SIZE * self.record_seconds)
 
     def _is_prolonged_silence(self, silent_chunks):
         """Check if the number of silent chunks exceeds the silence threshold.
@@ -51,70 +73,138 @@ class Recorder:
         return silent_chunks >= self.SILENCE_THRESHOLD
 
     def record(self):
-        """Record audio for a specified duration and save to a file."""
+        """Record audio for a specified duration and save to a file.
+
+        This opens its own blocking input stream; long-running sessions should
+        share a `CaptureEngine` through `record_async` instead.
+        """
+        # Imported here so headless environments never need PortAudio
+        import pyaudio
+
         p = pyaudio.PyAudio()
-        frames = []
+        stream = None
+        self._allocate_buffer()
 
         try:
-            # Open a stream for audio recording
+            # Open an input-only stream for audio recording
             stream = p.open(
-                format=self.FORMAT,
+                format=pyaudio.paInt16,
                 channels=self.CHANNELS,
                 rate=self.RATE,
                 input=True,
-                output=True,
                 frames_per_buffer=self.CHUNK_SIZE,
             )
             # Record audio in chunks
-            self._record_audio_chunks(stream, frames)
+            with tracer.span("record"):
+                self._record_audio_chunks(stream)
             print("Recording Complete")
             # Save the recorded audio to a file
-            self._save_audio_to_file(p.get_sample_size(self.FORMAT), frames)
+            self._save_audio_to_file(self.SAMPLE_WIDTH, self.speech_segments())
 
         except Exception as e:
             print(f"Error while recording: {e}")
         finally:
             # Ensure stream is properly closed after recording
-            stream.stop_stream()
-            stream.close()
+            if stream is not None:
+                stream.stop_stream()
+                stream.close()
             p.terminate()
 
-    def _record_audio_chunks(self, stream, frames):
+    async def record_async(self, engine, start=None):
+        """Record from a running capture engine without blocking the event loop.
+
+        The recorder reads chunks straight out of the engine's ring buffer, so
+        the microphone stays open between turns and nothing is copied.
+
+        Parameters:
+        - engine (CaptureEngine): Started engine delivering chunks of `CHUNK_SIZE` frames.
+        - start (int): Optional ring position to record from, so speech that began
+          before recording started (e.g. over the bot's reply) is kept.
+        """
+        self.buffer = engine.buffer
+        chunks = engine.chunks(start)
+        with tracer.span("record") as span:
+            try:
+                count = 0
+                async for position, chunk in chunks:
+                    self._process_chunk(position, chunk)
+                    count += 1
+                    if not self.is_recording or count >= self.max_chunks:
+                        break
+            finally:
+                await chunks.aclose()
+            span.set(chunks=count)
+        print("Recording Complete")
+        # Copy the speech out of the shared ring before it can be overwritten
+        segments = [bytes(segment) for segment in self.speech_segments()]
+        await asyncio.to_thread(self._save_audio_to_file, self.SAMPLE_WIDTH, segments)
+
+    def _record_audio_chunks(self, stream):
         """Record audio in chunks for the specified duration or until prolonged silence.
 
+        Every chunk is written into the ring buffer, silent or not, so pauses
+        inside the utterance keep their real duration.
+
         Parameters:
         - stream (PyAudio Stream): Active audio stream for recording.
-        - frames (list): List to store audio frames.
         """
-        silent_chunks = 0
-        for _ in range(0, int(self.RATE / self.CHUNK_SIZE * self.record_seconds)):
+        if self.buffer is None:
+            self._allocate_buffer()
+        for _ in range(0, self.max_chunks):
             if not self.is_recording:
                 break
             data = stream.read(self.CHUNK_SIZE)
-            data_chunk = array("h", data)
-            # Check if the audio chunk is loud enough
-            if self._is_audio_loud(data_chunk):
-                print("Something Said")
-                frames.append(data)
-                silent_chunks = 0
-            else:
-                print("Nothing Said")
-                # If silent, keep track of consecutive silent chunks
-                silent_chunks += 1
-                if self._is_prolonged_silence(silent_chunks):
-                    print("Prolonged silence detected. Stopping recording.")
-                    self.is_recording = False
-
-    def _save_audio_to_file(self, sample_width, frames):
+            position = self.buffer.write(data)
+            # Consumers get a view of the chunk inside the ring instead of a copy
+            (chunk,) = self.buffer.segments(position)
+            self._process_chunk(position, chunk)
+
+    def _process_chunk(self, position, chunk):
+        """Track speech bounds and silence for one chunk already in the ring.
+
+        Parameters:
+        - position (int): Absolute ring position at which the chunk starts.
+        - chunk (memoryview): The chunk's audio.
+        """
+        if self.first_position is None:
+            self.first_position = position
+        # Forward every chunk, silent or not, so streaming consumers keep timing
+        if self.on_chunk:
+            self.on_chunk(chunk)
+        if self.vad.is_speech(chunk):
+            if self.speech_start is None:
+                pre_roll = self.PRE_ROLL_CHUNKS * self.buffer.frame_size
+                self.speech_start = max(position - pre_roll, self.first_position)
+            self.speech_end = position + len(chunk)
+            self._silent_chunks = 0
+        else:
+            # If silent, keep track of consecutive silent chunks
+            self._silent_chunks += 1
+            if self._is_prolonged_silence(self._silent_chunks):
+                print("Prolonged silence detected. Stopping recording.")
+                self.is_recording = False
+
+    def speech_segments(self):
+        """Return memoryview slices of the ring covering the detected speech.
+
+        Returns:
+        - list: Zero, one or two memoryview slices in chronological order.
+        """
+        if self.speech_start is None:
+            return []
+        return self.buffer.segments(self.speech_start, self.speech_end)
+
+    def _save_audio_to_file(self, sample_width, segments):
         """Save recorded audio data to a file.
 
         Parameters:
         - sample_width (int): Sample width (number of bytes) of the recorded audio.
-        - frames (list): List of recorded audio frames.
+        - segments (list): Memoryview slices of recorded audio, written without joining.
         """
         with wave.open(self.audio_file, "wb") as wf:
             wf.setnchannels(self.CHANNELS)
             wf.setsampwidth(sample_width)
             wf.setframerate(self.RATE)
-            wf.writeframes(b"".join(frames))
+            for segment in segments:
+                wf.writeframes(segment)
         print("Saving speech audio to file complete")
@@ -0,0 +1,174 @@
+import io
+import logging
+import wave
+from functools import lru_cache
+from math import gcd
+
+import numpy as np
+
+# Encodings speech can be uploaded or archived in, with their content types
+CONTENT_TYPES = {
+    "wav": "audio/wav",
+    "flac": "audio/flac",
+    "opus": "audio/ogg;codecs=opus",
+}
+# Sample rates the Opus codec supports
+OPUS_RATES = (8000, 12000, 16000, 24000, 48000)
+
+
+@lru_cache(maxsize=8)
+def polyphase_filter(from_rate, to_rate, zero_crossings=16, beta=8.0):
+    """
+    Design the filter bank resampling `from_rate` to `to_rate`.
+
+    Every output sample falls at one of `up` fractional offsets between two
+    input samples, so the windowed-sinc low-pass filter is evaluated once per
+    offset. Each row holds the taps applied to the input samples around it.
+
+    Args:
+        from_rate (int): Input rate in Hz.
+        to_rate (int): Output rate in Hz.
+        zero_crossings (int): Zero crossings of the sinc on each side of an output
+            sample; the filter spans more input samples the lower the cutoff.
+        beta (float): Kaiser window shape; higher trades transition width for
+            stopband attenuation.
+
+    Returns:
+        tuple: The (up, down) ratio and an array of shape (up, taps).
+    """
+    divisor = gcd(from_rate, to_rate)
+    up, down = to_rate // divisor, from_rate // divisor
+    # Cut off just below the lower of the two Nyquist frequencies
+    cutoff = 0.95 * min(1.0, up / down)
+    half_taps = int(np.ceil(zero_crossings / cutoff))
+    offsets = np.arange(-half_taps + 1, half_taps + 1)
+    fractions = np.arange(up)[:, None] / up
+    distance = offsets[None, :] - fractions
+    window = np.kaiser(2 * half_taps + 1, beta)
+    # The Kaiser window evaluated at each tap's distance from the output sample
+    taps = np.sinc(cutoff * distance) * np.interp(
+        distance, np.arange(-half_taps, half_taps + 1), window
+    )
+    # Unit gain at DC for every phase
+    taps /= taps.sum(axis=1, keepdims=True)
+    return (up, down), taps.astype(np.float32)
+
+
+def resample(samples, from_rate, to_rate):
+    """
+    Resample a mono or multi-channel signal with a polyphase filter.
+
+    The work is a handful of array operations over the whole signal, with
+    no per-sample Python.
+
+    Args:
+        samples (np.ndarray): Samples of shape (frames,) or (frames, channels).
+        from_rate (int): Rate of `samples` in Hz.
+        to_rate (int): Rate of the result in Hz.
+
+    Returns:
+        np.ndarray: float32 samples at `to_rate`, with the input's channel layout.
+    """
+    if from_rate == to_rate or not len(samples):
+        return np.asarray(samples, dtype=np.float32)
+    (up, down), taps = polyphase_filter(from_rate, to_rate)
+    half_taps = taps.shape[1] // 2
+    signal = np.asarray(samples, dtype=np.float32)
+    mono = signal.ndim == 1
+    if mono:
+        signal = signal[:, None]
+    frames = len(signal) * up // down
+    # Input sample just before each output sample, and the phase of its offset
+    steps = np.arange(frames, dtype=np.int64) * down
+    starts, phases = np.divmod(steps, up)
+    padded = np.pad(signal, ((half_taps - 1, half_taps), (0, 0)))
+    output = np.empty((frames, signal.shape[1]), dtype=np.float32)
+    for channel in range(signal.shape[1]):
+        windows = np.lib.stride_tricks.sliding_window_view(
+            padded[:, channel], taps.shape[1]
+        )
+        output[:, channel] = np.einsum("nk,nk->n", windows[starts], taps[phases])
+    return output[:, 0] if mono else output
+
+
+def resample_pcm16(pcm, channels, from_rate, to_rate):
+    """
+    Resample interleaved little-endian 16-bit PCM.
+
+    Returns:
+        bytes: The resampled PCM, clipped to the 16-bit range.
+    """
+    if from_rate == to_rate or not pcm:
+        return pcm
+    samples = np.frombuffer(pcm, dtype="<i2").reshape(-1, channels)
+    resampled = resample(samples, from_rate, to_rate)
+    return np.clip(np.round(resampled), -32768, 32767).astype("<i2").tobytes()
+
+
+def encode_audio(pcm, rate, channels, audio_format="wav"):
+    """
+    Encode 16-bit PCM as WAV, FLAC or Ogg Opus.
+
+    FLAC and Opus need the optional `soundfile` package (Opus also a
+    libsndfile built with it); without them the audio is encoded as WAV.
+
+    Returns:
+        tuple: The encoded bytes and the format actually used.
+    """
+    if audio_format not in CONTENT_TYPES:
+        raise ValueError(
+            f"Unknown audio format: {audio_format}. "
+            f"Expected one of {', '.join(CONTENT_TYPES)}."
+        )
+    if audio_format != "wav":
+        try:
+            return _encode_with_soundfile(pcm, rate, channels, audio_format)
+        except (ImportError, RuntimeError, ValueError) as e:
+            logging.error(f"Cannot encode {audio_format}, using WAV instead: {e}")
+    output = io.BytesIO()
+    with wave.open(output, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(pcm)
+    return output.getvalue(), "wav"
+
+
+def _encode_with_soundfile(pcm, rate, channels, audio_format):
+    # Optional dependency, only needed for compressed audio
+    import soundfile
+
+    if audio_format == "opus" and rate not in OPUS_RATES:
+        raise ValueError(f"Opus does not support {rate} Hz")
+    samples = np.frombuffer(pcm, dtype="<i2").reshape(-1, channels)
+    output = io.BytesIO()
+    if audio_format == "flac":
+        soundfile.write(output, samples, rate, format="FLAC", subtype="PCM_16")
+    else:
+        soundfile.write(output, samples, rate, format="OGG", subtype="OPUS")
+    return output.getvalue(), audio_format
+
+
+def convert_wav(wav, to_rate=None, audio_format="wav"):
+    """
+    Resample and re-encode a WAV recording.
+
+    Args:
+        wav (bytes): A 16-bit WAV file.
+        to_rate (int, optional): Target rate; None keeps the recording's rate.
+        audio_format (str): One of `CONTENT_TYPES`.
+
+    Returns:
+        tuple: The converted bytes and their content type.
+    """
+    with wave.open(io.BytesIO(wav), "rb") as wf:
+        channels, rate = wf.getnchannels(), wf.getframerate()
+        if wf.getsampwidth() != 2:
+            return wav, CONTENT_TYPES["wav"]
+        pcm = wf.readframes(wf.getnframes())
+    if audio_format == "wav" and (not to_rate or to_rate == rate):
+        return wav, CONTENT_TYPES["wav"]
+    if to_rate and to_rate != rate:
+        pcm, rate = resample_pcm16(pcm, channels, rate, to_rate), to_rate
+    encoded, used = encode_audio(pcm, rate, channels, audio_format)
+    return encoded, CONTENT_TYPES[used]
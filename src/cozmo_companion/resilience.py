@@ -0,0 +1,460 @@
+import asyncio
+import contextvars
+import logging
+import math
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Successful call latencies kept per service to place the hedging threshold
+LATENCY_WINDOW = 100
+# Threads per service running attempts that may have to be abandoned
+MAX_WORKERS = 8
+
+# Monotonic time by which the attempt running in this context must finish
+_attempt_deadline = contextvars.ContextVar("attempt_deadline", default=None)
+
+
+def remaining_time():
+    """
+    Seconds left for the remote call attempt running in this context.
+
+    HTTP clients cut their timeouts to it, so an attempt that was abandoned
+    also ends instead of holding on to its thread.
+
+    Returns:
+        float: The seconds left, or None outside of an attempt with a deadline.
+    """
+    deadline = _attempt_deadline.get()
+    return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+
+class RemoteCallError(Exception):
+    """A remote call failed for good: out of retries, out of time or circuit open."""
+
+    def __init__(self, service, message):
+        super().__init__(f"{service}: {message}")
+        self.service = service
+
+
+class CircuitOpenError(RemoteCallError):
+    """The service failed too often recently, so the call was not attempted."""
+
+
+def is_retryable(error):
+    """
+    Whether a failed call may succeed if it is simply made again.
+
+    Throttling (429), server errors (5xx), timeouts and connection failures
+    are; any other error means the request itself was wrong.
+    """
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(error, "code", None)
+    if isinstance(status, int) and not isinstance(error, OSError):
+        return status == 429 or status >= 500
+    return isinstance(error, (TimeoutError, OSError))
+
+
+class CircuitBreaker:
+    """
+    Stops calling a service that keeps failing, then lets one call probe it.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    calls are rejected at once. Once `reset_seconds` have passed, one call is
+    let through: the circuit closes if it succeeds and opens again if not.
+    """
+
+    def __init__(self, failure_threshold=5, reset_seconds=30.0):
+        """
+        Initialize the breaker.
+
+        Args:
+            failure_threshold (int): Consecutive failures that open the circuit.
+            reset_seconds (float): Seconds the circuit stays open before a probe.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        """One of "closed", "open" or "half-open"."""
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._probing or self._reset_due():
+                return "half-open"
+            return "open"
+
+    def allow(self):
+        """Return whether a call may be made now."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if not self._probing and self._reset_due():
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        """Close the circuit."""
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def release_probe(self):
+        """End a probe that was cancelled before it had a result, without counting it."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        """Count a failure, opening the circuit at the threshold or after a failed probe."""
+        with self._lock:
+            self.failures += 1
+            if self._opened_at is not None or self.failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logging.error(f"Circuit opened after {self.failures} failures")
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def _reset_due(self):
+        return time.monotonic() - self._opened_at >= self.reset_seconds
+
+
+class RemoteService:
+    """
+    Deadline, retries, hedged requests and a circuit breaker for one remote service.
+
+    A call gets `budget` seconds in total. Each attempt gets its share of
+    it; a failed or timed-out attempt is retried after a jittered
+    exponential backoff while retries and time remain. Once the service has
+    a latency history, an attempt still running past the `hedge_quantile`
+    latency is duplicated and whichever copy answers first wins. Only
+    idempotent calls should retry or hedge.
+
+    Without a budget, retries or hedging the call is made directly, so a
+    service can be left unprotected at no cost.
+    """
+
+    def __init__(
+        self,
+        name,
+        budget=None,
+        attempt_timeout=None,
+        retries=0,
+        backoff=0.2,
+        max_backoff=2.0,
+        hedge=False,
+        hedge_quantile=0.95,
+        min_samples=10,
+        breaker=None,
+        retry_on=is_retryable,
+        seed=None,
+    ):
+        """
+        Initialize the service policy.
+
+        Args:
+            name (str): Service name used in logs and errors.
+            budget (float, optional): Seconds a call may take in total.
+            attempt_timeout (float, optional): Seconds per attempt; defaults to
+                an equal share of the budget for every attempt.
+            retries (int): Attempts made after the first one fails.
+            backoff (float): Upper bound of the first retry's random delay; it
+                doubles with every retry up to `max_backoff`.
+            max_backoff (float): Largest upper bound of a retry delay.
+            hedge (bool): Duplicate attempts that run past the hedging latency.
+            hedge_quantile (float): Latency quantile after which an attempt is duplicated.
+            min_samples (int): Successful calls needed before hedging starts.
+            breaker (CircuitBreaker, optional): Rejects calls while the service is down.
+            retry_on (callable): Returns whether a failed attempt may be retried.
+            seed (int, optional): Seed of the backoff jitter, for repeatable tests.
+        """
+        self.name = name
+        self.budget = budget
+        if attempt_timeout is None and budget is not None:
+            attempt_timeout = budget / (retries + 1)
+        self.attempt_timeout = attempt_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.min_samples = min_samples
+        self.breaker = breaker
+        self.retry_on = retry_on
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.stats = dict.fromkeys(
+            ("calls", "retries", "hedges", "hedge_wins", "failures", "rejected"), 0
+        )
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def hedge_delay(self):
+        """Seconds after which an attempt is duplicated, or None if it is not."""
+        if not self.hedge:
+            return None
+        with self._lock:
+            latencies = sorted(self.latencies)
+        if len(latencies) < self.min_samples:
+            return None
+        # Nearest rank, so a single outlier in twenty calls is above the p95
+        return latencies[max(0, math.ceil(self.hedge_quantile * len(latencies)) - 1)]
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Call a blocking function under the service's policy.
+
+        Returns:
+            The function's result.
+
+        Raises:
+            CircuitOpenError: If the circuit is open.
+            RemoteCallError: If every attempt failed or the budget ran out.
+            Exception: A non-retryable error raised by the function.
+        """
+        deadline = self._start()
+        attempt = 0
+        try:
+            while True:
+                try:
+                    result = self._attempt(fn, args, kwargs, self._timeout(deadline))
+                except Exception as e:
+                    delay = self._retry_delay(e, attempt, deadline)
+                    attempt += 1
+                    self._count("retries")
+                    time.sleep(delay)
+                    continue
+                self._succeeded()
+                return result
+        except BaseException:
+            self._release_probe()
+            raise
+
+    async def call_async(self, fn, *args, **kwargs):
+        """
+        Await a coroutine function under the service's policy.
+
+        `fn` is called again for every attempt, so each one gets a fresh coroutine.
+
+        Returns:
+            The coroutine's result.
+
+        Raises:
+            CircuitOpenError: If the circuit is open.
+            RemoteCallError: If every attempt failed or the budget ran out.
+            Exception: A non-retryable error raised by the coroutine.
+        """
+        deadline = self._start()
+        attempt = 0
+        try:
+            while True:
+                try:
+                    result = await self._attempt_async(
+                        fn, args, kwargs, self._timeout(deadline)
+                    )
+                except Exception as e:
+                    delay = self._retry_delay(e, attempt, deadline)
+                    attempt += 1
+                    self._count("retries")
+                    await asyncio.sleep(delay)
+                    continue
+                self._succeeded()
+                return result
+        except BaseException:
+            # A cancelled probe would otherwise keep the circuit half-open for good
+            self._release_probe()
+            raise
+
+    def _start(self):
+        """Count the call, check the breaker and return the call's deadline."""
+        self._count("calls")
+        if self.breaker is not None and not self.breaker.allow():
+            self._count("rejected")
+            raise CircuitOpenError(self.name, "circuit open after repeated failures")
+        return None if self.budget is None else time.monotonic() + self.budget
+
+    def _timeout(self, deadline):
+        """Seconds the next attempt may take, or None if it is unbounded."""
+        limits = [self.attempt_timeout] if self.attempt_timeout is not None else []
+        if deadline is not None:
+            limits.append(deadline - time.monotonic())
+        return min(limits) if limits else None
+
+    def _retry_delay(self, error, attempt, deadline):
+        """
+        Return how long to wait before retrying a failed attempt.
+
+        Raises:
+            RemoteCallError: If the call may not be retried.
+        """
+        if not isinstance(error, TimeoutError) and not self.retry_on(error):
+            # The service answered, so it is up; the request itself was wrong
+            self._succeeded()
+            raise error
+        # Full jitter keeps sessions that failed together from retrying together
+        delay = self._random.uniform(
+            0, min(self.max_backoff, self.backoff * 2**attempt)
+        )
+        out_of_time = deadline is not None and time.monotonic() + delay >= deadline
+        if attempt >= self.retries or out_of_time:
+            self._count("failures")
+            if self.breaker is not None:
+                self.breaker.record_failure()
+            reason = "out of time" if out_of_time else f"{attempt + 1} attempts"
+            raise RemoteCallError(self.name, f"failed ({reason}): {error!r}") from error
+        logging.info(f"Retrying {self.name} in {delay * 1000:.0f} ms after {error!r}")
+        return delay
+
+    def _succeeded(self):
+        if self.breaker is not None:
+            self.breaker.record_success()
+
+    def _release_probe(self):
+        if self.breaker is not None:
+            self.breaker.release_probe()
+
+    def _attempt(self, fn, args, kwargs, timeout):
+        """Make one attempt, hedged if it runs long; raises TimeoutError past `timeout`."""
+        hedge_after = self.hedge_delay()
+        if timeout is None and hedge_after is None:
+            started = time.perf_counter()
+            result = fn(*args, **kwargs)
+            self._record(time.perf_counter() - started)
+            return result
+        if timeout is not None and timeout <= 0:
+            raise TimeoutError(f"{self.name} is out of time")
+        started = time.monotonic()
+        end = None if timeout is None else started + timeout
+        primary = self._submit(fn, args, kwargs, end)
+        pending = {primary}
+        hedged = hedge_after is None
+        error = None
+        while pending:
+            wait_until = end
+            if not hedged:
+                hedge_at = started + hedge_after
+                wait_until = hedge_at if end is None else min(end, hedge_at)
+            remaining = None if wait_until is None else wait_until - time.monotonic()
+            done, pending = wait(
+                pending,
+                timeout=None if remaining is None else max(0.0, remaining),
+                return_when=FIRST_COMPLETED,
+            )
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    if future is not primary:
+                        self._count("hedge_wins")
+                    return future.result()
+                error = future.exception()
+            if done:
+                continue
+            if end is not None and time.monotonic() >= end:
+                for future in pending:
+                    future.cancel()
+                raise TimeoutError(f"{self.name} took longer than {timeout:.2f} s")
+            hedged = True
+            self._count("hedges")
+            pending.add(self._submit(fn, args, kwargs, end))
+        raise error
+
+    async def _attempt_async(self, fn, args, kwargs, timeout):
+        """The coroutine counterpart of `_attempt`."""
+        hedge_after = self.hedge_delay()
+        if timeout is not None and timeout <= 0:
+            raise TimeoutError(f"{self.name} is out of time")
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        end = None if timeout is None else started + timeout
+        primary = asyncio.ensure_future(self._timed_async(fn, args, kwargs, end))
+        pending = {primary}
+        hedged = hedge_after is None
+        error = None
+        try:
+            while pending:
+                wait_until = end
+                if not hedged:
+                    hedge_at = started + hedge_after
+                    wait_until = hedge_at if end is None else min(end, hedge_at)
+                remaining = None if wait_until is None else wait_until - loop.time()
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=None if remaining is None else max(0.0, remaining),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self._count("hedge_wins")
+                        return task.result()
+                    error = task.exception()
+                if done:
+                    continue
+                if end is not None and loop.time() >= end:
+                    raise TimeoutError(f"{self.name} took longer than {timeout:.2f} s")
+                hedged = True
+                self._count("hedges")
+                pending.add(
+                    asyncio.ensure_future(self._timed_async(fn, args, kwargs, end))
+                )
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _submit(self, fn, args, kwargs, end):
+        """Run an attempt on the service's threads, recording its latency if it succeeds."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=MAX_WORKERS, thread_name_prefix=f"remote-{self.name}"
+                )
+        submitted = time.perf_counter()
+
+        def record(future):
+            if not future.cancelled() and future.exception() is None:
+                self._record(time.perf_counter() - submitted)
+
+        # The copied context keeps spans opened by the call attached to the turn
+        future = self._executor.submit(
+            contextvars.copy_context().run, _run_until, end, fn, args, kwargs
+        )
+        future.add_done_callback(record)
+        return future
+
+    async def _timed_async(self, fn, args, kwargs, end):
+        # Each task runs in its own copy of the context
+        _attempt_deadline.set(None if end is None else _monotonic_deadline(end))
+        started = time.perf_counter()
+        result = await fn(*args, **kwargs)
+        self._record(time.perf_counter() - started)
+        return result
+
+    def _record(self, seconds):
+        with self._lock:
+            self.latencies.append(seconds)
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+
+def _run_until(end, fn, args, kwargs):
+    """Run an attempt with its deadline visible to `remaining_time`."""
+    _attempt_deadline.set(end)
+    return fn(*args, **kwargs)
+
+
+def _monotonic_deadline(loop_time):
+    """Convert a deadline on the running loop's clock to `time.monotonic`."""
+    return time.monotonic() + loop_time - asyncio.get_running_loop().time()
@@ -0,0 +1,157 @@
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+# Size of the hashed character-trigram vectors used for near-duplicate matching
+EMBEDDING_DIMENSIONS = 1024
+
+_NON_WORD = re.compile(r"[^\w\s']+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_utterance(text):
+    """Lowercase a transcript and strip punctuation and extra whitespace."""
+    return _WHITESPACE.sub(" ", _NON_WORD.sub(" ", text.lower())).strip()
+
+
+def trigram_embedding(text, dimensions=EMBEDDING_DIMENSIONS):
+    """
+    Embed text as a unit vector of hashed character trigram counts.
+
+    Cheap and local: close paraphrases such as "how are you" and "how are you
+    today" share most trigrams, while unrelated sentences share few.
+    """
+    padded = f"  {text} "
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for start in range(len(padded) - 2):
+        vector[zlib.crc32(padded[start : start + 3].encode()) % dimensions] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class CachedReply:
+    """A cached reply and how often it was served."""
+
+    __slots__ = ("text", "created", "hits", "vector")
+
+    def __init__(self, text, vector=None):
+        self.text = text
+        self.created = time.monotonic()
+        self.hits = 0
+        self.vector = vector
+
+
+class ResponseCache:
+    """
+    LRU cache of chatbot replies keyed by what the user said and their mood.
+
+    Lookups match the normalized transcript exactly, or, with a similarity
+    threshold set, the closest cached utterance for the same mood whose
+    embedding is at least that similar. Entries expire after `ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        max_entries=256,
+        ttl=None,
+        similarity_threshold=None,
+        embed=trigram_embedding,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries (int): Replies kept; the least recently used is evicted first.
+            ttl (float, optional): Seconds a reply stays valid; None keeps it until evicted.
+            similarity_threshold (float, optional): Cosine similarity from 0 to 1 at which
+                a different utterance counts as the same; None matches exactly only.
+            embed (callable): Maps a normalized utterance to a unit vector.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.embed = embed
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        # Per mood: the keys and stacked vectors searched for near-duplicates
+        self._index = {}
+        self._lock = threading.Lock()
+
+    def get(self, utterance, mood=None):
+        """
+        Return a cached reply for the utterance in the given mood, or None.
+
+        Args:
+            utterance (str): What the user said.
+            mood (Hashable, optional): The user's current sentiment.
+        """
+        text = normalize_utterance(utterance)
+        with self._lock:
+            key = (mood, text)
+            entry = self._live_entry(key)
+            if entry is None and self.similarity_threshold is not None:
+                key = self._nearest_key(mood, text)
+                entry = self._live_entry(key) if key is not None else None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            entry.hits += 1
+            self.hits += 1
+            return entry.text
+
+    def put(self, utterance, reply, mood=None):
+        """Cache the reply given to the utterance in the given mood."""
+        text = normalize_utterance(utterance)
+        if not text or not reply:
+            return
+        vector = self.embed(text) if self.similarity_threshold is not None else None
+        with self._lock:
+            key = (mood, text)
+            self._entries[key] = CachedReply(reply, vector)
+            self._entries.move_to_end(key)
+            self._index.pop(mood, None)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._index.pop(evicted[0], None)
+
+    def entries(self):
+        """Return (mood, utterance, reply, hits) for every entry, most recently used last."""
+        with self._lock:
+            return [
+                (mood, text, entry.text, entry.hits)
+                for (mood, text), entry in self._entries.items()
+            ]
+
+    def _live_entry(self, key):
+        """Return the entry for the key unless it is missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self.ttl is not None and time.monotonic() - entry.created > self.ttl:
+            del self._entries[key]
+            self._index.pop(key[0], None)
+            return None
+        return entry
+
+    def _nearest_key(self, mood, text):
+        """Return the key of the most similar cached utterance above the threshold."""
+        index = self._index.get(mood)
+        if index is None:
+            keys = [key for key in self._entries if key[0] == mood]
+            if not keys:
+                return None
+            index = (keys, np.stack([self._entries[key].vector for key in keys]))
+            self._index[mood] = index
+        keys, vectors = index
+        similarities = vectors @ self.embed(text)
+        best = int(np.argmax(similarities))
+        return keys[best] if similarities[best] >= self.similarity_threshold else None
+
+    def __len__(self):
+        return len(self._entries)
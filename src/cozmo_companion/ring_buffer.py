@@ -0,0 +1,90 @@
+class AudioRingBuffer:
+    """
+    Fixed-capacity, preallocated byte ring for captured audio.
+
+    Capture writes into the ring in place and consumers read it back as
+    memoryview slices, so audio can be handed to the VAD, a streaming
+    recognizer or a WAV writer without building intermediate copies. Once the
+    ring is full the oldest audio is overwritten, keeping memory bounded.
+
+    Positions are absolute byte offsets since the ring was created, which lets
+    consumers remember where they stopped reading while the ring wraps around.
+    """
+
+    def __init__(self, capacity, frame_size=1):
+        """
+        Initialize the ring buffer.
+
+        Args:
+            capacity (int): Size of the ring in bytes; rounded up to a multiple of
+                `frame_size` so fixed-size chunks never straddle the wrap point.
+            frame_size (int): Size in bytes of the chunks that will be written.
+        """
+        self.frame_size = frame_size
+        self.capacity = -(-capacity // frame_size) * frame_size
+        self._buffer = bytearray(self.capacity)
+        self._view = memoryview(self._buffer)
+        # Absolute number of bytes ever written
+        self.position = 0
+
+    def __len__(self):
+        """Number of bytes currently retained."""
+        return min(self.position, self.capacity)
+
+    @property
+    def oldest(self):
+        """Absolute position of the oldest retained byte."""
+        return self.position - len(self)
+
+    def write(self, data):
+        """
+        Copy data into the ring, overwriting the oldest bytes when full.
+
+        Args:
+            data (bytes-like): The audio to append.
+
+        Returns:
+            int: The absolute position at which the data starts.
+        """
+        data = memoryview(data).cast("B")
+        start = self.position
+        if len(data) > self.capacity:
+            # Only the newest bytes fit; skip ahead as if the rest had wrapped out
+            skipped = len(data) - self.capacity
+            data = data[skipped:]
+            self.position += skipped
+        offset = self.position % self.capacity
+        first = min(len(data), self.capacity - offset)
+        self._view[offset : offset + first] = data[:first]
+        self._view[: len(data) - first] = data[first:]
+        self.position += len(data)
+        return start
+
+    def segments(self, start=None, end=None):
+        """
+        Return the audio between two absolute positions as memoryview slices.
+
+        Args:
+            start (int, optional): First position to include; clamped to the oldest
+                retained byte. Defaults to the oldest retained byte.
+            end (int, optional): Position just past the last byte. Defaults to the
+                newest byte.
+
+        Returns:
+            list[memoryview]: One or two slices, in order, referencing the ring directly.
+            They stay valid until the covered bytes are overwritten.
+        """
+        start = self.oldest if start is None else max(start, self.oldest)
+        end = self.position if end is None else min(end, self.position)
+        if end <= start:
+            return []
+        first_offset = start % self.capacity
+        length = end - start
+        if first_offset + length <= self.capacity:
+            return [self._view[first_offset : first_offset + length]]
+        first = self.capacity - first_offset
+        return [self._view[first_offset:], self._view[: length - first]]
+
+    def clear(self):
+        """Drop all retained audio without releasing the preallocated memory."""
+        self.position = 0
@@ -0,0 +1,360 @@
+import logging
+import math
+import queue
+import re
+import threading
+from concurrent.futures import Future
+from typing import NamedTuple
+
+# Opinion words scored from -4 (most negative) to 4 (most positive), on VADER's scale
+LEXICON = {
+    # Positive
+    "amazing": 2.8,
+    "awesome": 3.1,
+    "beautiful": 2.9,
+    "best": 3.2,
+    "better": 1.9,
+    "brilliant": 2.8,
+    "calm": 1.3,
+    "celebrate": 2.7,
+    "cheer": 2.3,
+    "cheerful": 2.5,
+    "comfortable": 1.5,
+    "confident": 2.2,
+    "cool": 1.3,
+    "delighted": 2.8,
+    "enjoy": 2.2,
+    "enjoyed": 2.3,
+    "excited": 2.2,
+    "exciting": 2.2,
+    "fantastic": 2.6,
+    "fun": 2.3,
+    "funny": 1.9,
+    "glad": 2.0,
+    "good": 1.9,
+    "grateful": 2.0,
+    "great": 3.1,
+    "happier": 2.4,
+    "happy": 2.7,
+    "haha": 2.0,
+    "help": 1.7,
+    "helped": 1.7,
+    "helpful": 1.8,
+    "helps": 1.6,
+    "hope": 1.9,
+    "hopeful": 2.3,
+    "laugh": 2.6,
+    "like": 1.5,
+    "liked": 1.8,
+    "love": 3.2,
+    "loved": 2.9,
+    "lovely": 2.8,
+    "lucky": 1.8,
+    "nice": 1.8,
+    "perfect": 2.7,
+    "pleased": 1.9,
+    "proud": 2.1,
+    "relaxed": 2.2,
+    "relieved": 1.6,
+    "smile": 1.5,
+    "thank": 1.5,
+    "thanks": 1.9,
+    "win": 2.8,
+    "wonderful": 2.7,
+    "yay": 2.4,
+    # Negative
+    "afraid": -2.2,
+    "angry": -2.3,
+    "annoyed": -1.6,
+    "annoying": -1.8,
+    "anxious": -1.0,
+    "ashamed": -2.1,
+    "awful": -2.0,
+    "bad": -2.5,
+    "bored": -1.1,
+    "boring": -1.3,
+    "broke": -1.8,
+    "broken": -2.1,
+    "cry": -2.1,
+    "crying": -2.1,
+    "depressed": -2.3,
+    "disappointed": -1.9,
+    "disappointing": -2.2,
+    "exhausted": -1.5,
+    "exhausting": -1.5,
+    "fail": -2.5,
+    "failed": -2.3,
+    "fear": -2.2,
+    "frustrated": -2.4,
+    "frustrating": -1.9,
+    "hard": -0.4,
+    "hate": -2.7,
+    "horrible": -2.5,
+    "hurt": -2.4,
+    "lonely": -2.0,
+    "lost": -1.3,
+    "mad": -2.2,
+    "miserable": -2.2,
+    "miss": -0.6,
+    "nervous": -1.1,
+    "overwhelmed": -1.5,
+    "pain": -2.3,
+    "problem": -1.7,
+    "sad": -2.1,
+    "scared": -1.9,
+    "sick": -2.3,
+    "sorry": -0.3,
+    "stress": -1.8,
+    "stressed": -1.4,
+    "stressful": -2.3,
+    "struggling": -1.5,
+    "terrible": -2.1,
+    "tired": -1.9,
+    "ugh": -1.8,
+    "unhappy": -1.8,
+    "upset": -1.6,
+    "worried": -1.2,
+    "worse": -2.1,
+    "worst": -3.1,
+    "wrong": -2.1,
+}
+# Intensifiers and downtoners, added to the score of the opinion word after them
+BOOSTERS = {
+    "absolutely": 0.293,
+    "completely": 0.293,
+    "extremely": 0.293,
+    "incredibly": 0.293,
+    "really": 0.293,
+    "so": 0.293,
+    "super": 0.293,
+    "totally": 0.293,
+    "very": 0.293,
+    "barely": -0.293,
+    "kinda": -0.293,
+    "little": -0.293,
+    "slightly": -0.293,
+    "somewhat": -0.293,
+}
+NEGATIONS = {"no", "not", "never", "nothing", "nobody", "none", "nor", "hardly"}
+# Opinion words within this many words after a negation are negated
+NEGATION_WINDOW = 3
+# A negated word keeps a weaker score of the opposite sign ("not bad" is mildly good)
+NEGATION_SCALAR = -0.74
+# What follows "but" outweighs what comes before it
+BEFORE_BUT, AFTER_BUT = 0.5, 1.5
+# Squashes the summed scores into -1..1
+NORMALIZATION = 15
+# Scores closer to zero than this are neutral
+NEUTRAL_BAND = 0.05
+# A score this far from neutral is a confident one, if its opinion words agree
+CONFIDENT_SCORE = 0.4
+# Confidence that an utterance without opinion words is neutral; none, since
+# "my dog died" has no opinion word either, so the LLM classifier decides
+NO_OPINION_CONFIDENCE = 0.0
+# Score of each label from a classifier that only returns the label
+LABEL_SCORES = {"POSITIVE": 0.6, "NEUTRAL": 0.0, "NEGATIVE": -0.6}
+
+_WORD = re.compile(r"[a-z]+(?:'[a-z]+)?")
+# Marks the end of the batcher's queue
+_CLOSE = object()
+
+
+class SentimentScore(NamedTuple):
+    """The sentiment of one utterance."""
+
+    # "POSITIVE", "NEGATIVE" or "NEUTRAL", the values of the assistant's `Sentiment`
+    label: str
+    # From -1 (most negative) to 1 (most positive)
+    score: float
+    # From 0 to 1
+    confidence: float
+    source: str = "lexicon"
+
+    @classmethod
+    def from_label(cls, label, source):
+        """Score a label from a classifier that gives no score of its own."""
+        return cls(label, LABEL_SCORES[label], 1.0, source)
+
+
+def label_for(score):
+    """Return the label of a score from -1 to 1."""
+    if score >= NEUTRAL_BAND:
+        return "POSITIVE"
+    if score <= -NEUTRAL_BAND:
+        return "NEGATIVE"
+    return "NEUTRAL"
+
+
+def smooth_mood(mood, score, smoothing):
+    """
+    Fold an utterance's score into the exponentially smoothed mood.
+
+    Args:
+        mood (float): The mood so far, from -1 to 1.
+        score (float): The new utterance's score, from -1 to 1.
+        smoothing (float): Weight of the new score, from 0 (mood never moves)
+            to 1 (mood is the latest score).
+    """
+    return (1 - smoothing) * mood + smoothing * score
+
+
+def load_lexicon(path):
+    """
+    Read a lexicon in VADER's format: per line a word, a tab and its score from -4 to 4.
+
+    Columns after the score are ignored, so VADER's own `vader_lexicon.txt`
+    can be used as it is.
+    """
+    lexicon = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            columns = line.rstrip("\n").split("\t")
+            if len(columns) >= 2 and columns[0] and not line.startswith("#"):
+                lexicon[columns[0].lower()] = float(columns[1])
+    logging.info(f"Loaded {len(lexicon)} sentiment words from {path}")
+    return lexicon
+
+
+class LexiconSentiment:
+    """
+    Rule-based sentiment scoring with a lexicon of opinion words, after VADER.
+
+    An opinion word's score is raised or lowered by an intensifier right
+    before it ("really good"), weakened and flipped by a negation shortly
+    before it ("not good"), and outweighed by what follows a "but". The sum
+    is squashed into -1..1. Scoring takes microseconds and needs no network.
+
+    Confidence is low when the opinion words disagree or the score is weak,
+    and zero when there are none, which is where an LLM classifier still
+    does better.
+    """
+
+    name = "lexicon"
+
+    def __init__(self, lexicon=None):
+        """
+        Initialize the analyzer.
+
+        Args:
+            lexicon (dict, optional): Word scores from -4 to 4; defaults to `LEXICON`.
+        """
+        self.lexicon = LEXICON if lexicon is None else lexicon
+
+    def score(self, text):
+        """
+        Score one utterance.
+
+        Returns:
+            SentimentScore: The label, score and confidence.
+        """
+        words = _WORD.findall(text.lower())
+        but = words.index("but") if "but" in words else None
+        valences = []
+        for index, word in enumerate(words):
+            valence = self.lexicon.get(word)
+            if not valence:
+                continue
+            if index and words[index - 1] in BOOSTERS:
+                boost = BOOSTERS[words[index - 1]]
+                valence += boost if valence > 0 else -boost
+            if any(
+                _negates(previous)
+                for previous in words[max(0, index - NEGATION_WINDOW) : index]
+            ):
+                valence *= NEGATION_SCALAR
+            if but is not None:
+                valence *= BEFORE_BUT if index < but else AFTER_BUT
+            valences.append(valence)
+        if not valences:
+            return SentimentScore("NEUTRAL", 0.0, NO_OPINION_CONFIDENCE, self.name)
+        total = sum(valences)
+        score = total / math.sqrt(total * total + NORMALIZATION)
+        # 1 when every opinion word pulls the same way, 0 when they cancel out
+        agreement = abs(total) / sum(abs(valence) for valence in valences)
+        label = label_for(score)
+        if label == "NEUTRAL":
+            confidence = agreement
+        else:
+            confidence = agreement * min(1.0, abs(score) / CONFIDENT_SCORE)
+        return SentimentScore(label, score, confidence, self.name)
+
+    def score_batch(self, texts):
+        """Score several utterances, returning their scores in order."""
+        return [self.score(text) for text in texts]
+
+
+def _negates(word):
+    return word in NEGATIONS or word.endswith("n't")
+
+
+class SentimentBatcher:
+    """
+    Scores the utterances of every session together on one thread.
+
+    Utterances that arrive while a batch is being scored make up the next
+    batch, so concurrent sessions share one call to the analyzer's
+    `score_batch` while a lone utterance never waits for others. With a
+    model-based analyzer this is what keeps a burst of turns cheap.
+    """
+
+    def __init__(self, analyzer, max_batch=64):
+        """
+        Initialize the batcher and start its thread.
+
+        Args:
+            analyzer: Anything with `score_batch(texts)`, such as `LexiconSentiment`.
+            max_batch (int): Utterances scored together at most.
+        """
+        self.analyzer = analyzer
+        self.max_batch = max_batch
+        self.batches = 0
+        self.scored = 0
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(
+            target=self._score_batches, name="sentiment", daemon=True
+        )
+        self._thread.start()
+
+    def score(self, text):
+        """
+        Score an utterance, blocking until its batch is done.
+
+        Returns:
+            SentimentScore: The label, score and confidence.
+        """
+        future = Future()
+        self._queue.put((text, future))
+        return future.result()
+
+    def _score_batches(self):
+        """Score queued utterances in batches until the batcher is closed."""
+        closing = False
+        while not closing:
+            item = self._queue.get()
+            if item is _CLOSE:
+                return
+            batch = [item]
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _CLOSE:
+                    closing = True
+                    break
+                batch.append(item)
+            try:
+                scores = self.analyzer.score_batch([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future), score in zip(batch, scores):
+                    future.set_result(score)
+            self.batches += 1
+            self.scored += len(batch)
+
+    def close(self):
+        """Score what is queued, then stop the thread."""
+        self._queue.put(_CLOSE)
+        self._thread.join()
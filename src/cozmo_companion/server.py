@@ -0,0 +1,245 @@
+import asyncio
+import contextlib
+import io
+import logging
+import struct
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+from .capture import NetworkCaptureDevice
+from .recorder import Recorder
+from .settings import SERVE_MAX_SESSIONS, SERVE_PORT, SERVE_WORKERS
+from .turns import cancel_tasks
+
+# Every frame is a one-byte kind and a big-endian payload length, then the payload
+FRAME_HEADER = struct.Struct("!cI")
+# Client to server: 16-bit little-endian PCM at `Recorder.RATE`, any length
+AUDIO = b"A"
+# Client to server, as the first frame if at all: the user's id in UTF-8, whose
+# saved conversation the session continues; the server trusts it as given
+USER = b"U"
+# Server to client: a WAV file to play
+SPEECH = b"S"
+# Server to client: stop playing, the user talked over the bot
+STOP = b"X"
+# Server to client: the URL of a picture to show, in UTF-8
+PICTURE = b"P"
+# Server to client: no session slot is free; the connection is closed
+BUSY = b"B"
+# Larger frames are rejected rather than buffered
+MAX_FRAME_BYTES = 8 * 2**20
+# Seconds a playback thread waits for the event loop to send a frame
+SEND_TIMEOUT = 10.0
+
+
+async def read_frame(reader):
+    """
+    Read one frame from the stream.
+
+    Returns:
+        tuple: The frame kind and payload, or (None, b"") once the peer hung up.
+
+    Raises:
+        ValueError: If the frame is larger than `MAX_FRAME_BYTES`.
+    """
+    try:
+        kind, length = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+        if length > MAX_FRAME_BYTES:
+            raise ValueError(f"Frame of {length} bytes exceeds {MAX_FRAME_BYTES}")
+        return kind, await reader.readexactly(length)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None, b""
+
+
+async def write_frame(writer, kind, payload=b""):
+    """Write one frame to the stream and wait until it can take more."""
+    writer.write(FRAME_HEADER.pack(kind, len(payload)) + payload)
+    await writer.drain()
+
+
+class NetworkPlayer:
+    """
+    Sends speech and pictures to a connected client instead of the local
+    speakers and browser.
+
+    The call blocks for as long as the audio takes to play on the client,
+    so sentence pipelining and barge-in behave as they do locally. When
+    playback is interrupted the client is told to stop.
+    """
+
+    def __init__(self, writer, loop):
+        """
+        Initialize the player.
+
+        Args:
+            writer (asyncio.StreamWriter): The client connection.
+            loop (asyncio.AbstractEventLoop): The loop that owns the connection.
+        """
+        self.writer = writer
+        self.loop = loop
+
+    def __call__(self, audio, stop_event=None):
+        """
+        Send WAV bytes to the client and wait until they have played.
+
+        Returns:
+            float: The fraction of the audio played before `stop_event` was set.
+        """
+        with wave.open(io.BytesIO(audio), "rb") as wf:
+            duration = wf.getnframes() / wf.getframerate()
+        try:
+            self._send(SPEECH, audio)
+            started = time.perf_counter()
+            if stop_event is None or not stop_event.wait(duration):
+                return 1.0
+            self._send(STOP)
+        except (ConnectionError, TimeoutError) as e:
+            logging.error(f"Failed to send speech to client: {e}")
+            return 0.0
+        return min(1.0, (time.perf_counter() - started) / duration)
+
+    def show_picture(self, url):
+        """Send a picture's URL to the client to show."""
+        self._send(PICTURE, url.encode("utf-8"))
+
+    def _send(self, kind, payload=b""):
+        """Write a frame from a playback or painter thread through the connection's loop."""
+        asyncio.run_coroutine_threadsafe(
+            write_frame(self.writer, kind, payload), self.loop
+        ).result(SEND_TIMEOUT)
+
+
+class CompanionServer:
+    """
+    Serves many independent conversation sessions from one event loop.
+
+    Each TCP connection gets its own session, with its own chatbot thread,
+    sentiment state, history, capture buffer and speaker. Sessions share the
+    service clients and speech cache, and all of their blocking calls run on
+    one bounded thread pool, so the host's thread count stays fixed however
+    many clients connect. The pool has a thread per session on top of
+    `workers`, since a session's playback holds a thread for as long as its
+    audio plays on the client.
+    """
+
+    def __init__(
+        self,
+        create_session,
+        max_sessions=SERVE_MAX_SESSIONS,
+        workers=SERVE_WORKERS,
+    ):
+        """
+        Initialize the server.
+
+        Args:
+            create_session (callable): Takes a capture device, a player and the
+                client's user id (None if it sent none) and returns an object with
+                `start_session()` and `speaker`, such as a `VoiceAssistant`.
+            max_sessions (int): Connections served at the same time.
+            workers (int): Threads for blocking calls besides playback.
+        """
+        self.create_session = create_session
+        self.max_sessions = max_sessions
+        self.workers = workers
+        self.sessions = set()
+        self.served = 0
+        self.rejected = 0
+
+    async def start(self, host="0.0.0.0", port=SERVE_PORT):
+        """
+        Start accepting connections on the running event loop.
+
+        Returns:
+            asyncio.Server: The listening server; port 0 picks a free port.
+        """
+        # Every `asyncio.to_thread` call of every session runs on this pool
+        threads = self.max_sessions + self.workers
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=threads, thread_name_prefix="session")
+        )
+        server = await asyncio.start_server(self._handle, host, port)
+        addresses = ", ".join(str(sock.getsockname()) for sock in server.sockets)
+        logging.info(
+            f"Serving up to {self.max_sessions} sessions on {addresses} "
+            f"with {threads} threads"
+        )
+        return server
+
+    async def serve(self, host="0.0.0.0", port=SERVE_PORT):
+        """Accept connections until cancelled."""
+        server = await self.start(host, port)
+        async with server:
+            await server.serve_forever()
+
+    async def _handle(self, reader, writer):
+        """Run one session for the lifetime of a connection."""
+        peer = writer.get_extra_info("peername")
+        if len(self.sessions) >= self.max_sessions:
+            self.rejected += 1
+            logging.info(f"Turning away {peer}: {len(self.sessions)} sessions active")
+            await write_frame(writer, BUSY)
+            writer.close()
+            return
+
+        # Hold the slot while the first frame is awaited, so connections arriving
+        # together cannot all pass the check above
+        self.sessions.add(writer)
+        session = None
+        try:
+            device = NetworkCaptureDevice(
+                Recorder.RATE, Recorder.CHANNELS, Recorder.CHUNK_SIZE
+            )
+            # The session restores the user's conversation as it starts, so it waits for the id
+            kind, payload = await read_frame(reader)
+            if kind is None:
+                return
+            user_id, audio = None, b""
+            if kind == USER:
+                user_id = payload.decode("utf-8", errors="replace").strip() or None
+            elif kind == AUDIO:
+                audio = payload
+            session = self.create_session(
+                device, NetworkPlayer(writer, asyncio.get_running_loop()), user_id
+            )
+            conversation = asyncio.create_task(session.start_session())
+            receiving = asyncio.create_task(self._receive(reader, device, audio))
+            self.served += 1
+            logging.info(f"Session started for {peer} ({len(self.sessions)} active)")
+            try:
+                await asyncio.wait(
+                    {conversation, receiving}, return_when=asyncio.FIRST_COMPLETED
+                )
+                if conversation.done() and not conversation.cancelled():
+                    if conversation.exception() is not None:
+                        logging.error(
+                            f"Session for {peer} failed: {conversation.exception()!r}"
+                        )
+                else:
+                    logging.info(f"{peer} hung up; ending its session")
+            finally:
+                # Release a playback thread that is waiting out audio nobody will hear
+                session.speaker.interrupt()
+                await cancel_tasks(conversation, receiving)
+        finally:
+            self.sessions.discard(writer)
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+            if session is not None:
+                logging.info(f"Session for {peer} ended ({len(self.sessions)} active)")
+
+    @staticmethod
+    async def _receive(reader, device, audio=b""):
+        """Feed the client's audio frames to its capture device until it hangs up."""
+        # Audio sent instead of a user id is fed like any later frame, so like them
+        # it is dropped unless the session is already listening, as it is not
+        # during the greeting
+        if audio:
+            device.feed(audio)
+        while True:
+            kind, payload = await read_frame(reader)
+            if kind is None:
+                return
+            if kind == AUDIO:
+                device.feed(payload)
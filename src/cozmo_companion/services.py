@@ -0,0 +1,412 @@
+import asyncio
+import concurrent.futures
+import logging
+import threading
+import time
+import weakref
+
+import httpx
+import requests
+from ibm_cloud_sdk_core.authenticators import IAMAuthenticator
+from ibm_watson import SpeechToTextV1, TextToSpeechV1
+from openai import AsyncClient, Client
+from requests.adapters import HTTPAdapter
+
+from .resilience import remaining_time
+
+# Connections kept open per host; a turn makes at most a few concurrent calls
+POOL_SIZE = 4
+# Idle seconds before a pooled OpenAI connection is closed; httpx defaults to 5,
+# which is shorter than the time the user usually spends talking
+KEEPALIVE_SECONDS = 120.0
+# Seconds to wait before retrying a failed IAM token refresh
+TOKEN_RETRY_SECONDS = 5.0
+# Seconds a request may wait for the server when no remote call deadline applies
+REQUEST_TIMEOUT = 60.0
+
+# Cheap authenticated calls that open a pooled connection to each Watson service
+WATSON_WARM_UP_CALLS = {
+    SpeechToTextV1: "list_models",
+    TextToSpeechV1: "list_voices",
+}
+
+_background_loop = None
+_background_loop_lock = threading.Lock()
+
+
+class DeadlineSession(requests.Session):
+    """
+    Session whose requests give up at the deadline of the remote call making them.
+
+    Requests made outside of a remote call attempt wait `default_timeout`
+    seconds at most, so no request can hang a thread forever.
+    """
+
+    def __init__(self, default_timeout=REQUEST_TIMEOUT):
+        super().__init__()
+        self.default_timeout = default_timeout
+
+    def request(self, method, url, **kwargs):
+        remaining = remaining_time()
+        if remaining is not None:
+            kwargs["timeout"] = max(remaining, 0.001)
+        elif kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.default_timeout
+        return super().request(method, url, **kwargs)
+
+
+def create_http_session(pool_size=POOL_SIZE, timeout=REQUEST_TIMEOUT):
+    """
+    Create a requests session whose connections are kept alive and reused.
+
+    Args:
+        pool_size (int): Connections kept open per host.
+        timeout (float): Seconds a request outside of a remote call attempt may take.
+
+    Returns:
+        requests.Session: The session, shareable between threads.
+    """
+    session = DeadlineSession(timeout)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def background_loop():
+    """Return the long-lived event loop that runs coroutines for blocking callers."""
+    global _background_loop
+    with _background_loop_lock:
+        if _background_loop is None:
+            _background_loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_background_loop.run_forever,
+                name="llm-loop",
+                daemon=True,
+            ).start()
+        return _background_loop
+
+
+def run_coroutine(coroutine, timeout=None):
+    """
+    Run a coroutine on the background loop and wait for its result.
+
+    Blocking callers such as worker threads would otherwise spin up a fresh
+    event loop per call, and with it a fresh OpenAI client and TLS connection.
+
+    Args:
+        coroutine (Coroutine): The coroutine to run.
+        timeout (float, optional): Seconds to wait for the result; defaults to
+            the time left for the remote call attempt making it, if any.
+
+    Returns:
+        The coroutine's result.
+
+    Raises:
+        TimeoutError: If the timeout passed; the coroutine is cancelled.
+    """
+    if timeout is None:
+        timeout = remaining_time()
+    future = asyncio.run_coroutine_threadsafe(coroutine, background_loop())
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        # Before Python 3.11 this is not the builtin TimeoutError
+        raise TimeoutError(f"Coroutine took longer than {timeout:.2f} s") from None
+
+
+class IAMTokenRefresher:
+    """
+    Keeps an IAM access token fresh from a background thread.
+
+    The SDK refreshes a token on the request path once it passes its refresh
+    time (80% of its lifetime); waking up at that moment instead keeps the
+    token exchange off the conversation's critical path.
+    """
+
+    def __init__(self, token_manager, retry_seconds=TOKEN_RETRY_SECONDS):
+        """
+        Initialize the refresher.
+
+        Args:
+            token_manager (IAMTokenManager): The authenticator's token manager.
+            retry_seconds (float): Delay before retrying a failed refresh.
+        """
+        self.token_manager = token_manager
+        self.retry_seconds = retry_seconds
+        self.refreshes = 0
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Fetch the first token right away and keep refreshing it until stopped."""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop refreshing."""
+        self._stopped.set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.token_manager.get_token()
+                self.refreshes += 1
+                # Wake just after the refresh time so `get_token` renews the token
+                delay = max(self.token_manager.refresh_time - time.time() + 1, 1)
+            except Exception as e:
+                logging.error(f"Failed to refresh IAM token: {e}")
+                delay = self.retry_seconds
+            self._stopped.wait(delay)
+
+
+class OpenAIClientPool:
+    """
+    Long-lived OpenAI clients with keep-alive connection pools.
+
+    Async clients are bound to the event loop they were created on, so one is
+    kept per loop; a single sync client serves every thread.
+    """
+
+    def __init__(
+        self,
+        client_kwargs,
+        max_connections=POOL_SIZE,
+        keepalive_seconds=KEEPALIVE_SECONDS,
+        timeout=REQUEST_TIMEOUT,
+    ):
+        """
+        Initialize the pool.
+
+        Args:
+            client_kwargs (callable): Returns the client's keyword arguments, such as
+                `api_key` and `base_url`; read when a client is created.
+            max_connections (int): Connections kept alive per client.
+            keepalive_seconds (float): Idle seconds before a pooled connection closes.
+            timeout (float): Seconds a request outside of a remote call attempt may
+                take; requests within one give up at its deadline.
+        """
+        self.client_kwargs = client_kwargs
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections * 4,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive_seconds,
+        )
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._sync_client = None
+        self._lock = threading.Lock()
+
+    def get(self, is_async=True):
+        """
+        Return the pooled client for the current event loop, or the sync client.
+
+        Args:
+            is_async (bool): Whether to return an `AsyncClient`.
+        """
+        with self._lock:
+            if not is_async:
+                if self._sync_client is None:
+                    self._sync_client = Client(
+                        http_client=httpx.Client(
+                            limits=self.limits,
+                            event_hooks={"request": [apply_deadline]},
+                        ),
+                        timeout=self.timeout,
+                        **self.client_kwargs(),
+                    )
+                return self._sync_client
+            loop = _current_loop()
+            client = self._async_clients.get(loop)
+            if client is None:
+                client = self._async_clients[loop] = AsyncClient(
+                    http_client=httpx.AsyncClient(
+                        limits=self.limits,
+                        event_hooks={"request": [apply_deadline_async]},
+                    ),
+                    timeout=self.timeout,
+                    **self.client_kwargs(),
+                )
+            return client
+
+
+def apply_deadline(request):
+    """httpx request hook cutting the request's timeouts to the remote call deadline."""
+    remaining = remaining_time()
+    if remaining is None:
+        return
+    remaining = max(remaining, 0.001)
+    timeout = request.extensions.get("timeout") or httpx.Timeout(remaining).as_dict()
+    request.extensions["timeout"] = {
+        phase: remaining if seconds is None else min(seconds, remaining)
+        for phase, seconds in timeout.items()
+    }
+
+
+async def apply_deadline_async(request):
+    """The `AsyncClient` version of `apply_deadline`."""
+    apply_deadline(request)
+
+
+def _current_loop():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.get_event_loop_policy().get_event_loop()
+
+
+class ServiceLayer:
+    """
+    Owns the long-lived network clients for Watson STT/TTS and OpenAI.
+
+    Watson services share one keep-alive HTTP session and have their IAM
+    tokens refreshed in the background. OpenAI calls made through Marvin use
+    pooled clients, and blocking LLM calls run on one persistent event loop so
+    their connections survive between turns. `warm_up` opens every connection
+    ahead of the first turn.
+    """
+
+    def __init__(
+        self,
+        pool_size=POOL_SIZE,
+        keepalive_seconds=KEEPALIVE_SECONDS,
+        timeout=REQUEST_TIMEOUT,
+    ):
+        """
+        Initialize the service layer.
+
+        Args:
+            pool_size (int): Connections kept open per host.
+            keepalive_seconds (float): Idle seconds before a pooled OpenAI connection closes.
+            timeout (float): Seconds a request may wait for a server when it is not
+                made within a remote call attempt, whose deadline applies instead.
+        """
+        self.http_session = create_http_session(pool_size, timeout)
+        self.openai = OpenAIClientPool(
+            _marvin_client_kwargs,
+            max_connections=pool_size,
+            keepalive_seconds=keepalive_seconds,
+            timeout=timeout,
+        )
+        self.watson_services = []
+        self.token_refreshers = []
+
+    def watson_service(self, api_key, url):
+        """
+        Create a Watson service that uses the shared HTTP session.
+
+        Args:
+            api_key (str): The API key for the service.
+            url (str): The URL for the service; selects Speech to Text or Text to Speech.
+
+        Returns:
+            BaseService: The initialized service.
+
+        Raises:
+            ValueError: If the URL does not belong to a supported service.
+        """
+        if "speech-to-text" in url:
+            service_class = SpeechToTextV1
+        elif "text-to-speech" in url:
+            service_class = TextToSpeechV1
+        else:
+            raise ValueError(
+                f"Invalid service URL: {url}. Expected 'speech-to-text' "
+                f"or 'text-to-speech' in the URL."
+            )
+        authenticator = IAMAuthenticator(api_key)
+        service = service_class(authenticator=authenticator)
+        service.set_service_url(url)
+        service.set_http_client(self.http_session)
+        self.watson_services.append(service)
+
+        refresher = IAMTokenRefresher(authenticator.token_manager)
+        refresher.start()
+        self.token_refreshers.append(refresher)
+        return service
+
+    def install_openai_clients(self):
+        """Make Marvin use the pooled OpenAI clients instead of creating its own."""
+        import marvin.client.openai
+        import marvin.utilities.openai
+
+        original = marvin.utilities.openai.get_openai_client
+
+        def get_openai_client(is_async=True):
+            # Azure and other providers keep Marvin's own client handling
+            if marvin.settings.provider != "openai":
+                return original(is_async)
+            return self.openai.get(is_async)
+
+        marvin.utilities.openai.get_openai_client = get_openai_client
+        # Marvin's client wrappers imported the function by name
+        marvin.client.openai.get_openai_client = get_openai_client
+
+    def warm_up(self):
+        """
+        Open connections to every backend on a background thread.
+
+        Returns:
+            threading.Thread: The warm-up thread, e.g. to join in tests.
+        """
+        thread = threading.Thread(target=self._warm_up, daemon=True)
+        thread.start()
+        return thread
+
+    def _warm_up(self):
+        for service in self.watson_services:
+            call = WATSON_WARM_UP_CALLS.get(type(service))
+            if call:
+                self._timed(type(service).__name__, getattr(service, call))
+        # Blocking LLM calls go through the background loop, so warm its client
+        self._timed(
+            "OpenAI (background loop)",
+            lambda: run_coroutine(self._list_openai_models(), timeout=30),
+        )
+
+    async def warm_up_openai(self):
+        """Open a pooled connection for the OpenAI client of the running event loop."""
+        started = time.perf_counter()
+        try:
+            await self._list_openai_models()
+        except Exception as e:
+            logging.error(f"Failed to warm up OpenAI: {e}")
+            return
+        logging.info(
+            f"Warmed up OpenAI in {(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+
+    async def _list_openai_models(self):
+        await self.openai.get().models.list()
+
+    @staticmethod
+    def _timed(name, warm_up):
+        """Run a blocking warm-up call, logging how long it took or why it failed."""
+        started = time.perf_counter()
+        try:
+            warm_up()
+        except Exception as e:
+            logging.error(f"Failed to warm up {name}: {e}")
+            return
+        logging.info(
+            f"Warmed up {name} in {(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+
+    def close(self):
+        """Stop the token refreshers and close the HTTP session."""
+        for refresher in self.token_refreshers:
+            refresher.stop()
+        self.http_session.close()
+
+
+def _marvin_client_kwargs():
+    """Read the OpenAI client settings from Marvin's configuration."""
+    import marvin
+
+    api_key = marvin.settings.openai.api_key
+    return {
+        "api_key": api_key.get_secret_value() if api_key else None,
+        "organization": marvin.settings.openai.organization,
+        "base_url": marvin.settings.openai.base_url,
+    }
@@ -0,0 +1,57 @@
+from decouple import UndefinedValueError, config
+
+# Kept free of heavy imports so the CLI can show help and check the setup
+# without loading the speech and chat SDKs.
+
+# Server Configuration
+SERVE_PORT = config("SERVE_PORT", default=8765, cast=int)
+# Sessions beyond this are turned away instead of slowing everyone down
+SERVE_MAX_SESSIONS = config("SERVE_MAX_SESSIONS", default=64, cast=int)
+# Threads running blocking SDK calls and recording writes for all sessions; each
+# session also gets a thread of its own for playback
+SERVE_WORKERS = config("SERVE_WORKERS", default=32, cast=int)
+
+# Speech recognition backend: "watson", or "vosk" or "whisper" on the device
+STT_BACKEND = config("STT_BACKEND", default="watson")
+
+# Settings a conversation cannot start without
+REQUIRED_SETTINGS = (
+    "IAM_APIKEY_TTS",
+    "URL_TTS",
+    "MARVIN_OPENAI_API_KEY",
+    "MARVIN_CHAT_COMPLETIONS_MODEL",
+)
+# Settings only Watson speech recognition needs
+WATSON_STT_SETTINGS = ("IAM_APIKEY_STT", "URL_STT")
+
+# Packages a conversation loads, with what they are used for
+BACKEND_PACKAGES = {
+    "marvin": "chat model, sentiment and exit checks",
+    "openai": "chat model client",
+    "ibm_watson": "speech to text and text to speech",
+    "pydub": "speech playback",
+    "pyaudio": "microphone and speakers",
+    "numpy": "voice activity detection and resampling",
+}
+# Packages that only enable optional features
+OPTIONAL_PACKAGES = {
+    "soundfile": "FLAC and Opus encoding",
+    "vosk": "on-device speech recognition (STT_BACKEND=vosk)",
+    "faster_whisper": "on-device speech recognition (STT_BACKEND=whisper)",
+    "piper": "on-device voice (TTS_LOCAL_ENGINE=piper)",
+}
+
+
+def missing_settings():
+    """Return the required settings that are neither in the environment nor in .env."""
+    missing = []
+    required = REQUIRED_SETTINGS
+    if STT_BACKEND == "watson":
+        required = WATSON_STT_SETTINGS + required
+    for name in required:
+        try:
+            if not config(name):
+                missing.append(name)
+        except UndefinedValueError:
+            missing.append(name)
+    return missing
@@ -0,0 +1,598 @@
+import asyncio
+import io
+import math
+import random
+import re
+import threading
+import time
+import wave
+from collections import deque
+from types import SimpleNamespace
+
+import numpy as np
+
+from .resilience import remaining_time
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal")
+
+# Rate of the simulated synthesized speech; only its duration matters
+SYNTHESIS_RATE = 16000
+# Roughly how long a TTS voice takes to speak one character
+SECONDS_PER_CHARACTER = 0.06
+
+
+class LatencyModel:
+    """
+    Random delay with a configurable distribution, mean and jitter.
+
+    Each model owns a seeded generator, so a backend sees the same sequence
+    of delays on every run regardless of how other backends are scheduled.
+    """
+
+    def __init__(self, mean, jitter=0.0, distribution="normal", seed=None):
+        """
+        Initialize the model.
+
+        Args:
+            mean (float): Mean delay in seconds.
+            jitter (float): Standard deviation for "normal" and "lognormal", or the
+                half-width of the range for "uniform"; ignored for "fixed".
+            distribution (str): One of `LATENCY_DISTRIBUTIONS`.
+            seed (int, optional): Seed for the model's random generator.
+
+        Raises:
+            ValueError: If the distribution is unknown or the mean is negative.
+        """
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(
+                f"Unknown latency distribution: {distribution}. "
+                f"Expected one of {', '.join(LATENCY_DISTRIBUTIONS)}."
+            )
+        if mean < 0:
+            raise ValueError(f"Latency mean must not be negative, got {mean}")
+        self.mean = mean
+        self.jitter = jitter
+        self.distribution = distribution
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def parse(cls, spec, seed=None):
+        """
+        Create a model from a "distribution:mean[:jitter]" string, e.g. "lognormal:0.8:0.3".
+
+        A bare number such as "0.2" is a fixed delay.
+        """
+        parts = spec.split(":")
+        if len(parts) == 1:
+            return cls(float(parts[0]), distribution="fixed", seed=seed)
+        distribution, mean = parts[0], float(parts[1])
+        jitter = float(parts[2]) if len(parts) > 2 else 0.0
+        return cls(mean, jitter, distribution, seed=seed)
+
+    def sample(self):
+        """Return the next delay in seconds, never negative."""
+        with self._lock:
+            if self.distribution == "fixed" or not self.jitter:
+                return self.mean
+            if self.distribution == "uniform":
+                return max(
+                    0.0,
+                    self._random.uniform(
+                        self.mean - self.jitter, self.mean + self.jitter
+                    ),
+                )
+            if self.distribution == "normal":
+                return max(0.0, self._random.gauss(self.mean, self.jitter))
+            if not self.mean:
+                return 0.0
+            # Parameters giving a log-normal with the requested mean and deviation
+            sigma = math.sqrt(math.log(1 + (self.jitter / self.mean) ** 2))
+            mu = math.log(self.mean) - sigma**2 / 2
+            return self._random.lognormvariate(mu, sigma)
+
+    def sleep(self):
+        """Block for the next delay and return it."""
+        delay = self.sample()
+        time.sleep(delay)
+        return delay
+
+    async def sleep_async(self):
+        """Wait for the next delay without blocking the event loop and return it."""
+        delay = self.sample()
+        await asyncio.sleep(delay)
+        return delay
+
+    def __repr__(self):
+        return f"{self.distribution}:{self.mean}:{self.jitter}"
+
+
+class SimulatedServiceError(Exception):
+    """A transient failure of a simulated service, reported like an HTTP 503."""
+
+    code = 503
+
+
+class FaultModel:
+    """
+    Random transient errors and stalls injected into a simulated service.
+
+    A call fails at once with probability `error_rate`, or else hangs for
+    `stall_seconds` before carrying on with probability `stall_rate`, like a
+    request stuck behind a dead connection. A stall within a remote call
+    attempt ends with a `TimeoutError` at the attempt's deadline, as the
+    HTTP clients' timeouts would. Seeded like `LatencyModel`.
+    """
+
+    def __init__(self, error_rate=0.0, stall_rate=0.0, stall_seconds=10.0, seed=None):
+        """
+        Initialize the model.
+
+        Args:
+            error_rate (float): Probability that a call raises `SimulatedServiceError`.
+            stall_rate (float): Probability that a call stalls.
+            stall_seconds (float): How long a stalled call hangs.
+            seed (int, optional): Seed for the model's random generator.
+        """
+        self.error_rate = error_rate
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+        self.errors = 0
+        self.stalls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self):
+        """Return the next call's fault: "error", "stall" or None."""
+        with self._lock:
+            roll = self._random.random()
+            if roll < self.error_rate:
+                self.errors += 1
+                return "error"
+            if roll < self.error_rate + self.stall_rate:
+                self.stalls += 1
+                return "stall"
+            return None
+
+    def inject(self):
+        """Raise or stall according to the next draw."""
+        fault = self.draw()
+        if fault == "error":
+            raise SimulatedServiceError("Service unavailable")
+        if fault == "stall":
+            seconds, cut_short = self._stall()
+            time.sleep(seconds)
+            if cut_short:
+                raise TimeoutError("Stalled call timed out")
+
+    async def inject_async(self):
+        """Raise or stall without blocking the event loop."""
+        fault = self.draw()
+        if fault == "error":
+            raise SimulatedServiceError("Service unavailable")
+        if fault == "stall":
+            seconds, cut_short = self._stall()
+            await asyncio.sleep(seconds)
+            if cut_short:
+                raise TimeoutError("Stalled call timed out")
+
+    def _stall(self):
+        """Return how long to stall, and whether the deadline cuts the stall short."""
+        remaining = remaining_time()
+        if remaining is None or remaining >= self.stall_seconds:
+            return self.stall_seconds, False
+        return remaining, True
+
+
+def encode_wav(samples, rate, channels=1):
+    """Encode 16-bit samples as WAV bytes."""
+    output = io.BytesIO()
+    with wave.open(output, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(np.asarray(samples, dtype=np.int16).tobytes())
+    return output.getvalue()
+
+
+def speech_like_wav(seconds, rate, channels=1, amplitude=8000, seed=0):
+    """
+    Return WAV bytes that voice activity detection treats as speech.
+
+    The signal is a tone whose loudness rises and falls at a syllable-like
+    rate over a little background noise.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * rate)) / rate
+    envelope = 0.55 + 0.45 * np.sin(2 * np.pi * 4 * t)
+    signal = amplitude * envelope * np.sin(2 * np.pi * 180 * t)
+    signal += rng.normal(0, 50, t.size)
+    return encode_wav(np.repeat(signal, channels), rate, channels)
+
+
+def wav_duration(audio):
+    """Return the duration in seconds of WAV bytes or of an open WAV file."""
+    source = io.BytesIO(audio) if isinstance(audio, (bytes, bytearray)) else audio
+    with wave.open(source, "rb") as wf:
+        return wf.getnframes() / wf.getframerate()
+
+
+class SimulatedResponse:
+    """Mimics the `DetailedResponse` returned by the Watson SDK."""
+
+    def __init__(self, result):
+        self.result = result
+
+    def get_result(self):
+        return self.result
+
+
+class SimulatedSpeechToText:
+    """
+    Stand-in for Watson Speech to Text that returns queued transcripts.
+
+    Recognition takes a base delay from its latency model plus a delay
+    proportional to the length of the audio, like a real recognizer, plus
+    the time the upload takes over a link of limited bandwidth. A retried
+    or hedged request, the same audio arriving again before another
+    transcript is queued, gets the same transcript.
+    """
+
+    def __init__(
+        self,
+        latency,
+        seconds_per_audio_second=0.0,
+        default_transcript=None,
+        upload_bytes_per_second=None,
+        faults=None,
+    ):
+        """
+        Initialize the recognizer.
+
+        Args:
+            latency (LatencyModel): Delay of every recognize call.
+            seconds_per_audio_second (float): Extra delay per second of audio.
+            default_transcript (str, optional): Returned for audio when nothing is queued.
+            upload_bytes_per_second (float, optional): Uplink bandwidth; None makes
+                uploads instant.
+            faults (FaultModel, optional): Errors and stalls injected into calls.
+        """
+        self.latency = latency
+        self.seconds_per_audio_second = seconds_per_audio_second
+        self.default_transcript = default_transcript
+        self.upload_bytes_per_second = upload_bytes_per_second
+        self.faults = faults
+        self.calls = 0
+        self.uploaded_bytes = 0
+        self._transcripts = deque()
+        self._last_request = None
+        self._lock = threading.Lock()
+
+    def queue_transcript(self, transcript):
+        """Queue the transcript returned for the next recording that contains audio."""
+        with self._lock:
+            self._transcripts.append(transcript)
+            self._last_request = None
+
+    def recognize(self, audio, content_type=None, **kwargs):
+        """Return the next queued transcript after the simulated delay."""
+        self.calls += 1
+        data = audio.read() if hasattr(audio, "read") else audio
+        self.uploaded_bytes += len(data)
+        upload = (
+            len(data) / self.upload_bytes_per_second
+            if self.upload_bytes_per_second
+            else 0.0
+        )
+        # Compressed uploads are treated as a second of speech
+        duration = wav_duration(data) if data[:4] == b"RIFF" else 1.0
+        with self._lock:
+            if not duration:
+                transcript = None
+            elif self._last_request and self._last_request[0] == data:
+                transcript = self._last_request[1]
+            elif self._transcripts:
+                transcript = self._transcripts.popleft()
+            else:
+                transcript = self.default_transcript
+            if duration:
+                self._last_request = (data, transcript)
+        if self.faults is not None:
+            self.faults.inject()
+        time.sleep(
+            upload + self.latency.sample() + duration * self.seconds_per_audio_second
+        )
+        if not transcript:
+            return SimulatedResponse({"results": []})
+        return SimulatedResponse(
+            {"results": [{"alternatives": [{"transcript": transcript}]}]}
+        )
+
+
+class SimulatedRecognitionEngine:
+    """
+    Stand-in for an on-device recognition engine that returns queued transcripts.
+
+    Decoding takes time in proportion to the audio, as a real engine's CPU
+    work does, and one more word of the transcript becomes the partial
+    result every `seconds_per_word` of audio.
+    """
+
+    name = "simulated"
+
+    def __init__(
+        self,
+        seconds_per_audio_second=0.0,
+        load_seconds=0.0,
+        seconds_per_word=0.3,
+        default_transcript=None,
+    ):
+        """
+        Initialize the engine.
+
+        Args:
+            seconds_per_audio_second (float): Decoding time per second of audio.
+            load_seconds (float): Time to load the model.
+            seconds_per_word (float): Audio per revealed word of the partial result.
+            default_transcript (str, optional): Returned for audio when nothing is queued.
+        """
+        self.seconds_per_audio_second = seconds_per_audio_second
+        self.load_seconds = load_seconds
+        self.seconds_per_word = seconds_per_word
+        self.default_transcript = default_transcript
+        self.loads = 0
+        self.decoded_seconds = 0.0
+        self._transcripts = deque()
+        self._lock = threading.Lock()
+
+    def queue_transcript(self, transcript):
+        """Queue the transcript returned for the next utterance that contains audio."""
+        with self._lock:
+            self._transcripts.append(transcript)
+
+    def load(self):
+        """Simulate loading the model."""
+        time.sleep(self.load_seconds)
+        self.loads += 1
+        return self
+
+    def session(self, model, rate):
+        """Start recognizing one utterance sampled at `rate`."""
+        return _SimulatedRecognitionSession(self, rate)
+
+    def _next_transcript(self):
+        with self._lock:
+            if self._transcripts:
+                return self._transcripts.popleft()
+            return self.default_transcript
+
+
+class _SimulatedRecognitionSession:
+    def __init__(self, engine, rate):
+        self.engine = engine
+        self.rate = rate
+        self.seconds = 0.0
+        self.transcript = None
+
+    def accept(self, pcm):
+        seconds = len(pcm) / 2 / self.rate
+        time.sleep(seconds * self.engine.seconds_per_audio_second)
+        self.seconds += seconds
+        with self.engine._lock:
+            self.engine.decoded_seconds += seconds
+        if self.transcript is None and self.seconds:
+            self.transcript = self.engine._next_transcript() or ""
+        revealed = int(self.seconds / self.engine.seconds_per_word)
+        return " ".join(self.transcript.split()[:revealed])
+
+    def final(self):
+        return self.transcript or None
+
+
+class SimulatedTextToSpeech:
+    """Stand-in for Watson Text to Speech returning silence as long as the text would take to say."""
+
+    def __init__(
+        self, latency, seconds_per_character=SECONDS_PER_CHARACTER, faults=None
+    ):
+        """
+        Initialize the synthesizer.
+
+        Args:
+            latency (LatencyModel): Delay of every synthesize call.
+            seconds_per_character (float): Length of the audio per character of text.
+            faults (FaultModel, optional): Errors and stalls injected into calls.
+        """
+        self.latency = latency
+        self.seconds_per_character = seconds_per_character
+        self.faults = faults
+        self.calls = 0
+
+    def synthesize(self, text, voice=None, accept=None, **kwargs):
+        """Return a response whose result's `content` holds WAV bytes."""
+        self.calls += 1
+        if self.faults is not None:
+            self.faults.inject()
+        self.latency.sleep()
+        frames = int(len(text) * self.seconds_per_character * SYNTHESIS_RATE)
+        audio = encode_wav(np.zeros(frames, dtype=np.int16), SYNTHESIS_RATE)
+        return SimulatedResponse(SimpleNamespace(content=audio))
+
+
+class SimulatedSynthesisEngine:
+    """
+    Stand-in for an on-device voice returning silence as long as the text would take to say.
+
+    Synthesis takes time in proportion to the text, like a local engine's CPU work.
+    """
+
+    name = "simulated"
+
+    def __init__(
+        self,
+        seconds_per_synthesized_character=0.0005,
+        seconds_per_character=SECONDS_PER_CHARACTER,
+    ):
+        """
+        Initialize the engine.
+
+        Args:
+            seconds_per_synthesized_character (float): Synthesis time per character.
+            seconds_per_character (float): Length of the audio per character of text.
+        """
+        self.seconds_per_synthesized_character = seconds_per_synthesized_character
+        self.seconds_per_character = seconds_per_character
+        self.loads = 0
+        self.calls = 0
+
+    def load(self):
+        """Simulate loading the voice."""
+        self.loads += 1
+        return self
+
+    def synthesize(self, voice, text):
+        """Return WAV bytes of silence after the simulated synthesis time."""
+        self.calls += 1
+        time.sleep(len(text) * self.seconds_per_synthesized_character)
+        frames = int(len(text) * self.seconds_per_character * SYNTHESIS_RATE)
+        return encode_wav(np.zeros(frames, dtype=np.int16), SYNTHESIS_RATE)
+
+
+class SimulatedPlayer:
+    """Speaker stand-in that takes as long as the audio lasts and honours interruptions."""
+
+    def __init__(self, speed=1.0, block_seconds=0.02):
+        """
+        Initialize the player.
+
+        Args:
+            speed (float): Playback speed relative to real time; 0 returns immediately.
+            block_seconds (float): How often the stop event is checked.
+        """
+        self.speed = speed
+        self.block_seconds = block_seconds
+        self.plays = 0
+
+    def __call__(self, audio, stop_event=None):
+        """Pretend to play the WAV bytes; returns the fraction played."""
+        self.plays += 1
+        duration = wav_duration(audio) / self.speed if self.speed else 0.0
+        started = time.perf_counter()
+        while True:
+            elapsed = time.perf_counter() - started
+            if elapsed >= duration:
+                return 1.0
+            if stop_event is not None and stop_event.is_set():
+                return elapsed / duration
+            time.sleep(min(self.block_seconds, duration - elapsed))
+
+
+class SimulatedPainter:
+    """Stand-in for `marvin.paint` that returns a made-up URL after a delay."""
+
+    def __init__(self, latency):
+        """
+        Initialize the painter.
+
+        Args:
+            latency (LatencyModel): Time to paint one picture.
+        """
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt):
+        """Return the URL of the "painted" picture."""
+        with self._lock:
+            self.calls += 1
+            number = self.calls
+        self.latency.sleep()
+        return f"https://pictures.invalid/{number}.png"
+
+
+class SimulatedThread:
+    """Stand-in for a Marvin `Thread`, holding (role, message) pairs in memory."""
+
+    def __init__(self):
+        self.messages = []
+
+    async def add_async(self, message, role="user"):
+        """Add a message to the thread."""
+        self.messages.append((role, message))
+
+
+class SimulatedChatbot:
+    """
+    Stand-in for the Marvin `Application` used for replies.
+
+    Replies are canned and cycled through; `say_async` waits for a whole
+    generation while `stream` yields words with first-token and inter-token delays.
+    """
+
+    def __init__(
+        self,
+        replies,
+        latency,
+        first_token_latency=None,
+        token_latency=None,
+        faults=None,
+    ):
+        """
+        Initialize the chatbot.
+
+        Args:
+            replies (list[str]): Replies returned in turn.
+            latency (LatencyModel): Time to generate a complete reply.
+            first_token_latency (LatencyModel, optional): Delay before the first streamed
+                token; defaults to `latency`.
+            token_latency (LatencyModel, optional): Delay between streamed tokens.
+            faults (FaultModel, optional): Errors and stalls injected into `say_async`.
+        """
+        self.replies = list(replies)
+        self.latency = latency
+        self.first_token_latency = first_token_latency or latency
+        self.token_latency = token_latency or LatencyModel(0.0, distribution="fixed")
+        self.faults = faults
+        self.calls = 0
+        # Threads started so far and the arguments of the latest run
+        self.threads = 1
+        self.run_kwargs = {}
+        # Attributes read when the assistant logs its chatbot
+        self.id = "simulated"
+        self.name = "Companion"
+        self.model = "simulated"
+        self.instructions = "Simulated chatbot for offline runs."
+        self.tools = []
+        self.state = SimpleNamespace(value=SimpleNamespace(sentiment=[], mood=0.0))
+        self.default_thread = SimulatedThread()
+
+    def _next_reply(self, run_kwargs):
+        reply = self.replies[self.calls % len(self.replies)]
+        self.calls += 1
+        self.run_kwargs = run_kwargs
+        return reply
+
+    def clear_default_thread(self):
+        """Start a new conversation thread."""
+        self.threads += 1
+        self.default_thread = SimulatedThread()
+
+    async def say_async(self, message, **run_kwargs):
+        """Return the next reply shaped like a Marvin assistant response."""
+        if self.faults is not None:
+            await self.faults.inject_async()
+        reply = self._next_reply(run_kwargs)
+        await self.latency.sleep_async()
+        await self.default_thread.add_async(message)
+        await self.default_thread.add_async(reply, role="assistant")
+        content = SimpleNamespace(text=SimpleNamespace(value=reply))
+        return SimpleNamespace(messages=[SimpleNamespace(content=[content])])
+
+    async def stream(self, message, **run_kwargs):
+        """Yield the next reply one word (with its trailing space) at a time."""
+        reply = self._next_reply(run_kwargs)
+        await self.first_token_latency.sleep_async()
+        for index, token in enumerate(re.findall(r"\S+\s*", reply)):
+            if index:
+                await self.token_latency.sleep_async()
+            yield token
@@ -0,0 +1,291 @@
+import contextvars
+import io
+import logging
+import queue
+import re
+import threading
+import time
+from dataclasses import dataclass
+
+from pydub import AudioSegment
+from pydub.utils import make_chunks
+
+from .tracing import tracer
+
+# A sentence ends at terminal punctuation followed by whitespace
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+
+# Playback is written in blocks this long, bounding how late an interruption lands
+PLAYBACK_BLOCK_MS = 20
+
+# How often blocked pipeline threads check whether playback was interrupted
+_POLL_SECONDS = 0.05
+
+# Marks the end of the synthesized audio queue
+_END_OF_SPEECH = object()
+
+
+def split_sentences(text):
+    """
+    Split text into sentences so each one can be synthesized on its own.
+
+    Args:
+        text (str): The text to split.
+
+    Returns:
+        list[str]: The non-empty sentences in order.
+    """
+    return [
+        sentence.strip()
+        for sentence in SENTENCE_BOUNDARY.split(text)
+        if sentence.strip()
+    ]
+
+
+@dataclass
+class Utterance:
+    """The part of a piece of speech that was actually played."""
+
+    text: str = ""
+    interrupted: bool = False
+
+
+class InterruptiblePlayer:
+    """
+    Plays WAV bytes in short blocks so playback can be stopped almost immediately.
+
+    The PyAudio output stream is opened on first use and reused for as long as
+    the audio format stays the same, instead of reopening the device per sentence.
+    """
+
+    def __init__(self, block_ms=PLAYBACK_BLOCK_MS):
+        """
+        Initialize the player.
+
+        Args:
+            block_ms (int): Milliseconds of audio written between interruption checks.
+        """
+        self.block_ms = block_ms
+        self._pyaudio = None
+        self._stream = None
+        self._stream_format = None
+
+    def __call__(self, audio, stop_event=None):
+        """
+        Decode WAV bytes in memory and play them on the default output device.
+
+        Args:
+            audio (bytes): The WAV audio.
+            stop_event (threading.Event, optional): Playback stops once this is set.
+
+        Returns:
+            float: The fraction of the audio that was played.
+        """
+        segment = AudioSegment.from_file(io.BytesIO(audio), format="wav")
+        stream = self._open(
+            (segment.sample_width, segment.channels, segment.frame_rate)
+        )
+        blocks = make_chunks(segment, self.block_ms)
+        for index, block in enumerate(blocks):
+            if stop_event is not None and stop_event.is_set():
+                return index / len(blocks)
+            stream.write(block.raw_data)
+        return 1.0
+
+    def _open(self, audio_format):
+        """Return an output stream for the format, reopening it only when it changes."""
+        if self._stream is not None and self._stream_format == audio_format:
+            return self._stream
+        # Imported here so headless environments never need PortAudio
+        import pyaudio
+
+        if self._pyaudio is None:
+            self._pyaudio = pyaudio.PyAudio()
+        if self._stream is not None:
+            self._stream.close()
+        sample_width, channels, rate = audio_format
+        self._stream = self._pyaudio.open(
+            format=self._pyaudio.get_format_from_width(sample_width),
+            channels=channels,
+            rate=rate,
+            output=True,
+        )
+        self._stream_format = audio_format
+        return self._stream
+
+    def close(self):
+        """Close the output stream and release the audio backend."""
+        if self._stream is not None:
+            self._stream.stop_stream()
+            self._stream.close()
+            self._stream = None
+        if self._pyaudio is not None:
+            self._pyaudio.terminate()
+            self._pyaudio = None
+
+
+class PipelinedSpeaker:
+    """
+    Speaks text sentence by sentence, synthesizing the next sentence while the current one plays.
+
+    Synthesized audio is handed to the player as bytes straight from the
+    synthesis call, so nothing is written to disk on the way to the speaker.
+    Speech can be interrupted from another thread; playback then stops within
+    one playback block and no further chunks are synthesized.
+    """
+
+    def __init__(self, synthesize, play_audio=None):
+        """
+        Initialize the speaker.
+
+        Args:
+            synthesize (callable): Converts a piece of text into audio bytes.
+            play_audio (callable): Plays audio bytes given a stop event, blocking until
+                playback ends, and returns the fraction played (None counts as all of it).
+                Defaults to an `InterruptiblePlayer`.
+        """
+        self.synthesize = synthesize
+        self.play_audio = play_audio or InterruptiblePlayer()
+        # Stays set until `resume` so speech started after an interruption is silent too
+        self.stop_event = threading.Event()
+        # Set whenever no speech is in progress
+        self.idle = threading.Event()
+        self.idle.set()
+        # Set from the first audio of a piece of speech until it ends
+        self.playing = threading.Event()
+        # What was played of the most recent speech, updated as it plays
+        self.utterance = Utterance()
+        # One entry per utterance: length of the text and seconds until audio started
+        self.metrics = []
+
+    def interrupt(self):
+        """Stop the current speech and silence any speech until `resume` is called."""
+        self.stop_event.set()
+
+    def resume(self):
+        """Allow speaking again after an interruption."""
+        self.stop_event.clear()
+        self.utterance = Utterance()
+
+    def speak(self, text):
+        """
+        Split the text into sentences and speak them through the pipeline.
+
+        Returns:
+            Utterance: The text that was played and whether it was interrupted.
+        """
+        return self.speak_chunks(split_sentences(text))
+
+    def speak_chunks(self, chunks):
+        """
+        Speak an iterable of text chunks in order.
+
+        A background thread synthesizes chunks ahead of playback while the
+        calling thread plays them, so time-to-first-audio only depends on the
+        first chunk rather than on the length of the whole reply.
+
+        Args:
+            chunks (iterable[str]): Text pieces to speak; may be a lazy generator.
+
+        Returns:
+            Utterance: The text that was played and whether it was interrupted.
+        """
+        started = time.perf_counter()
+        self.idle.clear()
+        utterance = self.utterance = Utterance()
+        # Holding one finished chunk lets synthesis of the next run during playback
+        audio_queue = queue.Queue(maxsize=1)
+        spoken = []
+        # The copied context keeps synthesis spans attached to the current turn
+        synthesizer = threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(self._synthesize_chunks, chunks, audio_queue),
+            daemon=True,
+        )
+        synthesizer.start()
+
+        time_to_first_audio = None
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    item = audio_queue.get(timeout=_POLL_SECONDS)
+                except queue.Empty:
+                    continue
+                if item is _END_OF_SPEECH:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                text, audio = item
+                if time_to_first_audio is None:
+                    time_to_first_audio = time.perf_counter() - started
+                    tracer.record("time_to_first_audio", time_to_first_audio)
+                    logging.info(
+                        f"Time to first audio: {time_to_first_audio * 1000:.0f} ms"
+                    )
+                self.playing.set()
+                with tracer.span("playback", characters=len(text)):
+                    played = self.play_audio(audio, self.stop_event)
+                if played is not None and played < 1:
+                    # Keep the words that were heard before playback stopped
+                    words = text.split()
+                    text = " ".join(words[: int(len(words) * played)])
+                if text:
+                    spoken.append(text)
+                    utterance.text = " ".join(spoken)
+            utterance.interrupted = self.stop_event.is_set()
+        finally:
+            self.playing.clear()
+            self.idle.set()
+
+        if utterance.interrupted:
+            # The synthesizer gives up on its own once it sees the stop event
+            logging.info(f"Speech interrupted after: {utterance.text!r}")
+        else:
+            synthesizer.join()
+        self._record_metrics(spoken, time_to_first_audio)
+        return utterance
+
+    def close(self):
+        """Release the player's audio device, if it holds one."""
+        close = getattr(self.play_audio, "close", None)
+        if close is not None:
+            close()
+
+    def _synthesize_chunks(self, chunks, audio_queue):
+        """Synthesize each chunk and hand the audio to the playback loop."""
+        try:
+            for text in chunks:
+                if self.stop_event.is_set():
+                    return
+                if text.strip():
+                    with tracer.span("synthesize", characters=len(text)):
+                        audio = self.synthesize(text)
+                    if not self._put(audio_queue, (text, audio)):
+                        return
+        except Exception as e:
+            # Surface synthesis failures on the playback thread
+            self._put(audio_queue, e)
+            return
+        self._put(audio_queue, _END_OF_SPEECH)
+
+    def _put(self, audio_queue, item):
+        """Queue an item for playback, giving up once speech has been interrupted."""
+        while not self.stop_event.is_set():
+            try:
+                audio_queue.put(item, timeout=_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _record_metrics(self, spoken, time_to_first_audio):
+        """Store the time-to-first-audio for the utterance that was just spoken."""
+        if time_to_first_audio is None:
+            return
+        self.metrics.append(
+            {
+                "characters": sum(len(text) for text in spoken),
+                "sentences": len(spoken),
+                "time_to_first_audio": time_to_first_audio,
+            }
+        )
@@ -0,0 +1,228 @@
+import contextlib
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from .history import Turn
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    user_id TEXT PRIMARY KEY,
+    summary TEXT NOT NULL DEFAULT '',
+    turns INTEGER NOT NULL DEFAULT 0,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS turns (
+    user_id TEXT NOT NULL,
+    turn_index INTEGER NOT NULL,
+    user TEXT NOT NULL,
+    reply TEXT,
+    sentiment TEXT,
+    interrupted INTEGER NOT NULL DEFAULT 0,
+    started REAL NOT NULL,
+    ended REAL NOT NULL,
+    tokens INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, turn_index)
+) WITHOUT ROWID;
+"""
+
+# Marks the end of the writer's queue
+_CLOSE = object()
+
+
+class SavedConversation:
+    """What a store knows about a user's earlier sessions."""
+
+    __slots__ = ("summary", "turns", "total_turns")
+
+    def __init__(self, summary="", turns=(), total_turns=0):
+        self.summary = summary
+        self.turns = list(turns)
+        self.total_turns = total_turns
+
+
+class SessionStore:
+    """
+    SQLite store of conversation turns and summaries, keyed by user or robot.
+
+    Writes are queued and committed in batches by a background thread, so
+    recording a turn costs the conversation a queue put. Reads use the
+    primary key on (user_id, turn_index) and only fetch the recent turns
+    a session needs to resume.
+    """
+
+    def __init__(self, path, flush_interval=1.0, batch_size=32):
+        """
+        Initialize the store, creating the database if needed.
+
+        Args:
+            path (str): Database file; ":memory:" is not supported since reads
+                and writes use separate connections.
+            flush_interval (float): Longest time in seconds a write waits to be committed.
+            batch_size (int): Writes committed together at most.
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with contextlib.closing(self._connect()) as connection:
+            # Readers never wait for the writer, and commits skip the fsync per batch
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+            connection.commit()
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(
+            target=self._write_batches, name="session-store", daemon=True
+        )
+        self._writer.start()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=10.0)
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def save_turn(self, user_id, turn, summary):
+        """Queue a finished turn and the current summary for the next commit."""
+        self._queue.put(
+            (
+                "INSERT OR REPLACE INTO turns VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    user_id,
+                    turn.index,
+                    turn.user,
+                    turn.reply,
+                    turn.sentiment.value if turn.sentiment is not None else None,
+                    int(turn.interrupted),
+                    turn.started,
+                    turn.ended,
+                    turn.tokens,
+                ),
+            )
+        )
+        self.save_summary(user_id, summary, turn.index + 1)
+
+    def save_summary(self, user_id, summary, total_turns):
+        """Queue the user's summary and turn count for the next commit."""
+        self._queue.put(
+            (
+                "INSERT INTO conversations VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET summary = excluded.summary, "
+                "turns = MAX(turns, excluded.turns), updated = excluded.updated",
+                (user_id, summary, total_turns, time.time()),
+            )
+        )
+
+    def load(self, user_id, token_budget):
+        """
+        Load the user's summary and the most recent turns that fit the budget.
+
+        Args:
+            user_id (str): The user or robot the conversation belongs to.
+            token_budget (int): Estimated tokens of turns to return.
+
+        Returns:
+            SavedConversation: Turns oldest first; empty for a new user.
+        """
+        with contextlib.closing(self._connect()) as connection:
+            row = connection.execute(
+                "SELECT summary, turns FROM conversations WHERE user_id = ?",
+                (user_id,),
+            ).fetchone()
+            if row is None:
+                return SavedConversation()
+            turns, tokens = [], 0
+            rows = connection.execute(
+                "SELECT turn_index, user, reply, sentiment, interrupted, started, "
+                "ended, tokens FROM turns WHERE user_id = ? ORDER BY turn_index DESC",
+                (user_id,),
+            )
+            for (
+                index,
+                user,
+                reply,
+                sentiment,
+                interrupted,
+                started,
+                ended,
+                size,
+            ) in rows:
+                if turns and tokens + size > token_budget:
+                    break
+                turn = Turn(
+                    index,
+                    user,
+                    reply=reply,
+                    sentiment=sentiment,
+                    interrupted=bool(interrupted),
+                    started=started,
+                    tokens=size,
+                )
+                turn.ended = ended
+                turns.append(turn)
+                tokens += size
+        turns.reverse()
+        return SavedConversation(row[0], turns, row[1])
+
+    def sentiments(self, user_id, limit):
+        """Return the user's latest detected sentiment values, oldest first."""
+        with contextlib.closing(self._connect()) as connection:
+            rows = connection.execute(
+                "SELECT sentiment FROM turns WHERE user_id = ? AND sentiment IS NOT NULL "
+                "ORDER BY turn_index DESC LIMIT ?",
+                (user_id, limit),
+            ).fetchall()
+        return [sentiment for (sentiment,) in reversed(rows)]
+
+    def flush(self, timeout=None):
+        """Block until every queued write is committed."""
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self):
+        """Commit pending writes and stop the writer thread."""
+        if self._writer.is_alive():
+            self._queue.put(_CLOSE)
+            self._writer.join()
+
+    def _write_batches(self):
+        """Commit queued writes in batches until the store is closed."""
+        connection = self._connect()
+        try:
+            while True:
+                item = self._queue.get()
+                batch = [item]
+                deadline = time.monotonic() + self.flush_interval
+                # Gather what arrives shortly after, unless someone waits for a flush
+                while (
+                    len(batch) < self.batch_size
+                    and batch[-1] is not _CLOSE
+                    and not isinstance(batch[-1], threading.Event)
+                ):
+                    try:
+                        batch.append(
+                            self._queue.get(
+                                timeout=max(0.0, deadline - time.monotonic())
+                            )
+                        )
+                    except queue.Empty:
+                        break
+                writes = [entry for entry in batch if isinstance(entry, tuple)]
+                try:
+                    with connection:
+                        for statement, parameters in writes:
+                            connection.execute(statement, parameters)
+                except sqlite3.Error as e:
+                    logging.error(f"Failed to save {len(writes)} session writes: {e}")
+                for entry in batch:
+                    if isinstance(entry, threading.Event):
+                        entry.set()
+                if batch[-1] is _CLOSE:
+                    return
+        finally:
+            connection.close()
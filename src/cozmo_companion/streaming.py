@@ -0,0 +1,218 @@
+import asyncio
+import queue
+import re
+
+from openai import AsyncAssistantEventHandler
+
+# Sentence punctuation always closes a piece; clause punctuation only once it is long enough
+SENTENCE_END = re.compile(r"[.!?]+[\"')\]]*\s")
+CLAUSE_END = re.compile(r"[,;:—]\s")
+MIN_CLAUSE_CHARS = 40
+
+# Marks the end of a token or text stream
+_END_OF_STREAM = object()
+
+
+class ClauseChunker:
+    """
+    Accumulates streamed tokens and cuts them into speakable pieces.
+
+    A piece is released as soon as a sentence ends, or at a clause boundary
+    once the buffered text is long enough to sound natural on its own.
+    """
+
+    def __init__(self, min_clause_chars=MIN_CLAUSE_CHARS):
+        """
+        Initialize the chunker.
+
+        Args:
+            min_clause_chars (int): Minimum length before a clause boundary releases a piece.
+        """
+        self.min_clause_chars = min_clause_chars
+        self.buffer = ""
+
+    def feed(self, token):
+        """
+        Add a token to the buffer.
+
+        Args:
+            token (str): The next piece of model output.
+
+        Returns:
+            list[str]: Pieces completed by this token, possibly empty.
+        """
+        self.buffer += token
+        pieces = []
+        while True:
+            cut = self._find_cut()
+            if cut is None:
+                return pieces
+            piece, self.buffer = self.buffer[:cut].strip(), self.buffer[cut:]
+            if piece:
+                pieces.append(piece)
+
+    def flush(self):
+        """Return whatever text is left once the stream has ended."""
+        piece, self.buffer = self.buffer.strip(), ""
+        return piece
+
+    def _find_cut(self):
+        """Return the index just past the earliest boundary in the buffer, if any."""
+        sentence = SENTENCE_END.search(self.buffer)
+        if sentence:
+            return sentence.end()
+        for clause in CLAUSE_END.finditer(self.buffer):
+            if clause.end() >= self.min_clause_chars:
+                return clause.end()
+        return None
+
+
+class StubTokenModel:
+    """
+    Local stand-in for the chat model that streams a canned reply token by token.
+
+    Useful for exercising the streaming conversation path offline with
+    realistic first-token and inter-token delays.
+    """
+
+    def __init__(self, reply, first_token_delay=0.2, token_delay=0.02):
+        """
+        Initialize the stub model.
+
+        Args:
+            reply (str): The reply to stream for every message.
+            first_token_delay (float): Seconds before the first token is produced.
+            token_delay (float): Seconds between subsequent tokens.
+        """
+        self.reply = reply
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+
+    async def stream(self, message):
+        """Yield the canned reply one word (with its trailing space) at a time."""
+        await asyncio.sleep(self.first_token_delay)
+        for index, token in enumerate(re.findall(r"\S+\s*", self.reply)):
+            if index:
+                await asyncio.sleep(self.token_delay)
+            yield token
+
+
+class _TextDeltaHandler(AsyncAssistantEventHandler):
+    """Assistant event handler that forwards text deltas into an asyncio queue."""
+
+    def __init__(self, token_queue):
+        super().__init__()
+        self.token_queue = token_queue
+
+    async def on_text_delta(self, delta, snapshot):
+        if delta.value:
+            await self.token_queue.put(delta.value)
+
+
+async def stream_assistant_reply(assistant, message, timeout=None, **run_kwargs):
+    """
+    Stream the reply of a Marvin assistant to a message as text tokens.
+
+    Args:
+        assistant (Assistant): The Marvin assistant or application to talk to.
+        message (str): The user's message.
+        timeout (float, optional): Seconds the whole reply may take to generate.
+        **run_kwargs: Passed on to the run, e.g. `additional_instructions`.
+
+    Yields:
+        str: Text deltas in the order the model produces them.
+
+    Raises:
+        TimeoutError: If the reply is not complete within the timeout.
+    """
+    token_queue = asyncio.Queue()
+    loop = asyncio.get_running_loop()
+    end = None if timeout is None else loop.time() + timeout
+
+    async def run():
+        try:
+            return await assistant.say_async(
+                message,
+                event_handler_class=_TextDeltaHandler,
+                event_handler_kwargs={"token_queue": token_queue},
+                **run_kwargs,
+            )
+        finally:
+            await token_queue.put(_END_OF_STREAM)
+
+    run_task = asyncio.create_task(run())
+    try:
+        while True:
+            remaining = None if end is None else max(0.0, end - loop.time())
+            try:
+                token = await asyncio.wait_for(token_queue.get(), remaining)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"Reply took longer than {timeout:.2f} s") from None
+            if token is _END_OF_STREAM:
+                break
+            yield token
+        # Re-raise any failure from the run itself
+        await run_task
+    finally:
+        if not run_task.done():
+            run_task.cancel()
+
+
+async def speak_token_stream(tokens, speaker, chunker=None, speech_allowed=None):
+    """
+    Speak a stream of model tokens while the model is still generating.
+
+    Tokens are cut into pieces by the chunker and handed to the speaker as
+    soon as each piece is complete; the speaker runs on a worker thread so the
+    event loop keeps consuming tokens during synthesis and playback. If the
+    speaker is interrupted, generation is abandoned at the next token.
+
+    Args:
+        tokens (AsyncIterator[str]): The model output.
+        speaker (PipelinedSpeaker): The speaker that synthesizes and plays each piece.
+        chunker (ClauseChunker, optional): Splits tokens into speakable pieces.
+        speech_allowed (asyncio.Event, optional): Playback waits for this event, while
+            tokens keep being consumed and buffered in the meantime.
+
+    Returns:
+        str: The full reply text.
+    """
+    chunker = chunker or ClauseChunker()
+    pieces = queue.Queue()
+
+    def iter_pieces():
+        while True:
+            piece = pieces.get()
+            if piece is _END_OF_STREAM:
+                return
+            yield piece
+
+    async def play_when_allowed():
+        if speech_allowed is not None:
+            await speech_allowed.wait()
+        await asyncio.to_thread(speaker.speak_chunks, iter_pieces())
+
+    playback = asyncio.create_task(play_when_allowed())
+    reply = []
+    try:
+        async for token in tokens:
+            if playback.done():
+                # Speech was interrupted; stop pulling tokens from the model
+                break
+            reply.append(token)
+            for piece in chunker.feed(token):
+                pieces.put(piece)
+        tail = chunker.flush()
+        if tail:
+            pieces.put(tail)
+    except BaseException:
+        # Drop anything that has not started playing yet
+        playback.cancel()
+        raise
+    finally:
+        pieces.put(_END_OF_STREAM)
+        # Closing the stream cancels the model run if it is still generating
+        if hasattr(tokens, "aclose"):
+            await tokens.aclose()
+    await playback
+    return "".join(reply).strip()
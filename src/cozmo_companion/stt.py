@@ -0,0 +1,507 @@
+import asyncio
+import io
+import json
+import logging
+import threading
+import wave
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import numpy as np
+from ibm_watson import ApiException
+
+from .recognizer import StreamingRecognizer
+from .resample import convert_wav, resample
+from .resilience import RemoteService
+from .response_cache import normalize_utterance
+from .tracing import tracer
+
+# Rate the on-device models are trained on; recordings are resampled to it
+LOCAL_SAMPLE_RATE = 16000
+
+
+class SpeechToTextBackend:
+    """
+    Base class for the engines that turn the user's recordings into text.
+
+    A backend transcribes whole recordings and creates streaming recognizers
+    for transcribing while the user is still speaking. One backend is shared
+    by every session of a process.
+    """
+
+    name = None
+
+    def transcribe(self, wav):
+        """
+        Transcribe a recording.
+
+        Args:
+            wav (bytes): A 16-bit WAV recording.
+
+        Returns:
+            str or None: The transcript, or None if nothing was recognized.
+        """
+        raise NotImplementedError
+
+    async def transcribe_async(self, wav):
+        """Transcribe a recording without blocking the event loop."""
+        return await asyncio.to_thread(self.transcribe, wav)
+
+    def create_streaming_recognizer(self, rate, channels, on_interim=None):
+        """
+        Create a recognizer fed with raw 16-bit PCM chunks as they are captured.
+
+        Args:
+            rate (int): Sample rate of the chunks in Hz.
+            channels (int): Interleaved channels in the chunks.
+            on_interim (callable, optional): Called with each interim hypothesis.
+
+        Returns:
+            StreamingRecognizer: A recognizer that has not been started.
+        """
+        raise NotImplementedError
+
+    def warm_up(self):
+        """Prepare the backend in the background before the first recording."""
+
+    def close(self):
+        """Release the backend's resources."""
+
+
+class WatsonSpeechToText(SpeechToTextBackend):
+    """Uploads recordings to IBM Watson Speech to Text."""
+
+    name = "watson"
+
+    def __init__(
+        self,
+        service,
+        sample_rate=None,
+        encoding="wav",
+        policy=None,
+        **recognize_kwargs,
+    ):
+        """
+        Initialize the backend.
+
+        Args:
+            service (SpeechToTextV1): The initialized Watson Speech to Text service.
+            sample_rate (int, optional): Rate recordings are resampled to before
+                upload; None uploads them at the rate they were recorded at.
+            encoding (str): Upload encoding, one of `resample.CONTENT_TYPES`.
+            policy (RemoteService, optional): Deadline, retries and circuit breaker
+                of the recognition requests; by default they are made directly.
+            **recognize_kwargs: Extra options passed with every recognition request.
+        """
+        self.service = service
+        self.sample_rate = sample_rate
+        self.encoding = encoding
+        self.policy = policy or RemoteService(self.name)
+        self.recognize_kwargs = recognize_kwargs
+
+    def transcribe(self, wav):
+        """
+        Upload a recording and return Watson's best transcript.
+
+        Raises:
+            RemoteCallError: If Watson could not be reached within the policy.
+        """
+        # Speech models run at 16 kHz, so the extra samples would only slow the upload
+        with tracer.span("resample") as span:
+            upload, content_type = convert_wav(wav, self.sample_rate, self.encoding)
+            span.set(recorded_bytes=len(wav), upload_bytes=len(upload))
+        try:
+            speech_result = self.policy.call(self._recognize, upload, content_type)
+        except ApiException as ex:
+            logging.error(f"Method failed with status code {ex.code}: {ex.message}")
+            return None
+        # Check if there are any results in the transcription
+        if not speech_result["results"]:
+            return None
+        return speech_result["results"][0]["alternatives"][0]["transcript"]
+
+    def _recognize(self, upload, content_type):
+        # Every attempt reads the upload from the start
+        with io.BytesIO(upload) as audio:
+            return self.service.recognize(
+                audio=audio, content_type=content_type, **self.recognize_kwargs
+            ).get_result()
+
+    def create_streaming_recognizer(self, rate, channels, on_interim=None):
+        """Create a recognizer streaming the chunks over Watson's websocket interface."""
+        # Imported here so sessions that record whole utterances skip the websocket client
+        from .recognizer import WatsonStreamingRecognizer
+
+        return WatsonStreamingRecognizer(
+            self.service,
+            f"audio/l16; rate={rate}; channels={channels}; endianness=little-endian",
+            on_interim=on_interim,
+            **self.recognize_kwargs,
+        )
+
+
+class LocalSpeechToText(SpeechToTextBackend):
+    """
+    Recognizes speech on the device with a model kept resident in memory.
+
+    The model is loaded once, and all decoding runs on the backend's own
+    thread pool. The pool's size bounds how many recordings are decoded at
+    the same time across sessions, so decoding never competes with the
+    event loop or with the shared pool running blocking SDK calls. The
+    engines release the GIL while decoding, so threads share one copy of
+    the model where worker processes would each need their own.
+    """
+
+    def __init__(self, engine, workers=1):
+        """
+        Initialize the backend.
+
+        Args:
+            engine: The recognition engine, such as `VoskEngine` or `WhisperEngine`.
+            workers (int): Recordings decoded at the same time.
+        """
+        self.engine = engine
+        self.name = engine.name
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="stt"
+        )
+        self._loaded = None
+        self._load_lock = threading.Lock()
+
+    def warm_up(self):
+        """Load the model on the pool so the first recording does not wait for it."""
+        self.executor.submit(self.load)
+
+    def load(self):
+        """Load the model if it is not loaded yet, and return it."""
+        with self._load_lock:
+            if self._loaded is None:
+                with tracer.span("stt_load", engine=self.name):
+                    self._loaded = self.engine.load()
+                logging.info(f"Loaded the {self.name} speech recognition model")
+            return self._loaded
+
+    def decode(self, pcm, rate):
+        """
+        Decode mono 16-bit PCM on the calling thread.
+
+        Returns:
+            str or None: The transcript, or None if nothing was recognized.
+        """
+        session = self.engine.session(self.load(), rate)
+        session.accept(pcm)
+        return session.final() or None
+
+    def transcribe(self, wav):
+        """Transcribe a recording on the calling thread."""
+        pcm, rate = read_mono_pcm(wav)
+        return self.decode(pcm, rate)
+
+    async def transcribe_async(self, wav):
+        """Transcribe a recording on the backend's pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.transcribe, wav)
+
+    def create_streaming_recognizer(self, rate, channels, on_interim=None):
+        """Create a recognizer decoding the chunks on the pool as they arrive."""
+        return LocalStreamingRecognizer(self, rate, channels, on_interim=on_interim)
+
+    def close(self):
+        """Stop the pool once the recordings being decoded are done."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class LocalStreamingRecognizer(StreamingRecognizer):
+    """
+    Decodes captured chunks on a `LocalSpeechToText` pool while the user speaks.
+
+    Chunks are decoded in the order they were captured: at most one decode
+    job per recognizer is on the pool at a time, and it drains every chunk
+    queued so far. Only the tail of the utterance is left to decode once
+    speech ends.
+    """
+
+    def __init__(self, backend, rate, channels, on_interim=None):
+        """
+        Initialize the recognizer.
+
+        Args:
+            backend (LocalSpeechToText): The backend whose model and pool are used.
+            rate (int): Sample rate of the chunks in Hz.
+            channels (int): Interleaved channels in the chunks.
+            on_interim (callable, optional): Called with each interim hypothesis.
+        """
+        super().__init__(on_interim=on_interim)
+        self.backend = backend
+        self.rate = rate
+        self.channels = channels
+        self.session = None
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._draining = None
+
+    def feed(self, chunk):
+        """Queue a chunk and make sure a decode job will pick it up."""
+        with self._lock:
+            self._pending.append(bytes(chunk))
+            if self._draining is None:
+                self._draining = self.backend.executor.submit(self._drain)
+
+    def _drain(self):
+        try:
+            while True:
+                with self._lock:
+                    if not self._pending:
+                        self._draining = None
+                        return
+                    pcm = b"".join(self._pending)
+                    self._pending.clear()
+                if self.session is None:
+                    self.session = self.backend.engine.session(
+                        self.backend.load(), self.rate
+                    )
+                hypothesis = self.session.accept(downmix(pcm, self.channels))
+                if hypothesis and (
+                    not self.interim_results or hypothesis != self.interim_results[-1]
+                ):
+                    self._handle_interim(hypothesis)
+        except BaseException:
+            # Otherwise later chunks would wait for this failed job forever
+            with self._lock:
+                self._draining = None
+            raise
+
+    def _finish(self, timeout):
+        """Wait for the queued chunks to be decoded and return the final transcript."""
+        with self._lock:
+            draining = self._draining
+        if draining is not None:
+            try:
+                draining.result(timeout)
+            except FutureTimeoutError:
+                logging.error("Timed out waiting for the final transcript")
+                # The decode job still owns the session; settle for what it heard
+                return self.interim_results[-1] if self.interim_results else None
+            except Exception as e:
+                logging.error(f"Streaming recognition failed: {e}")
+                return None
+        if self.session is None:
+            return None
+        return self.session.final()
+
+
+class VoskEngine:
+    """
+    Vosk (Kaldi) recognition: small models with streaming partial results.
+
+    Needs the optional `vosk` package and a model unpacked on disk, such as
+    vosk-model-small-en-us.
+    """
+
+    name = "vosk"
+
+    def __init__(self, model_path):
+        """
+        Initialize the engine.
+
+        Args:
+            model_path (str): Directory of the unpacked Vosk model.
+        """
+        self.model_path = model_path
+
+    def load(self):
+        """Load the model; it is shared by every recognizer session."""
+        import vosk
+
+        vosk.SetLogLevel(-1)
+        return vosk.Model(self.model_path)
+
+    def session(self, model, rate):
+        """Start recognizing one utterance sampled at `rate`."""
+        import vosk
+
+        return _VoskSession(vosk.KaldiRecognizer(model, rate))
+
+
+class _VoskSession:
+    def __init__(self, recognizer):
+        self.recognizer = recognizer
+        self.phrases = []
+
+    def accept(self, pcm):
+        # True once Kaldi has decided a phrase is complete
+        if self.recognizer.AcceptWaveform(pcm):
+            self._add_phrase(self.recognizer.Result())
+            return " ".join(self.phrases)
+        partial = json.loads(self.recognizer.PartialResult()).get("partial", "")
+        return " ".join(self.phrases + [partial] if partial else self.phrases)
+
+    def final(self):
+        self._add_phrase(self.recognizer.FinalResult())
+        return " ".join(self.phrases)
+
+    def _add_phrase(self, result):
+        text = json.loads(result).get("text", "")
+        if text:
+            self.phrases.append(text)
+
+
+class WhisperEngine:
+    """
+    Whisper recognition on the CPU through faster-whisper (CTranslate2).
+
+    More accurate than Vosk but it decodes whole utterances, so partial
+    results come from re-decoding the audio so far every `partial_seconds`.
+    Needs the optional `faster-whisper` package; the model is downloaded on
+    first use unless `model` is a local directory.
+    """
+
+    name = "whisper"
+
+    def __init__(
+        self, model="base.en", compute_type="int8", threads=0, partial_seconds=1.0
+    ):
+        """
+        Initialize the engine.
+
+        Args:
+            model (str): Model size such as "tiny.en" or "base.en", or a model directory.
+            compute_type (str): Weight precision; int8 is fastest on small CPUs.
+            threads (int): CPU threads per decode; 0 lets CTranslate2 decide.
+            partial_seconds (float): New audio needed before the next partial
+                result; 0 disables partial results.
+        """
+        self.model = model
+        self.compute_type = compute_type
+        self.threads = threads
+        self.partial_seconds = partial_seconds
+
+    def load(self):
+        """Load the model; it is shared by every recognizer session."""
+        from faster_whisper import WhisperModel
+
+        return WhisperModel(
+            self.model,
+            device="cpu",
+            compute_type=self.compute_type,
+            cpu_threads=self.threads,
+        )
+
+    def session(self, model, rate):
+        """Start recognizing one utterance sampled at `rate`."""
+        return _WhisperSession(model, rate, self.partial_seconds)
+
+
+class _WhisperSession:
+    def __init__(self, model, rate, partial_seconds):
+        self.model = model
+        self.rate = rate
+        self.partial_bytes = int(partial_seconds * rate) * 2
+        self.audio = bytearray()
+        self.decoded_bytes = 0
+        self.hypothesis = ""
+
+    def accept(self, pcm):
+        self.audio += pcm
+        if self.partial_bytes and (
+            len(self.audio) - self.decoded_bytes >= self.partial_bytes
+        ):
+            self.hypothesis = self._decode()
+        return self.hypothesis
+
+    def final(self):
+        if len(self.audio) != self.decoded_bytes:
+            self.hypothesis = self._decode()
+        return self.hypothesis
+
+    def _decode(self):
+        self.decoded_bytes = len(self.audio)
+        samples = np.frombuffer(bytes(self.audio), dtype="<i2") / 32768.0
+        samples = resample(samples, self.rate, LOCAL_SAMPLE_RATE)
+        segments, _ = self.model.transcribe(
+            samples, language="en", beam_size=1, condition_on_previous_text=False
+        )
+        return " ".join(segment.text.strip() for segment in segments).strip()
+
+
+# On-device engines selectable by name
+LOCAL_ENGINES = {
+    VoskEngine.name: VoskEngine,
+    WhisperEngine.name: WhisperEngine,
+}
+
+
+def create_local_engine(name, model=None):
+    """
+    Create an on-device recognition engine by name.
+
+    Args:
+        name (str): One of `LOCAL_ENGINES`.
+        model (str, optional): Model directory or size; engines with a default
+            use it when this is empty.
+
+    Raises:
+        ValueError: If the engine is unknown or needs a model that was not given.
+    """
+    if name not in LOCAL_ENGINES:
+        raise ValueError(
+            f"Unknown speech recognition backend: {name}. "
+            f"Expected watson or one of {', '.join(LOCAL_ENGINES)}."
+        )
+    if model:
+        return LOCAL_ENGINES[name](model)
+    if name == VoskEngine.name:
+        raise ValueError("The vosk backend needs STT_MODEL set to a model directory")
+    return LOCAL_ENGINES[name]()
+
+
+def read_mono_pcm(wav):
+    """
+    Read a 16-bit WAV recording as mono PCM.
+
+    Returns:
+        tuple: The PCM bytes and their sample rate.
+    """
+    with wave.open(io.BytesIO(wav), "rb") as wf:
+        channels, rate = wf.getnchannels(), wf.getframerate()
+        pcm = wf.readframes(wf.getnframes())
+    return downmix(pcm, channels), rate
+
+
+def downmix(pcm, channels):
+    """Average interleaved 16-bit PCM channels into one."""
+    if channels == 1:
+        return pcm
+    samples = np.frombuffer(pcm, dtype="<i2").reshape(-1, channels)
+    return samples.mean(axis=1).round().astype("<i2").tobytes()
+
+
+def word_error_rate(reference, hypothesis):
+    """
+    The fraction of reference words substituted, deleted or inserted.
+
+    Both texts are lowercased and stripped of punctuation first, so only
+    the words themselves count.
+
+    Returns:
+        float: The word-level edit distance divided by the reference length.
+    """
+    expected = normalize_utterance(reference).split()
+    heard = normalize_utterance(hypothesis or "").split()
+    if not expected:
+        return float(bool(heard))
+    # Edit distances from every prefix of the reference to the hypothesis so far
+    distances = list(range(len(expected) + 1))
+    for row, word in enumerate(heard, 1):
+        previous, distances[0] = distances[0], row
+        for column, target in enumerate(expected, 1):
+            previous, distances[column] = (
+                distances[column],
+                min(
+                    distances[column] + 1,
+                    distances[column - 1] + 1,
+                    previous + (word != target),
+                ),
+            )
+    return distances[-1] / len(expected)
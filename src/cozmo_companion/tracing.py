@@ -0,0 +1,391 @@
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextvars import ContextVar
+
+# Durations kept per span name for the rolling percentiles
+WINDOW = 500
+PERCENTILES = (50, 95, 99)
+
+# The innermost open span and the turn it belongs to, followed across tasks and threads
+_current_span = ContextVar("current_span", default=None)
+_current_turn = ContextVar("current_turn", default=None)
+
+
+class Span:
+    """A timed section of the pipeline."""
+
+    __slots__ = ("name", "span_id", "parent", "turn", "attributes", "start", "end")
+
+    def __init__(self, name, span_id, parent, turn, attributes):
+        self.name = name
+        self.span_id = span_id
+        self.parent = parent
+        self.turn = turn
+        self.attributes = attributes
+        self.start = time.time_ns()
+        self.end = None
+
+    @property
+    def duration(self):
+        """Seconds between the start and the end of the span."""
+        return (self.end - self.start) / 1e9
+
+    def set(self, **attributes):
+        """Attach attributes discovered while the span is open."""
+        self.attributes.update(attributes)
+
+
+class _SpanContext:
+    """Context manager that opens a span on enter and records it on exit."""
+
+    __slots__ = ("tracer", "name", "attributes", "span", "token")
+
+    def __init__(self, tracer, name, attributes):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self):
+        self.span, self.token = self.tracer._open(self.name, self.attributes)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.span.set(error=exc_type.__name__)
+        self.tracer._close(self.span, self.token)
+        return False
+
+
+class _NoOpSpan:
+    """Shared stand-in returned while tracing is disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+
+_NOOP_SPAN = _NoOpSpan()
+
+
+class Tracer:
+    """
+    Lightweight span timer for the voice pipeline.
+
+    Spans nest through context variables, so a span opened in a worker
+    thread or task is attributed to the conversation turn that started it.
+    Each finished turn produces a per-stage breakdown, durations feed rolling
+    p50/p95/p99 statistics and spans are handed to an optional exporter.
+    While disabled, `span` returns a shared no-op and nothing is recorded.
+    """
+
+    def __init__(self, enabled=False, exporter=None, window=WINDOW):
+        """
+        Initialize the tracer.
+
+        Args:
+            enabled (bool): Whether spans are recorded.
+            exporter: Optional object with `export(span)`, `export_turn(turn, breakdown)`
+                and `flush()`, such as `JsonLinesExporter` or `OTLPJsonExporter`.
+            window (int): Durations kept per span name for the percentiles.
+        """
+        self.enabled = enabled
+        self.exporter = exporter
+        self.window = window
+        self.durations = defaultdict(lambda: deque(maxlen=self.window))
+        self.turns = 0
+        self._next_id = 0
+        self._breakdowns = {}
+        self._lock = threading.Lock()
+
+    def configure(self, enabled=True, exporter=None):
+        """Enable or disable tracing and set the exporter."""
+        self.enabled = enabled
+        self.exporter = exporter
+
+    def span(self, name, **attributes):
+        """
+        Time a section of code with `with tracer.span("name"):`.
+
+        Args:
+            name (str): The stage being timed, e.g. "record" or "synthesize".
+            **attributes: Extra details stored with the span.
+        """
+        if not self.enabled:
+            return _NOOP_SPAN
+        return _SpanContext(self, name, attributes)
+
+    def turn(self, **attributes):
+        """Open the root span of a conversation turn; nested spans form its breakdown."""
+        if not self.enabled:
+            return _NOOP_SPAN
+        return _SpanContext(self, "turn", attributes)
+
+    def traced(self, name):
+        """Decorate a function or coroutine function so each call is a span."""
+
+        def decorator(func):
+            if inspect.iscoroutinefunction(func):
+
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(name):
+                        return await func(*args, **kwargs)
+
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def record(self, name, seconds):
+        """Record a duration measured elsewhere, such as time to first audio."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.durations[name].append(seconds)
+            turn = _current_turn.get()
+            if turn is not None and turn.span_id in self._breakdowns:
+                breakdown = self._breakdowns[turn.span_id]
+                breakdown[name] = breakdown.get(name, 0.0) + seconds
+
+    def percentiles(self, name):
+        """
+        Return rolling percentiles for a span name.
+
+        Returns:
+            dict: The sample count and p50/p95/p99 in seconds, or None without samples.
+        """
+        with self._lock:
+            samples = sorted(self.durations.get(name, ()))
+        if not samples:
+            return None
+        stats = {"count": len(samples)}
+        for percentile in PERCENTILES:
+            index = min(len(samples) - 1, round(percentile / 100 * (len(samples) - 1)))
+            stats[f"p{percentile}"] = samples[index]
+        return stats
+
+    def summary(self):
+        """Return rolling percentiles for every recorded span name."""
+        with self._lock:
+            names = list(self.durations)
+        return {name: self.percentiles(name) for name in names}
+
+    def log_summary(self):
+        """Log the rolling percentiles of every stage in milliseconds."""
+        for name, stats in self.summary().items():
+            logging.info(
+                f"{name}: n={stats['count']} "
+                + " ".join(
+                    f"p{percentile}={stats[f'p{percentile}'] * 1000:.0f}ms"
+                    for percentile in PERCENTILES
+                )
+            )
+
+    def _open(self, name, attributes):
+        parent = _current_span.get()
+        with self._lock:
+            self._next_id += 1
+            span_id = self._next_id
+        turn = _current_turn.get()
+        span = Span(name, span_id, parent, turn, attributes)
+        token = _current_span.set(span)
+        if name == "turn":
+            span.turn = span
+            with self._lock:
+                self._breakdowns[span_id] = {}
+            token = (token, _current_turn.set(span))
+        return span, token
+
+    def _close(self, span, token):
+        span.end = time.time_ns()
+        if span.name == "turn":
+            span_token, turn_token = token
+            _current_turn.reset(turn_token)
+            _current_span.reset(span_token)
+        else:
+            _current_span.reset(token)
+        duration = span.duration
+        with self._lock:
+            self.durations[span.name].append(duration)
+            if span.turn is not None and span.name != "turn":
+                # Stages overlap when they run concurrently, so they need not sum to the turn
+                breakdown = self._breakdowns.get(span.turn.span_id)
+                if breakdown is not None:
+                    breakdown[span.name] = breakdown.get(span.name, 0.0) + duration
+            breakdown = (
+                self._breakdowns.pop(span.span_id, None)
+                if span.name == "turn"
+                else None
+            )
+        if self.exporter is not None:
+            self.exporter.export(span)
+        if breakdown is not None:
+            self._finish_turn(span, breakdown)
+
+    def _finish_turn(self, span, breakdown):
+        self.turns += 1
+        logging.info(
+            f"Turn {self.turns} took {span.duration * 1000:.0f} ms: "
+            + ", ".join(
+                f"{name}={seconds * 1000:.0f}ms" for name, seconds in breakdown.items()
+            )
+        )
+        if self.exporter is not None:
+            self.exporter.export_turn(span, breakdown)
+            self.exporter.flush()
+
+
+class JsonLinesExporter:
+    """Writes one JSON object per span and per finished turn to a file."""
+
+    def __init__(self, path):
+        """
+        Initialize the exporter.
+
+        Args:
+            path (str): The JSON-lines file to append to; its directory is created.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        """Write a finished span."""
+        self._write(
+            {
+                "type": "span",
+                "name": span.name,
+                "span_id": span.span_id,
+                "parent_id": span.parent.span_id if span.parent else None,
+                "turn_id": span.turn.span_id if span.turn else None,
+                "start": span.start / 1e9,
+                "duration_ms": span.duration * 1000,
+                "attributes": span.attributes,
+            }
+        )
+
+    def export_turn(self, span, breakdown):
+        """Write the per-stage breakdown of a finished turn."""
+        self._write(
+            {
+                "type": "turn",
+                "turn_id": span.span_id,
+                "start": span.start / 1e9,
+                "duration_ms": span.duration * 1000,
+                "breakdown_ms": {
+                    name: seconds * 1000 for name, seconds in breakdown.items()
+                },
+            }
+        )
+
+    def _write(self, record):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def flush(self):
+        """Flush buffered lines to disk."""
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        """Flush and close the file."""
+        with self._lock:
+            self._file.close()
+
+
+class OTLPJsonExporter(JsonLinesExporter):
+    """
+    Writes spans in the OpenTelemetry OTLP/JSON encoding, one request per line.
+
+    The output matches what the OpenTelemetry Collector's file exporter
+    produces, so it can be replayed into any OTLP-compatible backend. Turns
+    map to traces; the per-turn breakdown is already present as spans.
+    """
+
+    SERVICE_NAME = "cozmo-companion"
+
+    def __init__(self, path):
+        super().__init__(path)
+        # Random per-process prefix keeps trace ids unique across sessions
+        self._trace_prefix = os.urandom(8).hex()
+
+    def export(self, span):
+        """Write a finished span as an OTLP `ExportTraceServiceRequest`."""
+        turn_id = span.turn.span_id if span.turn else 0
+        self._write(
+            {
+                "resourceSpans": [
+                    {
+                        "resource": {
+                            "attributes": [
+                                _otlp_attribute("service.name", self.SERVICE_NAME)
+                            ]
+                        },
+                        "scopeSpans": [
+                            {
+                                "scope": {"name": __name__},
+                                "spans": [
+                                    {
+                                        "traceId": f"{self._trace_prefix}{turn_id:016x}",
+                                        "spanId": f"{span.span_id:016x}",
+                                        "parentSpanId": (
+                                            f"{span.parent.span_id:016x}"
+                                            if span.parent
+                                            else ""
+                                        ),
+                                        "name": span.name,
+                                        "kind": 1,
+                                        "startTimeUnixNano": str(span.start),
+                                        "endTimeUnixNano": str(span.end),
+                                        "attributes": [
+                                            _otlp_attribute(key, value)
+                                            for key, value in span.attributes.items()
+                                        ],
+                                    }
+                                ],
+                            }
+                        ],
+                    }
+                ]
+            }
+        )
+
+    def export_turn(self, span, breakdown):
+        """Turns are already exported as root spans."""
+
+
+def _otlp_attribute(key, value):
+    """Encode an attribute as an OTLP `KeyValue`."""
+    if isinstance(value, bool):
+        encoded = {"boolValue": value}
+    elif isinstance(value, int):
+        encoded = {"intValue": str(value)}
+    elif isinstance(value, float):
+        encoded = {"doubleValue": value}
+    else:
+        encoded = {"stringValue": str(value)}
+    return {"key": key, "value": encoded}
+
+
+# Shared tracer for the whole pipeline; disabled until the assistant configures it
+tracer = Tracer()
@@ -0,0 +1,412 @@
+import contextlib
+import contextvars
+import io
+import logging
+import shutil
+import subprocess
+import threading
+import time
+import wave
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import numpy as np
+
+from .resilience import RemoteCallError, RemoteService
+from .response_cache import normalize_utterance
+from .tracing import tracer
+
+# Synthesis latencies kept per backend for the routing statistics
+LATENCY_WINDOW = 200
+
+# Backend chosen for the utterance being spoken, read by the synthesis thread
+_utterance_backend = contextvars.ContextVar("utterance_backend", default=None)
+
+
+class TextToSpeechBackend:
+    """
+    Base class for the engines that turn text into WAV audio.
+
+    One backend is shared by every session of a process.
+    """
+
+    name = None
+
+    def synthesize(self, text):
+        """
+        Synthesize a piece of text.
+
+        Returns:
+            bytes: The speech as a WAV file.
+        """
+        raise NotImplementedError
+
+    def warm_up(self):
+        """Prepare the backend in the background before the first utterance."""
+
+    def close(self):
+        """Release the backend's resources."""
+
+
+class WatsonTextToSpeech(TextToSpeechBackend):
+    """Synthesizes speech with IBM Watson Text to Speech."""
+
+    name = "watson"
+
+    def __init__(self, service, voice, audio_format="audio/wav", policy=None):
+        """
+        Initialize the backend.
+
+        Args:
+            service (TextToSpeechV1): The initialized Watson Text to Speech service.
+            voice (str): The Watson voice, such as "en-US_AllisonV3Voice".
+            audio_format (str): The audio format requested from the service.
+            policy (RemoteService, optional): Deadline, retries and circuit breaker
+                of the synthesis requests; by default they are made directly.
+        """
+        self.service = service
+        self.voice = voice
+        self.audio_format = audio_format
+        self.policy = policy or RemoteService(self.name)
+
+    def synthesize(self, text):
+        """
+        Synthesize text with the Watson service and return the audio bytes.
+
+        Raises:
+            RemoteCallError: If Watson could not be reached within the policy.
+        """
+        return self.policy.call(self._synthesize, text)
+
+    def _synthesize(self, text):
+        return (
+            self.service.synthesize(text, voice=self.voice, accept=self.audio_format)
+            .get_result()
+            .content
+        )
+
+
+class LocalTextToSpeech(TextToSpeechBackend):
+    """
+    Synthesizes speech on the device with a voice kept resident in memory.
+
+    No network is involved, so short phrases start playing within tens of
+    milliseconds and speech keeps working when the network does not.
+    """
+
+    def __init__(self, engine):
+        """
+        Initialize the backend.
+
+        Args:
+            engine: The synthesis engine, such as `PiperEngine` or `EspeakEngine`.
+        """
+        self.engine = engine
+        self.name = engine.name
+        self._loaded = None
+        self._load_lock = threading.Lock()
+
+    def warm_up(self):
+        """Load the voice in the background so the first phrase does not wait for it."""
+        threading.Thread(target=self.load, daemon=True).start()
+
+    def load(self):
+        """Load the voice if it is not loaded yet, and return it."""
+        with self._load_lock:
+            if self._loaded is None:
+                self._loaded = self.engine.load()
+                logging.info(f"Loaded the {self.name} voice")
+            return self._loaded
+
+    def synthesize(self, text):
+        """Synthesize text on the calling thread."""
+        return self.engine.synthesize(self.load(), text)
+
+
+class PiperEngine:
+    """
+    Piper neural voices: natural sounding and faster than real time on small CPUs.
+
+    Needs the optional `piper-tts` package and a voice model (.onnx with its
+    .onnx.json config next to it).
+    """
+
+    name = "piper"
+
+    def __init__(self, model_path):
+        """
+        Initialize the engine.
+
+        Args:
+            model_path (str): Path of the voice's .onnx model.
+        """
+        self.model_path = model_path
+
+    def load(self):
+        """Load the voice model; it is shared by every session."""
+        from piper import PiperVoice
+
+        return PiperVoice.load(self.model_path)
+
+    def synthesize(self, voice, text):
+        """Synthesize text and return WAV bytes."""
+        output = io.BytesIO()
+        with wave.open(output, "wb") as wf:
+            # Newer releases renamed the WAV writer
+            write_wav = getattr(voice, "synthesize_wav", None) or voice.synthesize
+            write_wav(text, wf)
+        return output.getvalue()
+
+
+class EspeakEngine:
+    """
+    eSpeak NG formant synthesis: robotic but near-instant and tiny.
+
+    Runs the `espeak-ng` (or `espeak`) command; each phrase is a short-lived
+    process, which costs a few milliseconds.
+    """
+
+    name = "espeak"
+
+    def __init__(self, voice="en-us", words_per_minute=175):
+        """
+        Initialize the engine.
+
+        Args:
+            voice (str): eSpeak voice name.
+            words_per_minute (int): Speaking rate.
+        """
+        self.voice = voice or "en-us"
+        self.words_per_minute = words_per_minute
+
+    def load(self):
+        """
+        Find the eSpeak command.
+
+        Raises:
+            FileNotFoundError: If eSpeak is not installed.
+        """
+        command = shutil.which("espeak-ng") or shutil.which("espeak")
+        if command is None:
+            raise FileNotFoundError("Neither espeak-ng nor espeak is installed")
+        return command
+
+    def synthesize(self, command, text):
+        """Synthesize text and return WAV bytes."""
+        return subprocess.run(
+            [
+                command,
+                "--stdout",
+                "-v",
+                self.voice,
+                "-s",
+                str(self.words_per_minute),
+                text,
+            ],
+            capture_output=True,
+            check=True,
+        ).stdout
+
+
+# On-device engines selectable by name
+LOCAL_ENGINES = {
+    PiperEngine.name: PiperEngine,
+    EspeakEngine.name: EspeakEngine,
+}
+
+
+def create_local_voice(name, voice=None):
+    """
+    Create an on-device synthesis engine by name.
+
+    Args:
+        name (str): One of `LOCAL_ENGINES`.
+        voice (str, optional): Piper model path or eSpeak voice name.
+
+    Raises:
+        ValueError: If the engine is unknown or needs a voice that was not given.
+    """
+    if name not in LOCAL_ENGINES:
+        raise ValueError(
+            f"Unknown speech synthesis engine: {name}. "
+            f"Expected one of {', '.join(LOCAL_ENGINES)}."
+        )
+    if name == PiperEngine.name and not voice:
+        raise ValueError("The piper engine needs TTS_LOCAL_VOICE set to a model path")
+    return LOCAL_ENGINES[name](voice) if voice else LOCAL_ENGINES[name]()
+
+
+class TextToSpeechRouter:
+    """
+    Chooses between Watson and an on-device voice for every utterance.
+
+    Short utterances and phrases registered as latency critical go to the
+    local voice, and so does everything else while Watson is failing: a
+    Watson call that errors or takes longer than `remote_timeout` is
+    answered by the local voice instead, and Watson is skipped for the next
+    `failure_cooldown` seconds. When the local voice fails, for instance
+    because eSpeak is not installed, the utterance goes to Watson instead.
+    Without a local voice every utterance goes to Watson, as before.
+
+    The whole utterance is routed at once, so a reply is not spoken in two
+    voices unless Watson fails halfway through it. Synthesis latency is
+    recorded per backend to tune the thresholds.
+    """
+
+    def __init__(
+        self,
+        remote,
+        local=None,
+        max_local_characters=40,
+        remote_timeout=2.0,
+        failure_cooldown=30.0,
+        local_phrases=(),
+    ):
+        """
+        Initialize the router.
+
+        Args:
+            remote (TextToSpeechBackend): The preferred, higher quality backend.
+            local (TextToSpeechBackend, optional): The on-device backend.
+            max_local_characters (int): Utterances up to this long are spoken locally.
+            remote_timeout (float): Seconds to wait for the remote backend before
+                speaking the sentence locally.
+            failure_cooldown (float): Seconds the remote backend is skipped after
+                it failed or timed out.
+            local_phrases (iterable[str]): Phrases always spoken locally, such
+                as error messages.
+        """
+        self.remote = remote
+        self.local = local
+        self.max_local_characters = max_local_characters
+        self.remote_timeout = remote_timeout
+        self.failure_cooldown = failure_cooldown
+        self.local_phrases = {normalize_utterance(p) for p in local_phrases}
+        self.fallbacks = 0
+        self.latencies = {
+            backend.name: deque(maxlen=LATENCY_WINDOW)
+            for backend in (remote, local)
+            if backend is not None
+        }
+        self._failed_at = None
+        self._lock = threading.Lock()
+        # Remote calls run here so a slow one can be abandoned
+        self._executor = (
+            ThreadPoolExecutor(max_workers=4, thread_name_prefix="tts")
+            if local is not None
+            else None
+        )
+
+    @property
+    def remote_healthy(self):
+        """Whether the remote backend has not failed within the cooldown."""
+        failed_at = self._failed_at
+        return (
+            failed_at is None or time.monotonic() - failed_at >= self.failure_cooldown
+        )
+
+    def choose(self, text):
+        """Return the backend that should speak an utterance."""
+        if self.local is None:
+            return self.remote
+        if len(text) <= self.max_local_characters:
+            return self.local
+        if normalize_utterance(text) in self.local_phrases:
+            return self.local
+        return self.remote if self.remote_healthy else self.local
+
+    @contextlib.contextmanager
+    def utterance(self, text):
+        """Route every sentence synthesized in this context by the whole text."""
+        token = _utterance_backend.set(self.choose(text))
+        try:
+            yield
+        finally:
+            _utterance_backend.reset(token)
+
+    def synthesize(self, text):
+        """
+        Synthesize text with the backend chosen for the current utterance.
+
+        Text spoken outside of `utterance`, such as a reply streamed clause
+        by clause, goes to the remote backend while it is healthy.
+
+        Returns:
+            tuple: The WAV bytes and the backend that synthesized them.
+
+        Raises:
+            RemoteCallError: If the remote backend failed and so did the local voice.
+        """
+        backend = _utterance_backend.get() or self.remote
+        if (
+            backend is self.remote
+            and self.local is not None
+            and not self.remote_healthy
+        ):
+            backend = self.local
+        if backend is self.local:
+            try:
+                return self._timed(self.local, text), self.local
+            except Exception as e:
+                logging.error(
+                    f"Local speech synthesis failed: {e}; using {self.remote.name}"
+                )
+                return self._timed(self.remote, text), self.remote
+        if self.local is None:
+            return self._timed(self.remote, text), self.remote
+        # The copied context keeps the span attached to the current turn
+        future = self._executor.submit(
+            contextvars.copy_context().run, self._timed, self.remote, text
+        )
+        try:
+            return future.result(self.remote_timeout), self.remote
+        except Exception as e:
+            # Before Python 3.11 the future's timeout is not the builtin TimeoutError
+            timed_out = isinstance(e, (FutureTimeoutError, TimeoutError))
+            reason = "timed out" if timed_out else f"failed: {e}"
+            logging.error(f"Speech synthesis {reason}; speaking it locally instead")
+            with self._lock:
+                self._failed_at = time.monotonic()
+                self.fallbacks += 1
+            try:
+                return self._timed(self.local, text), self.local
+            except Exception as local_error:
+                raise RemoteCallError(
+                    self.remote.name,
+                    f"{reason}, and the local voice failed too: {local_error}",
+                ) from e
+
+    def _timed(self, backend, text):
+        started = time.perf_counter()
+        with tracer.span(f"tts_{backend.name}", characters=len(text)):
+            audio = backend.synthesize(text)
+        self.latencies[backend.name].append(time.perf_counter() - started)
+        return audio
+
+    def latency_summary(self):
+        """
+        Summarize the recent synthesis latencies of each backend.
+
+        Returns:
+            dict: Per backend name, the call count and the p50 and p95 in milliseconds.
+        """
+        summary = {}
+        for name, latencies in self.latencies.items():
+            if latencies:
+                p50, p95 = np.percentile(list(latencies), [50, 95]) * 1000
+                summary[name] = {"count": len(latencies), "p50_ms": p50, "p95_ms": p95}
+        return summary
+
+    def warm_up(self):
+        """Load the local voice in the background."""
+        if self.local is not None:
+            self.local.warm_up()
+
+    def close(self):
+        """Abandon remote calls still in flight and release the backends."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        for backend in (self.remote, self.local):
+            if backend is not None:
+                backend.close()
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Optional
+
+
+async def cancel_tasks(*tasks):
+    """Cancel the given tasks and wait for them to finish unwinding."""
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@dataclass
+class TurnResult:
+    """Outcome of a single conversation turn."""
+
+    exit_requested: bool
+    sentiment: Optional[Any] = None
+    reply: Optional[str] = None
+
+
+class TurnScheduler:
+    """
+    Runs the per-turn LLM calls concurrently instead of one after another.
+
+    The sentiment is detected before the reply starts, so the reply is
+    generated for the user's current mood; detection is meant to be fast and
+    local. The exit check and any slower refinement of the sentiment run on
+    worker threads while the reply is generated speculatively. The reply may
+    not start speaking until the exit check has come back negative; if the
+    user wants to leave, the in-flight reply is cancelled instead.
+    """
+
+    def __init__(
+        self, check_exit, detect_sentiment, generate_reply, refine_sentiment=None
+    ):
+        """
+        Initialize the scheduler.
+
+        Args:
+            check_exit (callable): Blocking call returning True if the user wants to exit.
+            detect_sentiment (callable): Fast blocking call returning the user's sentiment.
+            generate_reply (callable): Coroutine function taking the user input and an
+                `asyncio.Event` that is set once the reply is allowed to be spoken.
+            refine_sentiment (callable, optional): Blocking call taking the user input
+                and the detected sentiment and returning a better one, e.g. from an LLM.
+        """
+        self.check_exit = check_exit
+        self.detect_sentiment = detect_sentiment
+        self.generate_reply = generate_reply
+        self.refine_sentiment = refine_sentiment
+
+    async def run(self, user_input):
+        """
+        Run one turn for the given user input.
+
+        Args:
+            user_input (str): The user's transcribed speech.
+
+        Returns:
+            TurnResult: Whether the user asked to exit, their sentiment and the reply.
+        """
+        speech_allowed = asyncio.Event()
+        exit_check = asyncio.create_task(asyncio.to_thread(self.check_exit, user_input))
+        try:
+            detected = await asyncio.to_thread(self.detect_sentiment, user_input)
+        except Exception as e:
+            logging.error(f"Failed to detect sentiment: {e}")
+            detected = None
+        except BaseException:
+            await cancel_tasks(exit_check)
+            raise
+        reply = asyncio.create_task(self.generate_reply(user_input, speech_allowed))
+        sentiment = asyncio.create_task(self._refined(user_input, detected))
+
+        try:
+            exit_requested = await exit_check
+        except BaseException:
+            await cancel_tasks(reply, sentiment)
+            raise
+
+        if exit_requested:
+            logging.info("Exit requested; cancelling the speculative reply")
+            await cancel_tasks(reply, sentiment)
+            return TurnResult(exit_requested=True)
+
+        speech_allowed.set()
+        try:
+            reply_text = await reply
+        except BaseException:
+            await cancel_tasks(sentiment)
+            raise
+        return TurnResult(
+            exit_requested=False, sentiment=await sentiment, reply=reply_text
+        )
+
+    async def _refined(self, user_input, detected):
+        """Return the refined sentiment, or the detected one if refining failed."""
+        if self.refine_sentiment is None or detected is None:
+            return detected
+        try:
+            return await asyncio.to_thread(self.refine_sentiment, user_input, detected)
+        except Exception as e:
+            logging.error(f"Failed to refine sentiment: {e}")
+            return detected
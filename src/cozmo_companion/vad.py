@@ -0,0 +1,116 @@
+import numpy as np
+
+
+def chunk_energy(chunk):
+    """
+    Compute the RMS and peak amplitude of a chunk of 16-bit PCM audio.
+
+    Args:
+        chunk (bytes-like): Little-endian signed 16-bit samples.
+
+    Returns:
+        tuple: The RMS energy and the absolute peak, covering negative excursions.
+    """
+    samples = np.frombuffer(chunk, dtype=np.int16)
+    if not samples.size:
+        return 0.0, 0
+    as_float = samples.astype(np.float32)
+    rms = float(np.sqrt(np.dot(as_float, as_float) / samples.size))
+    # Compare both extremes instead of np.abs, which overflows on -32768
+    peak = max(int(samples.max()), -int(samples.min()))
+    return rms, peak
+
+
+def buffer_energies(buffer, chunk_size):
+    """
+    Compute per-chunk RMS and peak amplitude for a whole buffer in one pass.
+
+    Args:
+        buffer (bytes-like): Little-endian signed 16-bit samples.
+        chunk_size (int): Samples per chunk; a trailing partial chunk is ignored.
+
+    Returns:
+        tuple: Arrays of RMS energies and absolute peaks, one entry per chunk.
+    """
+    samples = np.frombuffer(buffer, dtype=np.int16)
+    frames = samples[: samples.size // chunk_size * chunk_size].reshape(-1, chunk_size)
+    as_float = frames.astype(np.float32)
+    rms = np.sqrt(np.einsum("ij,ij->i", as_float, as_float) / chunk_size)
+    peak = np.maximum(
+        frames.max(axis=1).astype(np.int32), -frames.min(axis=1).astype(np.int32)
+    )
+    return rms, peak
+
+
+class VoiceActivityDetector:
+    """
+    Energy-based voice activity detector with an adaptive noise floor.
+
+    A chunk counts as speech when its RMS energy exceeds a multiple of the
+    running noise floor (and never less than a fixed minimum). The floor drops
+    quickly during pauses but rises only slowly, so steady background noise is
+    learned within a second or two while bursty speech is not. A short
+    hangover keeps trailing syllables after the energy drops.
+    """
+
+    def __init__(
+        self,
+        min_threshold=200.0,
+        noise_ratio=3.0,
+        rise_rate=0.002,
+        fall_rate=0.5,
+        hangover_chunks=8,
+    ):
+        """
+        Initialize the detector.
+
+        Args:
+            min_threshold (float): Lowest RMS energy that can ever count as speech.
+            noise_ratio (float): How far above the noise floor speech must be.
+            rise_rate (float): Weight of a louder chunk when raising the noise floor.
+            fall_rate (float): Weight of a quieter chunk when lowering the noise floor.
+            hangover_chunks (int): Chunks still treated as speech after energy drops.
+        """
+        self.min_threshold = min_threshold
+        self.noise_ratio = noise_ratio
+        self.rise_rate = rise_rate
+        self.fall_rate = fall_rate
+        self.hangover_chunks = hangover_chunks
+        self.noise_floor = min_threshold / noise_ratio
+        self._hangover = 0
+        self.in_speech = False
+
+    @property
+    def threshold(self):
+        """The current RMS energy needed for a chunk to count as speech."""
+        return max(self.min_threshold, self.noise_floor * self.noise_ratio)
+
+    def is_speech(self, chunk):
+        """
+        Classify a chunk, updating the noise floor and hangover state.
+
+        Args:
+            chunk (bytes-like): Little-endian signed 16-bit samples.
+
+        Returns:
+            bool: True if the chunk is speech or within the hangover after speech.
+        """
+        rms, _ = chunk_energy(chunk)
+        loud = rms >= self.threshold
+        rate = self.rise_rate if rms > self.noise_floor else self.fall_rate
+        self.noise_floor += rate * (rms - self.noise_floor)
+        if loud:
+            self._hangover = self.hangover_chunks
+            self.in_speech = True
+            return True
+
+        if self._hangover > 0:
+            self._hangover -= 1
+            return True
+        self.in_speech = False
+        return False
+
+    def reset(self):
+        """Forget speech state while keeping the learned noise floor."""
+        self._hangover = 0
+        self.in_speech = False
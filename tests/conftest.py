@@ -61,5 +61,10 @@ def voice_assistant_with_mocked_io(setup_marvin_env):
     assistant = VoiceAssistant()
     # assistant.last_sentiment = Sentiment.NEUTRAL  # Initialize last sentiment to NEUTRAL
     when(assistant)._speak(...)  # Mock the speak method to simulate interaction
-    when(assistant)._listen().thenReturn("I feel sad", "Tell me a joke")
+    when(assistant)._listen().thenReturn(_heard("I feel sad"), _heard("Tell me a joke"))
     return assistant
+
+
+async def _heard(text):
+    """Resolve to the given transcript, standing in for the async `_listen`."""
+    return text
@@ -0,0 +1,75 @@
+import os
+import time
+import wave
+
+import numpy as np
+import pytest
+
+from cozmo_companion.archive import AudioArchiver
+from cozmo_companion.simulation import encode_wav
+
+
+def tone_wav(seconds=0.5, rate=44100):
+    t = np.arange(int(seconds * rate)) / rate
+    return encode_wav(8000 * np.sin(2 * np.pi * 440 * t), rate)
+
+
+@pytest.mark.unit
+class TestAudioArchiver:
+    """
+    A test suite for the background recording archive.
+    """
+
+    def test_recordings_in_the_same_second_get_distinct_names(self, tmp_path):
+        """
+        Test that back-to-back recordings never overwrite each other.
+        """
+        archiver = AudioArchiver(str(tmp_path))
+        paths = [archiver.archive("user_abc", tone_wav(0.05)) for _ in range(20)]
+        archiver.close()
+        assert len(set(paths)) == 20
+        assert sorted(os.listdir(tmp_path)) == sorted(
+            os.path.basename(p) for p in paths
+        )
+
+    def test_recordings_are_downsampled(self, tmp_path):
+        """
+        Test that archived recordings can be stored at a lower rate.
+        """
+        archiver = AudioArchiver(str(tmp_path), sample_rate=16000)
+        path = archiver.archive("user", tone_wav(0.5))
+        archiver.close()
+        with wave.open(path, "rb") as wf:
+            assert wf.getframerate() == 16000
+            assert wf.getnframes() == 8000
+
+    def test_oldest_recordings_are_deleted_beyond_the_size_limit(self, tmp_path):
+        """
+        Test that the archive is trimmed to its size limit, oldest first.
+        """
+        wav = tone_wav(0.1)
+        archiver = AudioArchiver(str(tmp_path), max_bytes=int(len(wav) * 3.5))
+        paths = []
+        for _ in range(6):
+            paths.append(archiver.archive("user", wav))
+            archiver.flush()
+            # Distinct modification times keep the order unambiguous
+            time.sleep(0.01)
+        archiver.close()
+        assert sorted(os.listdir(tmp_path)) == sorted(
+            os.path.basename(p) for p in paths[-3:]
+        )
+        assert archiver.deleted == 3
+
+    def test_recordings_older_than_the_age_limit_are_deleted(self, tmp_path):
+        """
+        Test that expired recordings are removed on the next write.
+        """
+        stale = tmp_path / "user_old.wav"
+        stale.write_bytes(tone_wav(0.05))
+        os.utime(stale, (time.time() - 7200, time.time() - 7200))
+        archiver = AudioArchiver(str(tmp_path), max_age=3600)
+        archiver.archive("user", tone_wav(0.05))
+        archiver.close()
+        assert not stale.exists()
+        assert len(os.listdir(tmp_path)) == 1
@@ -0,0 +1,81 @@
+import os
+import time
+
+import pytest
+
+from cozmo_companion.audio_cache import AudioCache
+
+VOICE = "en-US_AllisonV3Voice"
+AUDIO_FORMAT = "audio/wav"
+
+
+@pytest.mark.unit
+class TestAudioCache:
+    """
+    A test suite for the synthesized speech cache used by `VoiceAssistant._synthesize`.
+    """
+
+    def test_hit_after_put(self):
+        """
+        Test that stored audio is returned for the same text, voice and format only.
+        """
+        cache = AudioCache()
+        cache.put("Goodbye!", VOICE, AUDIO_FORMAT, b"audio")
+
+        assert cache.get("Goodbye!", VOICE, AUDIO_FORMAT) == b"audio"
+        assert cache.get("Goodbye!", "en-US_MichaelV3Voice", AUDIO_FORMAT) is None
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_memory_tier_evicts_least_recently_used(self):
+        """
+        Test that the memory tier stays within its size cap by evicting the oldest entry.
+        """
+        cache = AudioCache(memory_max_bytes=10)
+        cache.put("one", VOICE, AUDIO_FORMAT, b"11111")
+        cache.put("two", VOICE, AUDIO_FORMAT, b"22222")
+        # Touch "one" so "two" becomes the least recently used entry
+        cache.get("one", VOICE, AUDIO_FORMAT)
+        cache.put("three", VOICE, AUDIO_FORMAT, b"33333")
+
+        assert cache.get("one", VOICE, AUDIO_FORMAT) == b"11111"
+        assert cache.get("two", VOICE, AUDIO_FORMAT) is None
+        assert cache.get("three", VOICE, AUDIO_FORMAT) == b"33333"
+
+    def test_entries_expire_after_ttl(self):
+        """
+        Test that entries older than the TTL are treated as misses.
+        """
+        cache = AudioCache(ttl=0.05)
+        cache.put("hello", VOICE, AUDIO_FORMAT, b"audio")
+        time.sleep(0.1)
+        assert cache.get("hello", VOICE, AUDIO_FORMAT) is None
+
+    def test_disk_tier_survives_restart_and_is_capped(self, tmp_path):
+        """
+        Test that disk entries are found by a new cache and old files are evicted beyond the cap.
+        """
+        cache = AudioCache(disk_dir=str(tmp_path), disk_max_bytes=12)
+        cache.put("one", VOICE, AUDIO_FORMAT, b"11111")
+        cache.put("two", VOICE, AUDIO_FORMAT, b"22222")
+        cache.put("three", VOICE, AUDIO_FORMAT, b"33333")
+
+        restarted = AudioCache(disk_dir=str(tmp_path))
+        assert len(os.listdir(tmp_path)) == 2
+        assert restarted.get("three", VOICE, AUDIO_FORMAT) == b"33333"
+
+    def test_prewarm_only_synthesizes_missing_phrases(self):
+        """
+        Test that prewarming skips cached phrases and plays hits without synthesis.
+        """
+        synthesized = []
+
+        def synthesize(text):
+            synthesized.append(text)
+            return text.encode()
+
+        cache = AudioCache()
+        cache.put("Hello!", VOICE, AUDIO_FORMAT, b"cached")
+        cache.prewarm(["Hello!", "Goodbye!"], VOICE, AUDIO_FORMAT, synthesize)
+
+        assert synthesized == ["Goodbye!"]
+        assert cache.get("Goodbye!", VOICE, AUDIO_FORMAT) == b"Goodbye!"
@@ -0,0 +1,136 @@
+import asyncio
+import wave
+
+import numpy as np
+import pytest
+
+from cozmo_companion.capture import CaptureEngine, FileCaptureDevice
+from cozmo_companion.recorder import Recorder
+
+
+def write_tone(path, chunks, amplitude=8000):
+    """Write a mono 16-bit WAV file holding a tone of the given number of recorder chunks."""
+    frames = chunks * Recorder.CHUNK_SIZE
+    samples = amplitude * np.sin(np.linspace(0, 40 * np.pi * chunks, frames))
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(Recorder.CHANNELS)
+        wf.setsampwidth(2)
+        wf.setframerate(Recorder.RATE)
+        wf.writeframes(samples.astype(np.int16).tobytes())
+
+
+def file_device(*paths, speed=20):
+    """Return a file-backed device delivering chunks faster than real time."""
+    return FileCaptureDevice(
+        Recorder.RATE, Recorder.CHANNELS, Recorder.CHUNK_SIZE, paths, speed=speed
+    )
+
+
+@pytest.mark.unit
+class TestCaptureEngine:
+    """
+    A test suite for the session-long capture engine and its file-backed device.
+    """
+
+    @pytest.mark.asyncio
+    async def test_chunks_are_views_into_the_ring(self, tmp_path):
+        """
+        Test that subscribers receive chunk-sized views at increasing ring positions.
+        """
+        write_tone(tmp_path / "tone.wav", 3)
+        engine = CaptureEngine(file_device(str(tmp_path / "tone.wav")))
+        received = []
+        # Subscribe before starting so no chunk is missed
+        chunks = engine.chunks()
+        consumer = asyncio.ensure_future(chunks.__anext__())
+        await asyncio.sleep(0)
+        engine.start()
+        try:
+            received.append(await consumer)
+            async for chunk in chunks:
+                received.append(chunk)
+                if len(received) == 5:
+                    break
+        finally:
+            await chunks.aclose()
+            engine.stop()
+
+        frame_size = engine.buffer.frame_size
+        assert [chunk.position for chunk in received] == [
+            index * frame_size for index in range(5)
+        ]
+        assert all(len(chunk.data) == frame_size for chunk in received)
+
+    @pytest.mark.asyncio
+    async def test_recorder_saves_speech_without_blocking(self, tmp_path):
+        """
+        Test that an async recording ends on silence while the event loop stays responsive.
+        """
+        write_tone(tmp_path / "speech.wav", 10)
+        engine = CaptureEngine(file_device(str(tmp_path / "speech.wav")))
+        recorder = Recorder(str(tmp_path / "user.wav"), record_seconds=10)
+        recorder.SILENCE_THRESHOLD = 20
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        ticking = asyncio.ensure_future(ticker())
+        engine.start()
+        try:
+            await asyncio.wait_for(recorder.record_async(engine), timeout=5)
+        finally:
+            engine.stop()
+            ticking.cancel()
+
+        with wave.open(str(tmp_path / "user.wav"), "rb") as wf:
+            # The tone plus hangover, with no pre-roll since speech starts immediately
+            assert wf.getnframes() >= 10 * Recorder.CHUNK_SIZE
+        assert ticks > 10
+
+    @pytest.mark.asyncio
+    async def test_stop_ends_subscriptions(self):
+        """
+        Test that stopping the engine ends chunk iteration instead of hanging consumers.
+        """
+        engine = CaptureEngine(file_device(speed=1))
+        engine.start()
+        chunks = engine.chunks()
+        await chunks.__anext__()
+        engine.stop()
+
+        async def drain():
+            return [chunk async for chunk in chunks]
+
+        remaining = await asyncio.wait_for(drain(), timeout=1)
+        # At most the chunks already queued before the stop are delivered
+        assert len(remaining) <= 2
+
+    @pytest.mark.asyncio
+    async def test_replay_from_earlier_position(self, tmp_path):
+        """
+        Test that a subscriber can start from audio captured before it subscribed,
+        as when the user talked over the bot.
+        """
+        engine = CaptureEngine(file_device())
+        engine.start()
+        try:
+            first = engine.chunks()
+            earlier = await first.__anext__()
+            for _ in range(3):
+                await first.__anext__()
+            await first.aclose()
+
+            replay = engine.chunks(start=earlier.position)
+            positions = [(await replay.__anext__()).position for _ in range(6)]
+            await replay.aclose()
+        finally:
+            engine.stop()
+
+        frame_size = engine.buffer.frame_size
+        assert positions == [
+            earlier.position + index * frame_size for index in range(6)
+        ]
@@ -20,9 +20,10 @@ class TestBasicFunctionality:
             ("hello", False),
         ],
     )
-    def test_check_exit_command(self, marvin_assistant, user_input, expected):
+    def test_check_exit_command(self, user_input, expected):
         """
         Test the check_exit_command function to verify if the user input signals an exit command.
+        These cases are resolved locally, so no Marvin configuration or network access is needed.
         """
         is_exit_command = check_exit_command(user_input)
         assert (
@@ -0,0 +1,86 @@
+import pytest
+
+from cozmo_companion.history import ConversationHistory, Turn, extractive_summary
+
+
+def word_count(text):
+    return len(text.split())
+
+
+@pytest.mark.unit
+class TestConversationHistory:
+    """
+    A test suite for the token-budgeted conversation history.
+    """
+
+    def test_turn_records_have_no_instance_dict(self):
+        """
+        Test that turn records use slots to stay compact.
+        """
+        turn = Turn(0, "hello", reply="hi there")
+        assert not hasattr(turn, "__dict__")
+        assert turn.transcript() == "User: hello\nCompanion: hi there"
+
+    @pytest.mark.asyncio
+    async def test_old_turns_are_evicted_and_summarized(self):
+        """
+        Test that turns beyond the budget leave the window and reach the summary.
+        """
+        history = ConversationHistory(token_budget=20, count_tokens=word_count)
+        for index in range(6):
+            history.add(f"message {index} is here", "a short reply")
+
+        assert history.window_tokens <= 20
+        assert [turn.index for turn in history] == [4, 5]
+        assert history.needs_summary
+
+        await history.summarize_evicted()
+        assert not history.needs_summary
+        assert "message 0 is here" in history.summary
+        assert "message 3 is here" in history.summary
+
+    @pytest.mark.asyncio
+    async def test_failed_summarizer_falls_back_to_extracts(self):
+        """
+        Test that an LLM summarizer failure keeps the conversation summarized.
+        """
+
+        async def summarize(summary, turns):
+            raise RuntimeError("service unavailable")
+
+        history = ConversationHistory(
+            token_budget=5, summarize=summarize, count_tokens=word_count
+        )
+        history.add("I had a rough day. Work was hard.", "I'm sorry to hear that.")
+        history.add("can you show me a picture", "Here you go!")
+
+        await history.summarize_evicted()
+        assert history.summary == "- The user said: I had a rough day."
+
+    def test_thread_rotates_and_context_carries_recent_turns(self):
+        """
+        Test that an oversized thread is replaced and its turns move into the context.
+        """
+        history = ConversationHistory(token_budget=12, count_tokens=word_count)
+        history.add("first message", "first reply")
+        assert not history.rotate_thread()
+        assert history.context() == ""
+
+        history.add("second message", "second reply")
+        history.add("third message", "third reply")
+        assert history.rotate_thread()
+        assert history.thread_tokens == 0
+        context = history.context()
+        assert "User: third message" in context
+        assert "first message" not in context
+
+    def test_extractive_summary_stays_within_budget(self):
+        """
+        Test that the local summary drops its oldest lines once it is too long.
+        """
+        turns = [
+            Turn(index, f"topic number {index}. more detail") for index in range(50)
+        ]
+        summary = extractive_summary("", turns, token_budget=40)
+        assert len(summary) // 4 <= 40
+        assert summary.endswith("topic number 49.")
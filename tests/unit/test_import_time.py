@@ -0,0 +1,52 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Modules that take most of the startup time and are only needed in a session
+HEAVY_MODULES = ("marvin", "openai", "ibm_watson", "pydub", "numpy", "pyaudio")
+
+
+def imported_modules(statement):
+    """Run `statement` in a fresh interpreter and return the modules it imported."""
+    env = dict(os.environ)
+    src = os.path.join(os.path.dirname(__file__), "..", "..", "src")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [src, env.get("PYTHONPATH")]))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    # Each line of -X importtime output ends with "| <indent><module>"
+    return {
+        line.rsplit("|", 1)[1].strip()
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:") and "|" in line
+    }
+
+
+@pytest.mark.unit
+class TestImportTime:
+    """
+    A test suite for keeping the command-line interface quick to start.
+    """
+
+    def test_cli_does_not_import_the_sdks(self):
+        """
+        Test that importing the CLI leaves the speech and chat SDKs unloaded.
+        """
+        modules = imported_modules("import cozmo_companion.cli")
+        assert "cozmo_companion.cli" in modules
+        loaded = {m.split(".")[0] for m in modules} & set(HEAVY_MODULES)
+        assert not loaded
+        assert "cozmo_companion.assistant" not in modules
+
+    def test_server_does_not_import_the_assistant(self):
+        """
+        Test that the session server only needs the settings to be imported.
+        """
+        modules = imported_modules("import cozmo_companion.server")
+        assert "cozmo_companion.assistant" not in modules
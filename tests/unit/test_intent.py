@@ -0,0 +1,99 @@
+import pytest
+
+from cozmo_companion.intent import ExitIntentDetector
+
+
+class CountingLLM:
+    """Stand-in for the LLM exit check that records every call."""
+
+    def __init__(self, answer=False):
+        self.answer = answer
+        self.calls = []
+
+    def __call__(self, user_input):
+        self.calls.append(user_input)
+        return self.answer
+
+
+@pytest.mark.unit
+class TestExitIntentDetector:
+    """
+    A test suite for the tiered exit intent detector in front of the LLM exit check.
+    """
+
+    @pytest.mark.parametrize(
+        "user_input, expected",
+        [
+            ("i've got to go", True),
+            ("Need to end conversation", True),
+            ("goodbye", True),
+            ("Okay, thanks!", True),
+            ("see ya later", True),
+            ("goodby", True),
+            ("ok bye", True),
+            ("well i really have to go now", True),
+            ("hello", False),
+            ("tell me a joke", False),
+            ("how are you doing today", False),
+        ],
+    )
+    def test_clear_cases_are_resolved_locally(self, user_input, expected):
+        """
+        Test that clear exit and non-exit inputs never reach the LLM.
+        """
+        llm = CountingLLM()
+        detector = ExitIntentDetector(llm)
+        assert detector(user_input) == expected
+        assert llm.calls == []
+        assert detector.short_circuited == 1
+
+    @pytest.mark.parametrize(
+        "user_input",
+        [
+            "thanks for the joke, tell me another",
+            "please stop talking about that",
+            "my dog ran away and i never got to say goodbye",
+            "i have to go to the doctor tomorrow and i am scared",
+            "i had a good night",
+            "i got to go to the zoo today",
+        ],
+    )
+    def test_ambiguous_input_falls_back_to_llm(self, user_input):
+        """
+        Test that exit words used in a longer sentence are decided by the LLM.
+        """
+        llm = CountingLLM(answer=False)
+        detector = ExitIntentDetector(llm)
+        assert detector(user_input) is False
+        assert llm.calls == [user_input]
+        assert detector.stats["llm"] == 1
+        assert detector.short_circuited == 0
+
+    @pytest.mark.parametrize(
+        "user_input",
+        [
+            "i need to head out",
+            "i have to run now",
+            "i'm off to bed",
+            "it's getting late",
+            "take care",
+            "signing off for today",
+        ],
+    )
+    def test_exits_without_a_goodbye_reach_the_llm(self, user_input):
+        """
+        Test that ways of leaving without an exit phrase are not ruled out locally.
+        """
+        llm = CountingLLM(answer=True)
+        detector = ExitIntentDetector(llm)
+        assert detector(user_input) is True
+        assert llm.calls == [user_input]
+
+    def test_configured_phrases(self):
+        """
+        Test that configured phrases are treated as clear exit signals.
+        """
+        llm = CountingLLM()
+        detector = ExitIntentDetector(llm, extra_phrases=["catch you on the flip side"])
+        assert detector("ok catch you on the flip side") is True
+        assert llm.calls == []
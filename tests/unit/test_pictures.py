@@ -0,0 +1,131 @@
+import threading
+import time
+
+import pytest
+
+from cozmo_companion.pictures import (
+    ALREADY_PAINTING_MESSAGE,
+    CACHED_MESSAGE,
+    PAINTING_MESSAGE,
+    PictureService,
+)
+from cozmo_companion.simulation import LatencyModel, SimulatedPainter
+
+
+@pytest.mark.unit
+class TestPictureService:
+    """
+    A test suite for painting pictures without holding up the conversation.
+    """
+
+    def test_request_returns_before_the_picture_is_painted(self):
+        """
+        Test that asking for a picture does not wait for it, and repeats hit the cache.
+        """
+        painter = SimulatedPainter(LatencyModel(0.2, distribution="fixed"))
+        shown = []
+        service = PictureService(painter, shown.append)
+
+        started = time.perf_counter()
+        assert service.request("A happy otter!") == PAINTING_MESSAGE
+        assert time.perf_counter() - started < 0.05
+        assert service.request("a happy otter") == ALREADY_PAINTING_MESSAGE
+        service.wait()
+        assert shown == ["https://pictures.invalid/1.png"]
+
+        assert service.request("a happy otter") == CACHED_MESSAGE
+        service.close()
+        assert painter.calls == 1
+
+    def test_concurrency_is_limited(self):
+        """
+        Test that no more than the allowed number of pictures are painted at once.
+        """
+        active, peak, lock = [0], [0], threading.Lock()
+
+        def paint(prompt):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            return prompt
+
+        service = PictureService(paint, lambda url: None, max_concurrent=2)
+        for index in range(6):
+            service.request(f"picture {index}")
+        service.wait()
+        service.close()
+        assert peak[0] == 2
+        assert service.delivered == 6
+
+    def test_late_pictures_are_cached_but_not_shown(self):
+        """
+        Test that a picture ready after the timeout is kept but not delivered.
+        """
+        painter = SimulatedPainter(LatencyModel(0.1, distribution="fixed"))
+        shown = []
+        service = PictureService(painter, shown.append, timeout=0.01)
+        service.request("a sunset")
+        service.wait()
+        assert shown == []
+        assert service.timed_out == 1
+
+        assert service.request("a sunset") == CACHED_MESSAGE
+        deadline = time.monotonic() + 1.0
+        while not shown and time.monotonic() < deadline:
+            time.sleep(0.01)
+        service.close()
+        assert shown == ["https://pictures.invalid/1.png"]
+
+    def test_painting_failures_are_contained(self):
+        """
+        Test that a failing painter is logged and counted instead of raising.
+        """
+
+        def paint(prompt):
+            raise RuntimeError("content policy")
+
+        service = PictureService(paint, lambda url: None)
+        service.request("anything")
+        service.wait()
+        assert service.failed == 1
+        # A failed prompt can be asked for again
+        assert service.request("anything") == PAINTING_MESSAGE
+        service.wait()
+        service.close()
+
+    def test_expired_pictures_are_painted_again(self):
+        """
+        Test that a cached picture is not reused once its URL is about to expire.
+        """
+        painter = SimulatedPainter(LatencyModel(0.0, distribution="fixed"))
+        service = PictureService(painter, lambda url: None, cache_ttl=0.05)
+        service.request("a lighthouse")
+        service.wait()
+        assert service.request("a lighthouse") == CACHED_MESSAGE
+        time.sleep(0.06)
+        assert service.request("a lighthouse") == PAINTING_MESSAGE
+        service.wait()
+        service.close()
+        assert painter.calls == 2
+
+    def test_pictures_go_to_whoever_asked(self):
+        """
+        Test that each requester gets the picture through its own delivery, and a
+        second requester joins a painting in progress.
+        """
+        painter = SimulatedPainter(LatencyModel(0.05, distribution="fixed"))
+        first, second = [], []
+        service = PictureService(painter, lambda url: None)
+        assert service.request("a red fox", deliver=first.append) == PAINTING_MESSAGE
+        assert service.request("a red fox", deliver=second.append) == PAINTING_MESSAGE
+        assert (
+            service.request("a red fox", deliver=second.append)
+            == ALREADY_PAINTING_MESSAGE
+        )
+        service.wait()
+        service.close()
+        assert first == second == ["https://pictures.invalid/1.png"]
+        assert painter.calls == 1
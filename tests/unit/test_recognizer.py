@@ -0,0 +1,89 @@
+import time
+
+import pytest
+
+from cozmo_companion.recognizer import (
+    FakeStreamingRecognizer,
+    WatsonStreamingRecognizer,
+)
+
+
+class FakeWebsocketService:
+    """
+    Stand-in for SpeechToTextV1 that answers over the websocket callback interface.
+
+    It drains the audio queue until recording completes, publishing an interim
+    result per chunk, then sends a single final result and closes the stream.
+    """
+
+    def __init__(self, transcript):
+        self.transcript = transcript
+        self.chunks = []
+        self.options = None
+
+    def recognize_using_websocket(
+        self, audio, content_type, recognize_callback, **options
+    ):
+        self.options = dict(options, content_type=content_type)
+        while audio.is_recording or not audio.input.empty():
+            if audio.input.empty():
+                time.sleep(0.001)
+                continue
+            self.chunks.append(audio.input.get())
+            recognize_callback.on_data(
+                {"results": [{"final": False, "alternatives": [{"transcript": "h"}]}]}
+            )
+        recognize_callback.on_data(
+            {
+                "results": [
+                    {"final": True, "alternatives": [{"transcript": self.transcript}]}
+                ]
+            }
+        )
+        recognize_callback.on_close()
+
+
+@pytest.mark.unit
+class TestStreamingRecognizer:
+    """
+    A test suite for the streaming recognizers used by `VoiceAssistant._listen_streaming`.
+    """
+
+    def test_fake_recognizer_reveals_interim_results(self):
+        """
+        Test that interim hypotheses grow as chunks arrive and the final transcript is complete.
+        """
+        interim = []
+        recognizer = FakeStreamingRecognizer(
+            "tell me a joke", chunks_per_word=2, on_interim=interim.append
+        )
+        recognizer.start()
+        for _ in range(8):
+            recognizer.feed(b"\x00\x00" * 1024)
+
+        assert interim == ["tell", "tell me", "tell me a", "tell me a joke"]
+        assert recognizer.finish() == "tell me a joke"
+        assert recognizer.finalize_latency is not None
+
+    def test_fake_recognizer_without_audio_returns_none(self):
+        """
+        Test that finishing without any audio yields no transcript.
+        """
+        recognizer = FakeStreamingRecognizer("hello")
+        recognizer.start()
+        assert recognizer.finish() is None
+
+    def test_watson_recognizer_streams_chunks(self):
+        """
+        Test that the Watson adapter forwards chunks and collects the final transcript.
+        """
+        service = FakeWebsocketService("i feel sad ")
+        recognizer = WatsonStreamingRecognizer(service, "audio/l16; rate=44100")
+        recognizer.start()
+        for _ in range(3):
+            recognizer.feed(b"\x01\x00" * 16)
+
+        assert recognizer.finish(timeout=2) == "i feel sad"
+        assert len(service.chunks) == 3
+        assert service.options["interim_results"] is True
+        assert recognizer.interim_results == ["h", "h", "h"]
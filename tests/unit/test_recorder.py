@@ -0,0 +1,60 @@
+import wave
+
+import numpy as np
+import pytest
+
+from cozmo_companion.recorder import Recorder
+
+
+class FakeStream:
+    """Stand-in for a PyAudio input stream that replays scripted chunks."""
+
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+
+    def read(self, chunk_size):
+        if self.chunks:
+            return self.chunks.pop(0)
+        return bytes(chunk_size * 2)
+
+
+def chunk(amplitude):
+    """Return one recorder chunk of a sine wave with the given peak amplitude."""
+    samples = amplitude * np.sin(np.linspace(0, 40 * np.pi, Recorder.CHUNK_SIZE))
+    return samples.astype(np.int16).tobytes()
+
+
+@pytest.mark.unit
+class TestRecorder:
+    """
+    A test suite for capturing audio into the recorder's ring buffer.
+    """
+
+    def test_speech_keeps_pauses_and_pre_roll(self, tmp_path):
+        """
+        Test that the saved speech includes the pre-roll and the pause inside the utterance.
+        """
+        silence, speech = chunk(0), chunk(8000)
+        script = [silence] * 10 + [speech] * 3 + [silence] * 2 + [speech] * 3
+        recorder = Recorder(str(tmp_path / "user.wav"), record_seconds=1)
+        recorder.vad.hangover_chunks = 0
+        received = []
+        recorder.on_chunk = received.append
+
+        recorder._record_audio_chunks(FakeStream(script))
+        recorder._save_audio_to_file(2, recorder.speech_segments())
+
+        expected_chunks = Recorder.PRE_ROLL_CHUNKS + 3 + 2 + 3
+        with wave.open(str(tmp_path / "user.wav"), "rb") as wf:
+            assert wf.getnframes() == expected_chunks * Recorder.CHUNK_SIZE
+        assert len(received) == int(Recorder.RATE / Recorder.CHUNK_SIZE * 1)
+
+    def test_buffer_is_bounded(self):
+        """
+        Test that the preallocated buffer does not grow with the recording duration.
+        """
+        recorder = Recorder("unused.wav", record_seconds=3600)
+        recorder._allocate_buffer()
+        assert recorder.buffer.capacity <= (
+            Recorder.RATE * Recorder.MAX_BUFFER_SECONDS * 2 + Recorder.CHUNK_SIZE * 2
+        )
@@ -0,0 +1,68 @@
+import io
+import wave
+
+import numpy as np
+import pytest
+
+from cozmo_companion.resample import convert_wav, resample, resample_pcm16
+from cozmo_companion.simulation import encode_wav
+
+
+def tone(frequency, seconds=1.0, rate=44100):
+    t = np.arange(int(seconds * rate)) / rate
+    return np.sin(2 * np.pi * frequency * t)
+
+
+def rms_db(samples):
+    trimmed = samples[500:-500]
+    return 20 * np.log10(np.sqrt(np.mean(trimmed**2)) / np.sqrt(0.5))
+
+
+@pytest.mark.unit
+class TestResample:
+    """
+    A test suite for the polyphase resampler applied before recognition.
+    """
+
+    def test_speech_band_passes_and_aliases_are_rejected(self):
+        """
+        Test that tones below the new Nyquist survive and those above it vanish.
+        """
+        assert abs(rms_db(resample(tone(1000), 44100, 16000))) < 0.1
+        # 12 kHz would alias to 4 kHz without the anti-aliasing filter
+        assert rms_db(resample(tone(12000), 44100, 16000)) < -60
+
+    def test_output_length_and_channels(self):
+        """
+        Test that the output has the rate's number of frames and the input's channels.
+        """
+        stereo = np.column_stack([tone(440), tone(880)])
+        resampled = resample(stereo, 44100, 16000)
+        assert resampled.shape == (16000, 2)
+        assert len(resample(tone(440), 44100, 8000)) == 8000
+
+    def test_pcm16_is_clipped_to_range(self):
+        """
+        Test that a full-scale signal does not wrap around after filtering.
+        """
+        square = np.where(tone(100) >= 0, 32767, -32768).astype("<i2")
+        resampled = np.frombuffer(
+            resample_pcm16(square.tobytes(), 1, 44100, 16000), dtype="<i2"
+        )
+        # Ringing at the edges overshoots full scale and would wrap around unclipped
+        overshoot = resample(square, 44100, 16000)
+        assert overshoot.max() > 32767
+        expected = np.clip(np.round(overshoot), -32768, 32767).astype("<i2")
+        assert np.array_equal(resampled, expected)
+
+    def test_convert_wav_shrinks_the_upload(self):
+        """
+        Test that a 44.1 kHz recording is re-encoded as a smaller 16 kHz WAV.
+        """
+        wav = encode_wav(8000 * tone(300), 44100)
+        upload, content_type = convert_wav(wav, 16000)
+        assert content_type == "audio/wav"
+        assert len(upload) < len(wav) * 0.37
+        with wave.open(io.BytesIO(upload), "rb") as wf:
+            assert wf.getframerate() == 16000
+        assert convert_wav(wav) == (wav, "audio/wav")
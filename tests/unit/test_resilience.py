@@ -0,0 +1,245 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from cozmo_companion.resilience import (
+    MAX_WORKERS,
+    CircuitBreaker,
+    CircuitOpenError,
+    RemoteCallError,
+    RemoteService,
+    is_retryable,
+    remaining_time,
+)
+from cozmo_companion.simulation import (
+    FaultModel,
+    LatencyModel,
+    SimulatedServiceError,
+    SimulatedSpeechToText,
+    speech_like_wav,
+)
+from cozmo_companion.stt import WatsonSpeechToText
+
+
+class StatusError(Exception):
+    """An HTTP error as raised by the service SDKs."""
+
+    def __init__(self, code):
+        super().__init__(f"status {code}")
+        self.code = code
+
+
+class ScriptedCall:
+    """Callable that fails, stalls or answers according to a script of outcomes."""
+
+    def __init__(self, *outcomes, default="ok"):
+        self.outcomes = list(outcomes)
+        self.default = default
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def next_outcome(self):
+        with self._lock:
+            self.calls += 1
+            return self.outcomes.pop(0) if self.outcomes else self.default
+
+    def __call__(self):
+        outcome = self.next_outcome()
+        if isinstance(outcome, Exception):
+            raise outcome
+        if isinstance(outcome, float):
+            time.sleep(outcome)
+            return "slow"
+        return outcome
+
+    async def call_async(self):
+        outcome = self.next_outcome()
+        if isinstance(outcome, Exception):
+            raise outcome
+        if isinstance(outcome, float):
+            await asyncio.sleep(outcome)
+            return "slow"
+        return outcome
+
+
+@pytest.mark.unit
+class TestRemoteService:
+    """
+    A test suite for deadlines, retries, hedging and circuit breaking of remote calls.
+    """
+
+    def test_transient_errors_are_retried(self):
+        """
+        Test that throttling and server errors are retried but a bad request is not.
+        """
+        assert is_retryable(StatusError(503)) and is_retryable(StatusError(429))
+        assert is_retryable(TimeoutError()) and is_retryable(ConnectionError())
+        assert not is_retryable(StatusError(400)) and not is_retryable(ValueError())
+
+        service = RemoteService("stt", retries=2, backoff=0.01, seed=1)
+        call = ScriptedCall(StatusError(503), StatusError(429))
+        assert service.call(call) == "ok"
+        assert call.calls == 3 and service.stats["retries"] == 2
+
+        call = ScriptedCall(StatusError(400))
+        with pytest.raises(StatusError):
+            service.call(call)
+        assert call.calls == 1
+
+    def test_retries_stop_when_exhausted(self):
+        """
+        Test that the last error is wrapped once every retry has failed.
+        """
+        service = RemoteService("tts", retries=1, backoff=0.01)
+        call = ScriptedCall(default=StatusError(500))
+        with pytest.raises(RemoteCallError) as raised:
+            service.call(call)
+        assert isinstance(raised.value.__cause__, StatusError)
+        assert call.calls == 2 and service.stats["failures"] == 1
+
+    def test_stalled_attempt_is_abandoned_and_retried_within_the_budget(self):
+        """
+        Test that a hung attempt times out, is retried and the call meets its budget.
+        """
+        service = RemoteService("llm", budget=1.0, retries=1, backoff=0.01)
+        started = time.perf_counter()
+        assert service.call(ScriptedCall(5.0)) == "ok"
+        assert 0.5 <= time.perf_counter() - started < 0.8
+
+        started = time.perf_counter()
+        with pytest.raises(RemoteCallError):
+            service.call(ScriptedCall(default=5.0))
+        assert time.perf_counter() - started < 1.2
+
+    def test_abandoned_attempts_end_and_free_their_threads(self):
+        """
+        Test that attempts which wait on the deadline, as the HTTP clients do, stop
+        there, so more stalls than there are threads leave the service usable.
+        """
+        assert remaining_time() is None
+        faults = FaultModel(stall_rate=1.0, stall_seconds=30.0)
+        service = RemoteService("stt", budget=0.1)
+        for _ in range(MAX_WORKERS + 2):
+            with pytest.raises(RemoteCallError):
+                service.call(faults.inject)
+        assert faults.stalls == MAX_WORKERS + 2
+        assert 0.05 < service.call(remaining_time) <= 0.1
+
+    def test_slow_attempt_is_hedged_after_the_p95(self):
+        """
+        Test that a second request is sent past the usual latency and the faster one wins.
+        """
+        service = RemoteService("stt", budget=5.0, hedge=True, min_samples=5)
+        assert service.call(ScriptedCall(1.0)) == "slow"
+        assert service.stats["hedges"] == 0
+        # One slow call in twenty does not move the p95
+        for _ in range(19):
+            service.call(ScriptedCall(0.02))
+        assert 0.02 <= service.hedge_delay() < 0.1
+
+        started = time.perf_counter()
+        assert service.call(ScriptedCall(2.0, 0.02)) == "slow"
+        assert time.perf_counter() - started < 0.5
+        assert service.stats["hedges"] == 1 and service.stats["hedge_wins"] == 1
+
+    def test_async_calls_time_out_retry_and_hedge(self):
+        """
+        Test that coroutine calls get the same deadline, retries and hedging.
+        """
+        service = RemoteService(
+            "reply", budget=1.0, retries=1, backoff=0.01, hedge=True, min_samples=3
+        )
+
+        async def main():
+            call = ScriptedCall(5.0)
+            assert await service.call_async(call.call_async) == "ok"
+            assert call.calls == 2
+            for _ in range(3):
+                await service.call_async(ScriptedCall(0.02).call_async)
+            started = time.perf_counter()
+            assert await service.call_async(ScriptedCall(2.0, 0.02).call_async)
+            return time.perf_counter() - started
+
+        assert asyncio.run(main()) < 0.3
+        assert service.stats["hedge_wins"] == 1
+
+    def test_circuit_opens_rejects_and_recovers(self):
+        """
+        Test that repeated failures stop calls until a probe after the reset succeeds.
+        """
+        breaker = CircuitBreaker(failure_threshold=2, reset_seconds=0.1)
+        service = RemoteService("tts", breaker=breaker)
+        call = ScriptedCall(StatusError(503), StatusError(503))
+        for _ in range(2):
+            with pytest.raises(RemoteCallError):
+                service.call(call)
+        assert breaker.state == "open"
+        with pytest.raises(CircuitOpenError):
+            service.call(call)
+        assert call.calls == 2 and service.stats["rejected"] == 1
+
+        time.sleep(0.12)
+        assert breaker.state == "half-open"
+        assert service.call(call) == "ok"
+        assert breaker.state == "closed"
+
+    def test_failed_probe_reopens_the_circuit(self):
+        """
+        Test that one failure in the half-open state opens the circuit again.
+        """
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.05)
+        breaker.record_failure()
+        time.sleep(0.06)
+        assert breaker.allow()
+        # Only one probe at a time
+        assert not breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == "open"
+
+    def test_cancelled_probe_lets_the_next_call_through(self):
+        """
+        Test that a half-open probe cancelled before it answers does not block later calls.
+        """
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.05)
+        service = RemoteService("reply", breaker=breaker)
+        breaker.record_failure()
+        time.sleep(0.06)
+
+        async def main():
+            probe = asyncio.ensure_future(
+                service.call_async(ScriptedCall(5.0).call_async)
+            )
+            await asyncio.sleep(0.01)
+            probe.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await probe
+            return await service.call_async(ScriptedCall().call_async)
+
+        assert asyncio.run(main()) == "ok"
+        assert breaker.state == "closed"
+
+    def test_watson_recognition_survives_injected_faults(self):
+        """
+        Test that recognition retries simulated outages and stalls and keeps its transcript.
+        """
+        faults = FaultModel(error_rate=0.3, stall_rate=0.2, stall_seconds=2.0, seed=3)
+        service = SimulatedSpeechToText(LatencyModel(0.01), faults=faults)
+        backend = WatsonSpeechToText(
+            service,
+            sample_rate=16000,
+            policy=RemoteService("recognize", budget=3.0, retries=4, backoff=0.01),
+        )
+        wav = speech_like_wav(0.5, 16000)
+        for index in range(8):
+            service.queue_transcript(f"turn {index}")
+            started = time.perf_counter()
+            assert backend.transcribe(wav) == f"turn {index}"
+            assert time.perf_counter() - started < 3.0
+        assert faults.errors and faults.stalls
+
+        service.faults = FaultModel(error_rate=1.0)
+        with pytest.raises(RemoteCallError) as raised:
+            backend.transcribe(wav)
+        assert isinstance(raised.value.__cause__, SimulatedServiceError)
@@ -0,0 +1,58 @@
+import time
+
+import pytest
+
+from cozmo_companion.response_cache import ResponseCache, normalize_utterance
+
+
+@pytest.mark.unit
+class TestResponseCache:
+    """
+    A test suite for the cache of replies to repeated utterances.
+    """
+
+    def test_exact_match_ignores_case_and_punctuation(self):
+        """
+        Test that normalized transcripts in the same mood share a reply.
+        """
+        cache = ResponseCache()
+        cache.put("How are you?", "I'm great, thanks!", mood="NEUTRAL")
+        assert normalize_utterance("  How ARE you?! ") == "how are you"
+        assert cache.get("how are you", mood="NEUTRAL") == "I'm great, thanks!"
+        assert cache.get("how are you", mood="NEGATIVE") is None
+        assert (cache.hits, cache.misses) == (1, 1)
+        assert cache.entries() == [("NEUTRAL", "how are you", "I'm great, thanks!", 1)]
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """
+        Test that the cache drops the entry used longest ago once full.
+        """
+        cache = ResponseCache(max_entries=2)
+        cache.put("tell me a joke", "joke")
+        cache.put("i feel sad", "comfort")
+        cache.get("tell me a joke")
+        cache.put("good morning", "morning")
+        assert cache.get("i feel sad") is None
+        assert cache.get("tell me a joke") == "joke"
+        assert len(cache) == 2
+
+    def test_expired_entries_are_not_served(self):
+        """
+        Test that replies older than the TTL are dropped.
+        """
+        cache = ResponseCache(ttl=0.01)
+        cache.put("tell me a joke", "joke")
+        time.sleep(0.02)
+        assert cache.get("tell me a joke") is None
+        assert len(cache) == 0
+
+    def test_near_duplicates_match_above_threshold(self):
+        """
+        Test that a close paraphrase reuses a reply but an unrelated request does not.
+        """
+        cache = ResponseCache(similarity_threshold=0.8)
+        cache.put("how are you doing", "Doing well!", mood="POSITIVE")
+        cache.put("tell me a joke", "A joke.", mood="POSITIVE")
+        assert cache.get("how are you doing today", mood="POSITIVE") == "Doing well!"
+        assert cache.get("show me a picture of a cat", mood="POSITIVE") is None
+        assert cache.get("how are you doing today", mood="NEGATIVE") is None
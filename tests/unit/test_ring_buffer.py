@@ -0,0 +1,66 @@
+import pytest
+
+from cozmo_companion.ring_buffer import AudioRingBuffer
+
+
+def joined(segments):
+    """Join memoryview segments for comparison in assertions."""
+    return b"".join(bytes(segment) for segment in segments)
+
+
+@pytest.mark.unit
+class TestAudioRingBuffer:
+    """
+    A test suite for the preallocated ring buffer that holds captured audio.
+    """
+
+    def test_capacity_is_rounded_to_whole_frames(self):
+        """
+        Test that the capacity is a multiple of the frame size.
+        """
+        assert AudioRingBuffer(10, frame_size=4).capacity == 12
+
+    def test_wraparound_keeps_newest_bytes(self):
+        """
+        Test that writing past the capacity overwrites the oldest bytes.
+        """
+        ring = AudioRingBuffer(8, frame_size=4)
+        for chunk in [b"aaaa", b"bbbb", b"cccc"]:
+            ring.write(chunk)
+
+        assert len(ring) == 8
+        assert ring.oldest == 4
+        assert joined(ring.segments()) == b"bbbbcccc"
+
+    def test_segments_are_views_into_the_ring(self):
+        """
+        Test that segments reference the ring's memory instead of copying it.
+        """
+        ring = AudioRingBuffer(8, frame_size=4)
+        position = ring.write(b"abcd")
+        (segment,) = ring.segments(position)
+        assert isinstance(segment, memoryview)
+        ring.write(b"efgh")
+        ring.write(b"ijkl")
+        # The first slot has been reused, and the old view sees the new bytes
+        assert bytes(segment) == b"ijkl"
+
+    def test_segments_across_the_wrap_point(self):
+        """
+        Test that a range spanning the end of the ring comes back as two ordered slices.
+        """
+        ring = AudioRingBuffer(8, frame_size=2)
+        ring.write(b"012345")
+        ring.write(b"6789")
+        segments = ring.segments(4, 10)
+        assert len(segments) == 2
+        assert joined(segments) == b"456789"
+
+    def test_oversized_write_keeps_tail(self):
+        """
+        Test that a single write larger than the ring keeps only its newest bytes.
+        """
+        ring = AudioRingBuffer(4)
+        assert ring.write(b"0123456789") == 0
+        assert ring.position == 10
+        assert joined(ring.segments()) == b"6789"
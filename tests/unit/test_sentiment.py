@@ -0,0 +1,151 @@
+import threading
+import time
+
+import pytest
+
+from cozmo_companion.sentiment import (
+    LexiconSentiment,
+    SentimentBatcher,
+    load_lexicon,
+    smooth_mood,
+)
+
+
+class SlowAnalyzer(LexiconSentiment):
+    """Lexicon analyzer that takes a while per batch and records the batch sizes."""
+
+    def __init__(self, seconds=0.05):
+        super().__init__()
+        self.seconds = seconds
+        self.batch_sizes = []
+
+    def score_batch(self, texts):
+        self.batch_sizes.append(len(texts))
+        time.sleep(self.seconds)
+        return super().score_batch(texts)
+
+
+@pytest.mark.unit
+class TestLexiconSentiment:
+    """
+    A test suite for the local sentiment analyzer and the smoothed mood.
+    """
+
+    @pytest.mark.parametrize(
+        "user_input, expected",
+        [
+            ("I feel amazing!", "POSITIVE"),
+            ("I feel horrible!", "NEGATIVE"),
+            ("I feel okay.", "NEUTRAL"),
+            ("i am not happy", "NEGATIVE"),
+            ("i don't feel good", "NEGATIVE"),
+            ("honestly that's not bad", "POSITIVE"),
+        ],
+    )
+    def test_labels(self, user_input, expected):
+        """
+        Test that opinion words and negations give the expected label.
+        """
+        assert LexiconSentiment().score(user_input).label == expected
+
+    def test_intensifiers_and_but_change_the_score(self):
+        """
+        Test that "really" strengthens a word and the clause after "but" dominates.
+        """
+        analyzer = LexiconSentiment()
+        assert analyzer.score("really happy").score > analyzer.score("happy").score
+        assert analyzer.score("i was sad but now i am happy").label == "POSITIVE"
+        assert analyzer.score("i was happy but now i am sad").label == "NEGATIVE"
+
+    def test_mixed_feelings_have_low_confidence(self):
+        """
+        Test that clear utterances are confident and conflicting ones are not.
+        """
+        analyzer = LexiconSentiment()
+        assert analyzer.score("thank you, that really helps").confidence == 1.0
+        mixed = analyzer.score("i love it but it is hard")
+        assert mixed.confidence < 0.5
+        assert analyzer.score("what time is it").confidence == 0.0
+
+    @pytest.mark.parametrize(
+        "user_input",
+        [
+            "my dog died",
+            "i got fired today",
+            "my grandmother passed away",
+            "nobody likes me",
+        ],
+    )
+    def test_utterances_without_opinion_words_are_left_to_the_llm(self, user_input):
+        """
+        Test that an utterance the lexicon knows nothing about is below any positive
+        escalation threshold, so the LLM classifier labels it.
+        """
+        score = LexiconSentiment().score(user_input)
+        assert score.label == "NEUTRAL"
+        assert score.confidence == 0.0
+
+    def test_mood_follows_the_scores_smoothly(self):
+        """
+        Test that the mood moves part of the way toward each new score.
+        """
+        mood = 0.0
+        for _ in range(3):
+            mood = smooth_mood(mood, -0.6, 0.3)
+        assert -0.6 < mood < -0.3
+        recovered = smooth_mood(mood, 0.6, 0.3)
+        assert mood < recovered < 0.0
+
+    def test_lexicon_file(self, tmp_path):
+        """
+        Test that a VADER-format lexicon replaces the built-in one.
+        """
+        path = tmp_path / "lexicon.txt"
+        path.write_text("groovy\t2.5\t0.5\t[2, 3]\nmeh\t-1.0\t0.4\t[-1, -1]\n")
+        analyzer = LexiconSentiment(load_lexicon(path))
+        assert analyzer.score("groovy").label == "POSITIVE"
+        assert analyzer.score("meh").label == "NEGATIVE"
+        assert analyzer.score("amazing").label == "NEUTRAL"
+
+
+@pytest.mark.unit
+class TestSentimentBatcher:
+    """
+    A test suite for scoring the utterances of concurrent sessions together.
+    """
+
+    def test_concurrent_utterances_share_a_batch(self):
+        """
+        Test that utterances queued during a batch are scored together in the next one.
+        """
+        analyzer = SlowAnalyzer()
+        batcher = SentimentBatcher(analyzer)
+        results = {}
+
+        def score(index):
+            results[index] = batcher.score("i am so happy")
+
+        threads = [threading.Thread(target=score, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.005)
+        for thread in threads:
+            thread.join()
+        batcher.close()
+        assert all(result.label == "POSITIVE" for result in results.values())
+        assert batcher.scored == 8
+        assert analyzer.batch_sizes[0] == 1 and len(analyzer.batch_sizes) < 8
+
+    def test_errors_reach_every_caller_of_the_batch(self):
+        """
+        Test that a failing analyzer fails the callers instead of hanging them.
+        """
+
+        class BrokenAnalyzer:
+            def score_batch(self, texts):
+                raise RuntimeError("model failed")
+
+        batcher = SentimentBatcher(BrokenAnalyzer())
+        with pytest.raises(RuntimeError):
+            batcher.score("hello")
+        batcher.close()
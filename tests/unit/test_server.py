@@ -0,0 +1,205 @@
+import asyncio
+import threading
+
+import pytest
+
+from cozmo_companion.capture import CaptureEngine, NetworkCaptureDevice
+from cozmo_companion.server import (
+    AUDIO,
+    BUSY,
+    PICTURE,
+    SPEECH,
+    USER,
+    CompanionServer,
+    read_frame,
+    write_frame,
+)
+from cozmo_companion.simulation import encode_wav
+
+
+class EchoSession:
+    """Minimal session: waits for one chunk of audio, then speaks until interrupted."""
+
+    def __init__(self, device, player, seconds=0.1):
+        self.seconds = seconds
+        self.capture = CaptureEngine(device, buffer_seconds=1)
+        self.player = player
+        self.speaker = self
+        self.stop_event = threading.Event()
+        self.played = None
+        self.picture = None
+
+    def interrupt(self):
+        self.stop_event.set()
+
+    async def start_session(self):
+        self.capture.start()
+        try:
+            async for _ in self.capture.chunks():
+                break
+        finally:
+            self.capture.stop()
+        audio = encode_wav([0] * int(8000 * self.seconds), 8000)
+
+        def play():
+            # Recorded by the worker thread, which outlives a cancelled session
+            self.played = self.player(audio, self.stop_event)
+
+        await asyncio.to_thread(play)
+        if self.picture is not None:
+            await asyncio.to_thread(self.player.show_picture, self.picture)
+
+
+@pytest.mark.unit
+class TestServer:
+    """
+    A test suite for serving many sessions over TCP from one process.
+    """
+
+    def test_network_device_delivers_whole_chunks(self):
+        """
+        Test that received audio of any length is cut into whole chunks.
+        """
+        device = NetworkCaptureDevice(rate=8000, channels=1, chunk_size=4)
+        chunks = []
+        device.feed(b"\x01" * 8)
+        device.open(chunks.append)
+        device.feed(b"\x02" * 5)
+        device.feed(b"\x03" * 12)
+        assert chunks == [b"\x02" * 5 + b"\x03" * 3, b"\x03" * 8]
+        device.close()
+        device.feed(b"\x04" * 8)
+        assert len(chunks) == 2
+
+    @pytest.mark.asyncio
+    async def test_sessions_are_served_and_limited(self):
+        """
+        Test that a client's audio reaches its session, speech comes back and
+        connections beyond the session limit are turned away.
+        """
+        sessions = []
+
+        def create_session(device, player, user_id):
+            sessions.append(EchoSession(device, player))
+            return sessions[-1]
+
+        server = CompanionServer(create_session, max_sessions=1, workers=2)
+        listening = await server.start("127.0.0.1", 0)
+        port = listening.sockets[0].getsockname()[1]
+        async with listening:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            await write_frame(writer, AUDIO, bytes(4096))
+            kind, payload = await read_frame(reader)
+            assert kind == SPEECH and payload.startswith(b"RIFF")
+
+            busy_reader, busy_writer = await asyncio.open_connection("127.0.0.1", port)
+            assert (await read_frame(busy_reader))[0] == BUSY
+            busy_writer.close()
+
+            # The session ends once its speech has played and the server hangs up
+            assert await read_frame(reader) == (None, b"")
+            writer.close()
+        assert sessions[0].played == 1.0
+        assert server.served == 1 and server.rejected == 1
+
+    @pytest.mark.asyncio
+    async def test_slot_is_held_while_the_first_frame_is_awaited(self):
+        """
+        Test that a connection that has not sent its first frame still counts
+        toward the session limit.
+        """
+
+        def create_session(device, player, user_id):
+            return EchoSession(device, player, seconds=0.01)
+
+        server = CompanionServer(create_session, max_sessions=1, workers=2)
+        listening = await server.start("127.0.0.1", 0)
+        port = listening.sockets[0].getsockname()[1]
+        async with listening:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            busy_reader, busy_writer = await asyncio.open_connection("127.0.0.1", port)
+            assert (await asyncio.wait_for(read_frame(busy_reader), 5))[0] == BUSY
+            busy_writer.close()
+
+            await write_frame(writer, AUDIO, bytes(4096))
+            assert (await read_frame(reader))[0] == SPEECH
+            assert await read_frame(reader) == (None, b"")
+            writer.close()
+        assert server.served == 1 and server.rejected == 1
+        assert not server.sessions
+
+    @pytest.mark.asyncio
+    async def test_hanging_up_interrupts_playback(self):
+        """
+        Test that a client hanging up mid-reply stops the session's playback.
+        """
+        sessions = []
+
+        def create_session(device, player, user_id):
+            sessions.append(EchoSession(device, player, seconds=5))
+            return sessions[-1]
+
+        server = CompanionServer(create_session, workers=2)
+        listening = await server.start("127.0.0.1", 0)
+        port = listening.sockets[0].getsockname()[1]
+        async with listening:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            await write_frame(writer, AUDIO, bytes(4096))
+            assert (await read_frame(reader))[0] == SPEECH
+            writer.close()
+            for _ in range(20):
+                if sessions[0].played is not None:
+                    break
+                await asyncio.sleep(0.05)
+        assert sessions[0].played < 0.1
+        assert not server.sessions
+
+    @pytest.mark.asyncio
+    async def test_pictures_are_sent_to_the_client(self):
+        """
+        Test that a session's picture reaches its client as a URL frame.
+        """
+
+        def create_session(device, player, user_id):
+            session = EchoSession(device, player, seconds=0.01)
+            session.picture = "https://pictures.invalid/1.png"
+            return session
+
+        server = CompanionServer(create_session, workers=2)
+        listening = await server.start("127.0.0.1", 0)
+        port = listening.sockets[0].getsockname()[1]
+        async with listening:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            await write_frame(writer, AUDIO, bytes(4096))
+            assert (await read_frame(reader))[0] == SPEECH
+            assert await read_frame(reader) == (
+                PICTURE,
+                b"https://pictures.invalid/1.png",
+            )
+            assert await read_frame(reader) == (None, b"")
+            writer.close()
+
+    @pytest.mark.asyncio
+    async def test_client_user_id_reaches_its_session(self):
+        """
+        Test that a user id sent as the first frame is passed to the new session.
+        """
+        user_ids = []
+
+        def create_session(device, player, user_id):
+            user_ids.append(user_id)
+            return EchoSession(device, player, seconds=0.01)
+
+        server = CompanionServer(create_session, workers=2)
+        listening = await server.start("127.0.0.1", 0)
+        port = listening.sockets[0].getsockname()[1]
+        async with listening:
+            for first_frame in ((USER, "robin".encode()), (AUDIO, bytes(4096))):
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                await write_frame(writer, *first_frame)
+                await write_frame(writer, AUDIO, bytes(4096))
+                assert (await read_frame(reader))[0] == SPEECH
+                # The session ends once its speech has played
+                assert await read_frame(reader) == (None, b"")
+                writer.close()
+        assert user_ids == ["robin", None]
@@ -0,0 +1,190 @@
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+from cozmo_companion.resilience import RemoteService
+from cozmo_companion.services import (
+    IAMTokenRefresher,
+    OpenAIClientPool,
+    ServiceLayer,
+    apply_deadline,
+    create_http_session,
+    run_coroutine,
+)
+
+
+class RecordingAdapter(BaseAdapter):
+    """Transport adapter that answers every request and records its timeout."""
+
+    def __init__(self):
+        super().__init__()
+        self.timeouts = []
+
+    def send(self, request, timeout=None, **kwargs):
+        self.timeouts.append(timeout)
+        response = requests.Response()
+        response.status_code = 200
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+class FakeTokenManager:
+    """Stand-in for an IAM token manager whose tokens need refreshing every 0.05 s."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.refresh_time = 0
+        self.requests = 0
+
+    def get_token(self):
+        if time.time() < self.refresh_time:
+            return "cached"
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("IAM unavailable")
+        self.requests += 1
+        self.refresh_time = time.time() + 0.05
+        return "fresh"
+
+
+@pytest.mark.unit
+class TestServiceLayer:
+    """
+    A test suite for the pooled, long-lived service clients.
+    """
+
+    def test_http_session_keeps_connections_pooled(self):
+        """
+        Test that the shared session mounts adapters sized to the pool.
+        """
+        session = create_http_session(pool_size=3)
+        adapter = session.get_adapter("https://api.example.com")
+        assert adapter._pool_connections == 3
+        assert adapter._pool_maxsize == 3
+
+    def test_http_requests_end_at_the_attempt_deadline(self):
+        """
+        Test that requests within a remote call time out at its deadline and others
+        at the session's default, so no abandoned attempt keeps its thread.
+        """
+        session = create_http_session(timeout=30.0)
+        adapter = RecordingAdapter()
+        session.mount("https://", adapter)
+        session.get("https://api.example.com")
+        RemoteService("tts", budget=0.5).call(session.get, "https://api.example.com")
+        assert adapter.timeouts[0] == 30.0
+        assert 0.3 < adapter.timeouts[1] <= 0.5
+
+    def test_openai_requests_end_at_the_attempt_deadline(self):
+        """
+        Test that the httpx hook cuts the timeouts of requests within a remote call.
+        """
+        timeouts = []
+
+        def handler(request):
+            timeouts.append(request.extensions["timeout"])
+            return httpx.Response(200)
+
+        client = httpx.Client(
+            transport=httpx.MockTransport(handler),
+            timeout=60.0,
+            event_hooks={"request": [apply_deadline]},
+        )
+        client.get("https://api.example.com")
+        RemoteService("reply", budget=0.5).call(client.get, "https://api.example.com")
+        assert timeouts[0]["read"] == 60.0
+        assert all(0.3 < seconds <= 0.5 for seconds in timeouts[1].values())
+
+    def test_coroutine_is_cancelled_at_the_attempt_deadline(self):
+        """
+        Test that a coroutine run for a remote call attempt stops at its deadline.
+        """
+        cancelled = threading.Event()
+
+        async def hang():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        service = RemoteService("reply", budget=0.2)
+        started = time.perf_counter()
+        with pytest.raises(Exception):
+            service.call(lambda: run_coroutine(hang()))
+        assert time.perf_counter() - started < 0.5
+        assert cancelled.wait(1.0)
+
+    def test_coroutines_share_one_background_loop(self):
+        """
+        Test that blocking callers on different threads run on the same event loop.
+        """
+
+        async def current_loop():
+            return asyncio.get_running_loop()
+
+        loops = []
+        threads = [
+            threading.Thread(target=lambda: loops.append(run_coroutine(current_loop())))
+            for _ in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(set(map(id, loops))) == 1
+
+    def test_token_is_refreshed_in_the_background(self):
+        """
+        Test that tokens are fetched at startup and renewed before callers need them,
+        retrying after failures.
+        """
+        manager = FakeTokenManager(failures=1)
+        refresher = IAMTokenRefresher(manager, retry_seconds=0.01)
+        refresher.start()
+        time.sleep(0.2)
+        refresher.stop()
+        # The failed attempt was retried and the token is now cached
+        assert manager.requests == 1
+        assert refresher.refreshes == 1
+        assert manager.refresh_time > 0
+
+    def test_openai_clients_are_reused_per_loop(self):
+        """
+        Test that each event loop gets one long-lived client with a long keep-alive.
+        """
+        pool = OpenAIClientPool(lambda: {"api_key": "test"}, keepalive_seconds=90)
+
+        async def client():
+            return pool.get()
+
+        first_loop = asyncio.new_event_loop()
+        second_loop = asyncio.new_event_loop()
+        try:
+            first = first_loop.run_until_complete(client())
+            again = first_loop.run_until_complete(client())
+            second = second_loop.run_until_complete(client())
+        finally:
+            first_loop.close()
+            second_loop.close()
+
+        assert first is again
+        assert first is not second
+        assert pool.limits.keepalive_expiry == 90
+        assert pool.get(is_async=False) is pool.get(is_async=False)
+
+    def test_invalid_watson_url(self):
+        """
+        Test that a URL for an unknown service is rejected.
+        """
+        services = ServiceLayer()
+        with pytest.raises(ValueError):
+            services.watson_service("key", "https://api.ibm.com/incorrect-path")
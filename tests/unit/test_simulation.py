@@ -0,0 +1,76 @@
+import statistics
+import threading
+
+import pytest
+
+from cozmo_companion.simulation import (
+    LatencyModel,
+    SimulatedPlayer,
+    SimulatedSpeechToText,
+    SimulatedTextToSpeech,
+    encode_wav,
+    speech_like_wav,
+    wav_duration,
+)
+from cozmo_companion.vad import VoiceActivityDetector
+
+
+@pytest.mark.unit
+class TestSimulation:
+    """
+    A test suite for the simulated backends used by the offline benchmark.
+    """
+
+    def test_latency_model_is_seeded(self):
+        """
+        Test that equal seeds give equal delays with the requested mean.
+        """
+        first = LatencyModel.parse("lognormal:0.5:0.2", seed=7)
+        second = LatencyModel.parse("lognormal:0.5:0.2", seed=7)
+        samples = [first.sample() for _ in range(2000)]
+        assert samples[:10] == [second.sample() for _ in range(10)]
+        assert statistics.fmean(samples) == pytest.approx(0.5, rel=0.05)
+        assert min(samples) > 0
+        assert LatencyModel.parse("0.25").sample() == 0.25
+        with pytest.raises(ValueError):
+            LatencyModel(0.1, 0.1, "pareto")
+
+    def test_speech_to_text_returns_queued_transcripts(self):
+        """
+        Test that recordings with audio consume the queued transcripts in order.
+        """
+        stt = SimulatedSpeechToText(LatencyModel(0.0))
+        stt.queue_transcript("hello there")
+        silent = encode_wav([], 16000)
+        speech = speech_like_wav(0.5, 16000)
+
+        assert stt.recognize(audio=silent).get_result() == {"results": []}
+        result = stt.recognize(audio=speech).get_result()
+        assert result["results"][0]["alternatives"][0]["transcript"] == "hello there"
+
+    def test_generated_speech_is_detected_by_the_vad(self):
+        """
+        Test that scripted input audio is heard as speech by the recorder's detector.
+        """
+        audio = speech_like_wav(1.0, 44100)
+        samples = audio[44:]
+        vad = VoiceActivityDetector(min_threshold=200)
+        chunks = [samples[i : i + 2048] for i in range(0, len(samples) - 2048, 2048)]
+        assert sum(vad.is_speech(chunk) for chunk in chunks) > len(chunks) * 0.8
+
+    def test_player_stops_when_interrupted(self):
+        """
+        Test that the player returns early with the fraction of the audio played.
+        """
+        audio = (
+            SimulatedTextToSpeech(LatencyModel(0.0), seconds_per_character=0.01)
+            .synthesize("x" * 40)
+            .get_result()
+            .content
+        )
+        assert wav_duration(audio) == pytest.approx(0.4)
+
+        stop_event = threading.Event()
+        threading.Timer(0.1, stop_event.set).start()
+        played = SimulatedPlayer()(audio, stop_event)
+        assert 0.1 < played < 0.6
@@ -0,0 +1,160 @@
+import threading
+import time
+
+import pytest
+
+from cozmo_companion.speaker import PipelinedSpeaker, split_sentences
+
+SYNTHESIS_SECONDS = 0.03
+PLAYBACK_SECONDS = 0.03
+
+
+def fake_synthesize(text):
+    """Simulate a synthesis round trip that returns audio bytes."""
+    time.sleep(SYNTHESIS_SECONDS)
+    return text.encode()
+
+
+@pytest.mark.unit
+class TestPipelinedSpeaker:
+    """
+    A test suite for the sentence-level speech pipeline used by `VoiceAssistant._speak`.
+    """
+
+    @pytest.mark.parametrize(
+        "text, expected",
+        [
+            ("Hello there.", ["Hello there."]),
+            ("Hi! How are you? I'm fine.", ["Hi!", "How are you?", "I'm fine."]),
+            ("No punctuation at the end", ["No punctuation at the end"]),
+            ("  ", []),
+        ],
+    )
+    def test_split_sentences(self, text, expected):
+        """
+        Test that replies are split at sentence boundaries.
+        """
+        assert split_sentences(text) == expected
+
+    def test_sentences_are_played_in_order(self):
+        """
+        Test that every sentence is synthesized and played in its original order.
+        """
+        played = []
+        speaker = PipelinedSpeaker(
+            fake_synthesize, play_audio=lambda audio, stop_event: played.append(audio)
+        )
+        speaker.speak("One. Two. Three.")
+        assert played == [b"One.", b"Two.", b"Three."]
+
+    def test_time_to_first_audio_does_not_scale_with_length(self):
+        """
+        Test that a long reply starts playing as quickly as a single sentence.
+        """
+        speaker = PipelinedSpeaker(
+            fake_synthesize,
+            play_audio=lambda audio, stop_event: time.sleep(PLAYBACK_SECONDS),
+        )
+        speaker.speak("Short reply.")
+        speaker.speak(" ".join(["This is a much longer reply."] * 10))
+
+        short, long = speaker.metrics
+        assert long["sentences"] == 10
+        assert long["time_to_first_audio"] < 3 * SYNTHESIS_SECONDS
+        assert long["time_to_first_audio"] < short["time_to_first_audio"] * 2
+
+    def test_synthesis_overlaps_playback(self):
+        """
+        Test that synthesis of the next sentence runs while the current one plays.
+        """
+        speaker = PipelinedSpeaker(
+            fake_synthesize,
+            play_audio=lambda audio, stop_event: time.sleep(PLAYBACK_SECONDS),
+        )
+        started = time.perf_counter()
+        speaker.speak("One. Two. Three. Four.")
+        elapsed = time.perf_counter() - started
+        assert elapsed < 4 * (SYNTHESIS_SECONDS + PLAYBACK_SECONDS)
+
+    def test_synthesis_errors_are_raised(self):
+        """
+        Test that a failed synthesis call is raised to the caller of `speak`.
+        """
+
+        def failing_synthesize(text):
+            raise RuntimeError("service unavailable")
+
+        speaker = PipelinedSpeaker(
+            failing_synthesize, play_audio=lambda audio, stop_event: None
+        )
+        with pytest.raises(RuntimeError):
+            speaker.speak("Hello.")
+
+    def test_interrupt_stops_playback_quickly(self):
+        """
+        Test that an interruption stops playback mid-sentence, skips the rest and
+        records how far the speech got.
+        """
+        synthesized = []
+
+        def synthesize(text):
+            synthesized.append(text)
+            time.sleep(0.06)
+            return text.encode()
+
+        def play_in_blocks(audio, stop_event):
+            # Ten 10 ms blocks per sentence, like the real player's short blocks
+            for block in range(10):
+                if stop_event.is_set():
+                    return block / 10
+                time.sleep(0.01)
+            return 1.0
+
+        speaker = PipelinedSpeaker(synthesize, play_audio=play_in_blocks)
+        # Interrupt about halfway through the second sentence
+        threading.Timer(0.21, speaker.interrupt).start()
+        started = time.perf_counter()
+        utterance = speaker.speak(
+            "One two three four. Five six seven eight. Nine ten. Eleven. Twelve."
+        )
+        elapsed = time.perf_counter() - started
+
+        assert utterance.interrupted
+        assert utterance.text.startswith("One two three four. Five")
+        assert not utterance.text.endswith("eight.")
+        assert elapsed < 0.21 + 0.1
+        # Synthesis of the remaining sentences is abandoned
+        assert "Twelve." not in synthesized
+
+        # Speech stays silenced until the speaker is resumed
+        assert speaker.speak("Hello.").text == ""
+        speaker.resume()
+        assert speaker.speak("Hello.").text == "Hello."
+
+    def test_playing_is_only_set_once_audio_plays(self):
+        """
+        Test that the speaker reports playback from its first audio, not during
+        synthesis, and releases its player when closed.
+        """
+
+        class RecordingPlayer:
+            closed = False
+
+            def __call__(self, audio, stop_event):
+                seen.append(speaker.playing.is_set())
+
+            def close(self):
+                self.closed = True
+
+        def synthesize(text):
+            seen.append(speaker.playing.is_set())
+            return text.encode()
+
+        seen = []
+        player = RecordingPlayer()
+        speaker = PipelinedSpeaker(synthesize, play_audio=player)
+        speaker.speak("Hello.")
+        assert seen == [False, True]
+        assert not speaker.playing.is_set()
+        speaker.close()
+        assert player.closed
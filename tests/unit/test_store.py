@@ -0,0 +1,89 @@
+import time
+from enum import Enum
+
+import pytest
+
+from cozmo_companion.history import ConversationHistory
+from cozmo_companion.store import SessionStore
+
+
+class Mood(Enum):
+    HAPPY = "HAPPY"
+    SAD = "SAD"
+
+
+@pytest.mark.unit
+class TestSessionStore:
+    """
+    A test suite for the SQLite store that lets sessions resume.
+    """
+
+    def test_unknown_user_loads_empty(self, tmp_path):
+        """
+        Test that a user without saved sessions starts cold.
+        """
+        store = SessionStore(str(tmp_path / "sessions.db"))
+        saved = store.load("nobody", 1000)
+        store.close()
+        assert saved.total_turns == 0
+        assert saved.turns == []
+        assert saved.summary == ""
+
+    def test_turns_round_trip_within_budget(self, tmp_path):
+        """
+        Test that the latest turns fitting the budget come back in order.
+        """
+        store = SessionStore(str(tmp_path / "sessions.db"))
+        history = ConversationHistory(token_budget=10_000)
+        for index in range(5):
+            mood = Mood.SAD if index < 3 else Mood.HAPPY
+            turn = history.add(f"message {index}", f"reply {index}", sentiment=mood)
+            store.save_turn("robot-1", turn, f"summary after {index}")
+        store.save_turn("robot-2", history.add("other user", "hi"), "")
+        store.flush()
+
+        budget = sum(turn.tokens for turn in history.turns[2:4])
+        saved = store.load("robot-1", budget)
+        assert [turn.user for turn in saved.turns] == ["message 3", "message 4"]
+        assert saved.turns[0].sentiment == "HAPPY"
+        assert saved.summary == "summary after 4"
+        assert saved.total_turns == 5
+        assert store.sentiments("robot-1", 3) == ["SAD", "HAPPY", "HAPPY"]
+        store.close()
+
+    def test_writes_are_batched_and_committed_on_close(self, tmp_path):
+        """
+        Test that queued writes reach the database once the store is closed.
+        """
+        path = str(tmp_path / "sessions.db")
+        store = SessionStore(path, flush_interval=60.0)
+        history = ConversationHistory()
+        started = time.perf_counter()
+        for index in range(200):
+            store.save_turn("robot", history.add(f"turn {index}", "ok"), "")
+        # Queueing a turn must not wait for the disk
+        assert time.perf_counter() - started < 0.5
+        store.close()
+
+        reopened = SessionStore(path)
+        assert reopened.load("robot", 10_000).total_turns == 200
+        reopened.close()
+
+    def test_restored_history_continues_numbering_and_context(self, tmp_path):
+        """
+        Test that a resumed history numbers new turns after the saved ones.
+        """
+        store = SessionStore(str(tmp_path / "sessions.db"))
+        earlier = ConversationHistory()
+        for index in range(3):
+            store.save_turn("robot", earlier.add(f"old {index}", "reply"), "we met")
+        store.close()
+
+        store = SessionStore(str(tmp_path / "sessions.db"))
+        saved = store.load("robot", 10_000)
+        store.close()
+        history = ConversationHistory()
+        history.restore(saved.summary, saved.turns, saved.total_turns)
+        assert history.add("new", "reply").index == 3
+        assert "we met" in history.context()
+        assert "User: old 2" in history.context()
@@ -0,0 +1,145 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from cozmo_companion.speaker import PipelinedSpeaker
+from cozmo_companion.streaming import (
+    ClauseChunker,
+    StubTokenModel,
+    speak_token_stream,
+    stream_assistant_reply,
+)
+
+REPLY = (
+    "I'm sorry you feel sad today. "
+    "Would you like to hear a joke, or maybe see a picture of a puppy? "
+    "Sometimes a small thing can brighten the whole day."
+)
+
+
+class FakeAssistant:
+    """Stand-in for a Marvin Application that streams deltas through the event handler."""
+
+    def __init__(self, deltas):
+        self.deltas = deltas
+
+    async def say_async(self, message, event_handler_class, event_handler_kwargs):
+        handler = event_handler_class(**event_handler_kwargs)
+        for delta in self.deltas:
+            await handler.on_text_delta(SimpleNamespace(value=delta), None)
+
+
+@pytest.mark.unit
+class TestClauseChunker:
+    """
+    A test suite for cutting streamed model output into speakable pieces.
+    """
+
+    def test_sentences_are_released_as_they_complete(self):
+        """
+        Test that a piece is released as soon as its sentence ends.
+        """
+        chunker = ClauseChunker()
+        assert chunker.feed("Hello") == []
+        assert chunker.feed(" there! ") == ["Hello there!"]
+        assert chunker.feed("How are") == []
+        assert chunker.flush() == "How are"
+
+    def test_long_clauses_are_released_early(self):
+        """
+        Test that long clauses are cut at commas while short ones wait for the sentence end.
+        """
+        chunker = ClauseChunker(min_clause_chars=20)
+        assert chunker.feed("Well, ") == []
+        assert chunker.feed("that sounds really difficult, ") == [
+            "Well, that sounds really difficult,"
+        ]
+
+
+@pytest.mark.unit
+class TestTokenStreaming:
+    """
+    A test suite for the streaming conversation path from model tokens to speech.
+    """
+
+    @pytest.mark.asyncio
+    async def test_speech_starts_before_generation_finishes(self):
+        """
+        Test that the first piece is spoken while the stub model is still generating.
+        """
+        played = []
+        speaker = PipelinedSpeaker(
+            lambda text: text,
+            play_audio=lambda audio, stop_event: played.append(time.perf_counter()),
+        )
+        model = StubTokenModel(REPLY, first_token_delay=0.05, token_delay=0.02)
+
+        started = time.perf_counter()
+        reply = await speak_token_stream(model.stream("I feel sad"), speaker)
+        finished = time.perf_counter()
+
+        assert reply == REPLY
+        assert len(played) == 3
+        # The first sentence is spoken well before the last token arrives
+        assert played[0] - started < (finished - started) / 2
+
+    @pytest.mark.asyncio
+    async def test_assistant_deltas_are_streamed(self):
+        """
+        Test that text deltas from the assistant's event handler are yielded in order.
+        """
+        assistant = FakeAssistant(["Hi", " there", "!"])
+        tokens = [token async for token in stream_assistant_reply(assistant, "hello")]
+        assert tokens == ["Hi", " there", "!"]
+
+    @pytest.mark.asyncio
+    async def test_stalled_reply_times_out(self):
+        """
+        Test that a reply still generating at the timeout fails and its run is cancelled.
+        """
+
+        class StalledAssistant(FakeAssistant):
+            cancelled = False
+
+            async def say_async(self, message, **kwargs):
+                await super().say_async(message, **kwargs)
+                try:
+                    await asyncio.sleep(5)
+                except asyncio.CancelledError:
+                    self.cancelled = True
+                    raise
+
+        assistant = StalledAssistant(["Hi", " there"])
+        tokens = []
+        started = time.perf_counter()
+        with pytest.raises(TimeoutError):
+            async for token in stream_assistant_reply(assistant, "hello", timeout=0.1):
+                tokens.append(token)
+        await asyncio.sleep(0)
+        assert time.perf_counter() - started < 0.5
+        assert tokens == ["Hi", " there"] and assistant.cancelled
+
+    @pytest.mark.asyncio
+    async def test_interruption_stops_generation(self):
+        """
+        Test that tokens stop being pulled from the model once speech is interrupted.
+        """
+        speaker = PipelinedSpeaker(
+            lambda text: text, play_audio=lambda audio, stop_event: None
+        )
+        model = StubTokenModel(REPLY, first_token_delay=0.01, token_delay=0.01)
+        pulled = []
+
+        async def tokens():
+            async for token in model.stream("I feel sad"):
+                pulled.append(token)
+                if len(pulled) == 3:
+                    speaker.interrupt()
+                yield token
+
+        reply = await speak_token_stream(tokens(), speaker)
+
+        assert len(pulled) < len(REPLY.split()) / 2
+        assert reply == "".join(pulled[: len(reply.split())]).strip()
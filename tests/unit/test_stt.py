@@ -0,0 +1,210 @@
+import asyncio
+import io
+import threading
+import time
+import wave
+
+import numpy as np
+import pytest
+
+from cozmo_companion.simulation import (
+    LatencyModel,
+    SimulatedRecognitionEngine,
+    SimulatedSpeechToText,
+    encode_wav,
+    speech_like_wav,
+)
+from cozmo_companion.stt import (
+    LocalSpeechToText,
+    WatsonSpeechToText,
+    create_local_engine,
+    word_error_rate,
+)
+
+
+def pcm_chunks(seconds, rate=16000, chunk_frames=1600):
+    """Split a speech-like recording into raw PCM chunks."""
+    with wave.open(io.BytesIO(speech_like_wav(seconds, rate)), "rb") as wf:
+        pcm = wf.readframes(wf.getnframes())
+    step = chunk_frames * 2
+    return [pcm[offset : offset + step] for offset in range(0, len(pcm), step)]
+
+
+class OrderCheckingEngine(SimulatedRecognitionEngine):
+    """Records every chunk it decodes, and how many decodes ever overlapped."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.decoded = []
+        self.active = 0
+        self.max_active = 0
+
+    def session(self, model, rate):
+        session = super().session(model, rate)
+        accept = session.accept
+
+        def tracked_accept(pcm):
+            with self._lock:
+                self.active += 1
+                self.max_active = max(self.max_active, self.active)
+            try:
+                self.decoded.append(pcm)
+                return accept(pcm)
+            finally:
+                with self._lock:
+                    self.active -= 1
+
+        session.accept = tracked_accept
+        return session
+
+
+@pytest.mark.unit
+class TestSpeechToTextBackends:
+    """
+    A test suite for the speech recognition backends.
+    """
+
+    def test_word_error_rate(self):
+        """
+        Test that substitutions, deletions and insertions count as errors but case does not.
+        """
+        assert word_error_rate("Tell me a joke.", "tell me a joke") == 0
+        assert word_error_rate("tell me a joke", "tell me the joke") == 0.25
+        assert word_error_rate("tell me a joke", "tell a joke") == 0.25
+        assert word_error_rate("tell me a joke", "tell me a funny joke") == 0.25
+        assert word_error_rate("tell me a joke", None) == 1.0
+
+    def test_local_model_is_loaded_once(self):
+        """
+        Test that concurrent transcriptions share one resident model.
+        """
+        engine = SimulatedRecognitionEngine(
+            load_seconds=0.05, default_transcript="hello there"
+        )
+        backend = LocalSpeechToText(engine, workers=4)
+        backend.warm_up()
+        wav = speech_like_wav(0.5, 16000)
+        threads = [
+            threading.Thread(target=backend.transcribe, args=(wav,)) for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert engine.loads == 1
+        assert backend.transcribe(wav) == "hello there"
+        backend.close()
+
+    def test_local_transcription_does_not_block_the_event_loop(self):
+        """
+        Test that decoding runs on the backend's pool while the loop keeps ticking.
+        """
+        engine = SimulatedRecognitionEngine(
+            seconds_per_audio_second=0.2, default_transcript="hi"
+        )
+        backend = LocalSpeechToText(engine)
+        ticks = []
+
+        async def tick():
+            while True:
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.01)
+
+        async def main():
+            ticker = asyncio.create_task(tick())
+            transcript = await backend.transcribe_async(speech_like_wav(1.0, 16000))
+            ticker.cancel()
+            return transcript
+
+        assert asyncio.run(main()) == "hi"
+        assert len(ticks) >= 10
+        backend.close()
+
+    def test_streaming_decodes_chunks_in_order_with_partials(self):
+        """
+        Test that chunks are decoded one job at a time, in order, with growing partials.
+        """
+        engine = OrderCheckingEngine(
+            seconds_per_audio_second=0.05, seconds_per_word=0.2
+        )
+        engine.queue_transcript("what is the weather like today")
+        backend = LocalSpeechToText(engine, workers=4)
+        interim = []
+        recognizer = backend.create_streaming_recognizer(
+            16000, 1, on_interim=interim.append
+        )
+        recognizer.start()
+        chunks = pcm_chunks(1.5)
+        for chunk in chunks:
+            recognizer.feed(chunk)
+        assert recognizer.finish(timeout=5) == "what is the weather like today"
+        assert b"".join(engine.decoded) == b"".join(chunks)
+        assert engine.max_active == 1
+        assert interim and interim[-1].startswith("what is")
+        assert all(len(a) <= len(b) for a, b in zip(interim, interim[1:]))
+        backend.close()
+
+    def test_streaming_recovers_from_a_failed_decode(self):
+        """
+        Test that chunks fed after a decode job failed are still decoded.
+        """
+
+        class FlakyEngine(OrderCheckingEngine):
+            failures = 1
+
+            def session(self, model, rate):
+                if self.failures:
+                    self.failures -= 1
+                    raise RuntimeError("model not ready")
+                return super().session(model, rate)
+
+        engine = FlakyEngine(default_transcript="hello")
+        backend = LocalSpeechToText(engine)
+        recognizer = backend.create_streaming_recognizer(16000, 1)
+        chunks = pcm_chunks(0.2)
+        recognizer.feed(chunks[0])
+        deadline = time.monotonic() + 5
+        while recognizer._draining is not None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        recognizer.feed(chunks[1])
+        assert recognizer.finish(timeout=5) == "hello"
+        assert engine.decoded == [chunks[1]]
+        backend.close()
+
+    def test_streaming_downmixes_stereo(self):
+        """
+        Test that interleaved stereo chunks reach the engine as mono audio.
+        """
+        engine = OrderCheckingEngine(default_transcript="hello")
+        backend = LocalSpeechToText(engine)
+        recognizer = backend.create_streaming_recognizer(16000, 2)
+        stereo = np.zeros((1600, 2), dtype="<i2")
+        stereo[:, 0], stereo[:, 1] = 1000, 3000
+        recognizer.feed(stereo.tobytes())
+        assert recognizer.finish(timeout=5) == "hello"
+        mono = np.frombuffer(engine.decoded[0], dtype="<i2")
+        assert len(mono) == 1600 and (mono == 2000).all()
+        backend.close()
+
+    def test_watson_backend_uploads_resampled_audio(self):
+        """
+        Test that the Watson backend uploads 16 kHz audio and returns the transcript.
+        """
+        service = SimulatedSpeechToText(LatencyModel(0.0))
+        service.queue_transcript("good morning")
+        backend = WatsonSpeechToText(service, sample_rate=16000)
+        t = np.arange(44100) / 44100
+        wav = encode_wav(8000 * np.sin(2 * np.pi * 300 * t), 44100)
+        assert backend.transcribe(wav) == "good morning"
+        assert service.uploaded_bytes < len(wav) * 0.37
+        assert backend.transcribe(encode_wav(np.zeros(0), 44100)) is None
+
+    def test_unknown_engine_is_rejected(self):
+        """
+        Test that a misspelled backend or a missing Vosk model fails at startup.
+        """
+        with pytest.raises(ValueError):
+            create_local_engine("kaldi")
+        with pytest.raises(ValueError):
+            create_local_engine("vosk")
+        assert create_local_engine("whisper").model == "base.en"
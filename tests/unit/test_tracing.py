@@ -0,0 +1,102 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from cozmo_companion.tracing import JsonLinesExporter, OTLPJsonExporter, Tracer
+
+
+@pytest.mark.unit
+class TestTracer:
+    """
+    A test suite for the span timer used to break down turn latency.
+    """
+
+    def test_disabled_tracer_records_nothing(self):
+        """
+        Test that a disabled tracer hands out the shared no-op span.
+        """
+        tracer = Tracer(enabled=False)
+        with tracer.turn():
+            with tracer.span("record") as span:
+                span.set(chunks=3)
+        tracer.record("time_to_first_audio", 0.1)
+        assert tracer.span("a") is tracer.span("b")
+        assert tracer.summary() == {}
+
+    @pytest.mark.asyncio
+    async def test_turn_breakdown_follows_threads_and_tasks(self, tmp_path):
+        """
+        Test that spans opened in worker threads and tasks are attributed to the turn.
+        """
+        tracer = Tracer(
+            enabled=True, exporter=JsonLinesExporter(str(tmp_path / "t.jsonl"))
+        )
+
+        @tracer.traced("sentiment")
+        def detect_sentiment():
+            time.sleep(0.01)
+
+        @tracer.traced("reply")
+        async def reply():
+            await asyncio.sleep(0.01)
+
+        with tracer.turn():
+            with tracer.span("record"):
+                pass
+            await asyncio.gather(asyncio.to_thread(detect_sentiment), reply())
+            tracer.record("time_to_first_audio", 0.25)
+
+        records = [json.loads(line) for line in open(tmp_path / "t.jsonl")]
+        turn = records[-1]
+        assert turn["type"] == "turn"
+        assert set(turn["breakdown_ms"]) == {
+            "record",
+            "sentiment",
+            "reply",
+            "time_to_first_audio",
+        }
+        assert turn["breakdown_ms"]["time_to_first_audio"] == 250
+        spans = [record for record in records if record["type"] == "span"]
+        assert {span["turn_id"] for span in spans} == {turn["turn_id"]}
+
+    def test_rolling_percentiles(self):
+        """
+        Test that percentiles are computed over the most recent window of durations.
+        """
+        tracer = Tracer(enabled=True, window=100)
+        for milliseconds in range(1, 201):
+            tracer.record("llm", milliseconds / 1000)
+        stats = tracer.percentiles("llm")
+        assert stats["count"] == 100
+        assert stats["p50"] == pytest.approx(0.150, abs=0.002)
+        assert stats["p99"] == pytest.approx(0.199, abs=0.002)
+        assert tracer.percentiles("unknown") is None
+
+    def test_otlp_export(self, tmp_path):
+        """
+        Test that spans are written in the OTLP/JSON encoding with their parent links.
+        """
+        exporter = OTLPJsonExporter(str(tmp_path / "otlp.jsonl"))
+        tracer = Tracer(enabled=True, exporter=exporter)
+        with tracer.turn():
+            with tracer.span("synthesize", characters=12):
+                pass
+        exporter.close()
+
+        requests = [json.loads(line) for line in open(tmp_path / "otlp.jsonl")]
+        spans = [
+            request["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+            for request in requests
+        ]
+        synthesize, turn = spans
+        assert synthesize["name"] == "synthesize"
+        assert synthesize["parentSpanId"] == turn["spanId"]
+        assert synthesize["traceId"] == turn["traceId"]
+        assert synthesize["attributes"] == [
+            {"key": "characters", "value": {"intValue": "12"}}
+        ]
+        assert int(synthesize["endTimeUnixNano"]) >= int(
+            synthesize["startTimeUnixNano"]
+        )
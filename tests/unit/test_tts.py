@@ -0,0 +1,199 @@
+import threading
+import time
+
+import pytest
+
+from cozmo_companion.resilience import RemoteCallError
+from cozmo_companion.simulation import (
+    LatencyModel,
+    SimulatedSynthesisEngine,
+    SimulatedTextToSpeech,
+    wav_duration,
+)
+from cozmo_companion.speaker import PipelinedSpeaker
+from cozmo_companion.tts import (
+    LocalTextToSpeech,
+    TextToSpeechBackend,
+    TextToSpeechRouter,
+    WatsonTextToSpeech,
+    create_local_voice,
+)
+
+LONG_REPLY = (
+    "That sounds really stressful. It's completely understandable to feel "
+    "overwhelmed when plans change suddenly."
+)
+
+
+class FlakyBackend(TextToSpeechBackend):
+    """Remote stand-in that can be made slow or failing, and records what it spoke."""
+
+    name = "watson"
+
+    def __init__(self, delay=0.0, error=None):
+        self.delay = delay
+        self.error = error
+        self.spoken = []
+
+    def synthesize(self, text):
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        self.spoken.append(text)
+        return b"remote"
+
+
+class RecordingBackend(TextToSpeechBackend):
+    """Local stand-in that records what it spoke."""
+
+    name = "simulated"
+
+    def __init__(self):
+        self.spoken = []
+
+    def synthesize(self, text):
+        self.spoken.append(text)
+        return b"local"
+
+
+@pytest.mark.unit
+class TestTextToSpeechRouter:
+    """
+    A test suite for routing speech between Watson and the on-device voice.
+    """
+
+    def test_short_utterances_are_spoken_locally(self):
+        """
+        Test that short and registered phrases go local and long replies go to Watson.
+        """
+        remote, local = FlakyBackend(), RecordingBackend()
+        router = TextToSpeechRouter(
+            remote, local, local_phrases=["Sorry, I encountered an error."]
+        )
+        assert router.choose("Of course!") is local
+        assert router.choose("sorry, I encountered an error") is local
+        assert router.choose(LONG_REPLY) is remote
+        router.close()
+
+    def test_every_sentence_of_an_utterance_uses_the_same_voice(self):
+        """
+        Test that the synthesis thread of the speaker follows the utterance's route.
+        """
+        remote, local = FlakyBackend(), RecordingBackend()
+        router = TextToSpeechRouter(remote, local)
+        speaker = PipelinedSpeaker(
+            lambda text: router.synthesize(text)[0], play_audio=lambda *_: 1.0
+        )
+        # "Okay." alone would be short enough for the local voice
+        with router.utterance("Okay. " + LONG_REPLY):
+            speaker.speak("Okay. " + LONG_REPLY)
+        with router.utterance("Okay. Thanks!"):
+            speaker.speak("Okay. Thanks!")
+        assert remote.spoken[0] == "Okay."
+        assert len(remote.spoken) == 3
+        assert local.spoken == ["Okay.", "Thanks!"]
+        router.close()
+
+    def test_failing_watson_falls_back_and_is_skipped_during_the_cooldown(self):
+        """
+        Test that errors are answered locally and Watson is retried after the cooldown.
+        """
+        remote, local = FlakyBackend(error=RuntimeError("503")), RecordingBackend()
+        router = TextToSpeechRouter(remote, local, failure_cooldown=0.2)
+        assert router.synthesize(LONG_REPLY) == (b"local", local)
+        assert router.fallbacks == 1
+        assert not router.remote_healthy
+        assert router.choose(LONG_REPLY) is local
+
+        remote.error = None
+        time.sleep(0.25)
+        assert router.synthesize(LONG_REPLY) == (b"remote", remote)
+        router.close()
+
+    def test_slow_watson_is_abandoned_after_the_timeout(self):
+        """
+        Test that a sentence is spoken locally once Watson exceeds the timeout.
+        """
+        remote, local = FlakyBackend(delay=0.5), RecordingBackend()
+        router = TextToSpeechRouter(remote, local, remote_timeout=0.05)
+        started = time.perf_counter()
+        assert router.synthesize(LONG_REPLY)[1] is local
+        assert time.perf_counter() - started < 0.3
+        assert router.fallbacks == 1
+        router.close()
+
+    def test_failing_local_voice_falls_back_to_watson(self):
+        """
+        Test that a short phrase is spoken by Watson when the local voice fails,
+        and that an error is raised when both fail.
+        """
+
+        class BrokenLocal(TextToSpeechBackend):
+            name = "espeak"
+
+            def synthesize(self, text):
+                raise FileNotFoundError("Neither espeak-ng nor espeak is installed")
+
+        remote = FlakyBackend()
+        router = TextToSpeechRouter(remote, BrokenLocal())
+        with router.utterance("Sorry?"):
+            assert router.synthesize("Sorry?") == (b"remote", remote)
+        assert remote.spoken == ["Sorry?"]
+
+        remote.error = RuntimeError("503")
+        with pytest.raises(RemoteCallError):
+            router.synthesize(LONG_REPLY)
+        router.close()
+
+    def test_without_a_local_voice_errors_reach_the_caller(self):
+        """
+        Test that the router behaves like plain Watson when no local voice is set up.
+        """
+        router = TextToSpeechRouter(FlakyBackend(error=RuntimeError("503")))
+        assert router.choose("Hi!") is router.remote
+        with pytest.raises(RuntimeError):
+            router.synthesize("Hi!")
+
+    def test_latency_is_recorded_per_backend(self):
+        """
+        Test that each backend's calls and latency percentiles are summarized.
+        """
+        router = TextToSpeechRouter(
+            WatsonTextToSpeech(SimulatedTextToSpeech(LatencyModel(0.02)), "voice"),
+            LocalTextToSpeech(SimulatedSynthesisEngine()),
+        )
+        for _ in range(3):
+            audio, _ = router.synthesize(LONG_REPLY)
+        with router.utterance("Hi!"):
+            router.synthesize("Hi!")
+        assert wav_duration(audio) > 0
+        summary = router.latency_summary()
+        assert summary["watson"]["count"] == 3
+        assert summary["watson"]["p50_ms"] >= 20
+        assert summary["simulated"]["count"] == 1
+        router.close()
+
+    def test_local_voice_is_loaded_once(self):
+        """
+        Test that concurrent phrases share one resident voice.
+        """
+        engine = SimulatedSynthesisEngine()
+        voice = LocalTextToSpeech(engine)
+        threads = [
+            threading.Thread(target=voice.synthesize, args=("Hi!",)) for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert engine.loads == 1 and engine.calls == 4
+
+    def test_unknown_voice_is_rejected(self):
+        """
+        Test that a misspelled engine or a Piper engine without a model fails at startup.
+        """
+        with pytest.raises(ValueError):
+            create_local_voice("festival")
+        with pytest.raises(ValueError):
+            create_local_voice("piper")
+        assert create_local_voice("espeak").voice == "en-us"
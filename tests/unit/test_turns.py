@@ -0,0 +1,146 @@
+import asyncio
+import time
+
+import pytest
+
+from cozmo_companion.turns import TurnScheduler
+
+CALL_SECONDS = 0.1
+
+
+def slow_check_exit(user_input):
+    """Simulate the exit-check LLM round trip."""
+    time.sleep(CALL_SECONDS)
+    return "bye" in user_input
+
+
+def local_sentiment(user_input):
+    """Simulate the local sentiment analyzer, which takes microseconds."""
+    return "NEUTRAL"
+
+
+def slow_refine_sentiment(user_input, detected):
+    """Simulate the LLM fallback for an unsure local score."""
+    time.sleep(CALL_SECONDS)
+    return "NEGATIVE"
+
+
+class FakeReply:
+    """Records whether the reply was spoken or cancelled."""
+
+    def __init__(self):
+        self.spoken = False
+        self.cancelled = False
+
+    async def __call__(self, user_input, speech_allowed):
+        try:
+            await asyncio.sleep(CALL_SECONDS)
+            await speech_allowed.wait()
+            self.spoken = True
+            return f"reply to {user_input}"
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+@pytest.mark.unit
+class TestTurnScheduler:
+    """
+    A test suite for the concurrent per-turn scheduling of LLM calls in `start_session`.
+    """
+
+    @pytest.mark.asyncio
+    async def test_turn_costs_one_round_trip(self):
+        """
+        Test that the exit check, sentiment refinement and reply run concurrently.
+        """
+        reply = FakeReply()
+        scheduler = TurnScheduler(
+            slow_check_exit,
+            local_sentiment,
+            reply,
+            refine_sentiment=slow_refine_sentiment,
+        )
+
+        started = time.perf_counter()
+        turn = await scheduler.run("i feel sad")
+        elapsed = time.perf_counter() - started
+
+        assert not turn.exit_requested
+        assert turn.sentiment == "NEGATIVE"
+        assert turn.reply == "reply to i feel sad"
+        assert reply.spoken
+        assert elapsed < 2 * CALL_SECONDS
+
+    @pytest.mark.asyncio
+    async def test_exit_cancels_in_flight_reply(self):
+        """
+        Test that a positive exit check cancels the speculative reply before it is spoken.
+        """
+        reply = FakeReply()
+        scheduler = TurnScheduler(slow_check_exit, local_sentiment, reply)
+
+        turn = await scheduler.run("goodbye")
+
+        assert turn.exit_requested
+        assert turn.reply is None
+        assert reply.cancelled
+        assert not reply.spoken
+
+    @pytest.mark.asyncio
+    async def test_sentiment_is_detected_before_the_reply_starts(self):
+        """
+        Test that the reply starts once the sentiment is detected, and a failed
+        refinement keeps the detected sentiment.
+        """
+        events = []
+
+        def detect_sentiment(user_input):
+            events.append("sentiment")
+            return "POSITIVE"
+
+        def failing_refinement(user_input, detected):
+            raise RuntimeError("classifier unavailable")
+
+        async def reply(user_input, speech_allowed):
+            events.append("reply")
+            return "reply"
+
+        scheduler = TurnScheduler(
+            slow_check_exit, detect_sentiment, reply, failing_refinement
+        )
+        turn = await scheduler.run("i love it")
+
+        assert events == ["sentiment", "reply"]
+        assert turn.sentiment == "POSITIVE"
+
+    @pytest.mark.asyncio
+    async def test_sentiment_failure_does_not_fail_turn(self):
+        """
+        Test that a failed sentiment classification still returns the reply.
+        """
+
+        def failing_sentiment(user_input):
+            raise RuntimeError("classifier unavailable")
+
+        scheduler = TurnScheduler(slow_check_exit, failing_sentiment, FakeReply())
+        turn = await scheduler.run("tell me a joke")
+
+        assert turn.sentiment is None
+        assert turn.reply == "reply to tell me a joke"
+
+    @pytest.mark.asyncio
+    async def test_exit_check_failure_cancels_reply(self):
+        """
+        Test that an exit check error is raised and the reply does not keep running.
+        """
+
+        def failing_check_exit(user_input):
+            time.sleep(CALL_SECONDS / 2)
+            raise RuntimeError("llm unavailable")
+
+        reply = FakeReply()
+        scheduler = TurnScheduler(failing_check_exit, local_sentiment, reply)
+        with pytest.raises(RuntimeError):
+            await scheduler.run("hello")
+        assert reply.cancelled
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from cozmo_companion.vad import VoiceActivityDetector, buffer_energies, chunk_energy
+
+CHUNK_SIZE = 1024
+
+
+def tone(amplitude, chunk_size=CHUNK_SIZE):
+    """Return one chunk of a sine wave with the given peak amplitude as PCM bytes."""
+    samples = amplitude * np.sin(np.linspace(0, 20 * np.pi, chunk_size))
+    return samples.astype(np.int16).tobytes()
+
+
+@pytest.mark.unit
+class TestVoiceActivityDetector:
+    """
+    A test suite for the NumPy-backed voice activity detector used by `Recorder`.
+    """
+
+    def test_energy_includes_negative_excursions(self):
+        """
+        Test that the peak covers negative samples, which the old positive-only check ignored.
+        """
+        chunk = np.array([0, -32768, 100, 0], dtype=np.int16).tobytes()
+        rms, peak = chunk_energy(chunk)
+        assert peak == 32768
+        assert rms > 0
+
+    def test_buffer_energies_match_per_chunk_energy(self):
+        """
+        Test that the vectorized buffer computation agrees with the per-chunk one.
+        """
+        buffer = tone(1000) + tone(5000) + tone(0)
+        rms, peak = buffer_energies(buffer, CHUNK_SIZE)
+        for index, chunk in enumerate([tone(1000), tone(5000), tone(0)]):
+            expected_rms, expected_peak = chunk_energy(chunk)
+            assert rms[index] == pytest.approx(expected_rms, rel=1e-4)
+            assert peak[index] == expected_peak
+
+    def test_hangover(self):
+        """
+        Test that trailing silence is kept briefly after speech.
+        """
+        vad = VoiceActivityDetector(hangover_chunks=1)
+        quiet, loud = tone(50), tone(8000)
+
+        assert not vad.is_speech(quiet)
+        assert vad.is_speech(loud)
+        assert vad.is_speech(quiet) and vad.in_speech
+        assert not vad.is_speech(quiet) and not vad.in_speech
+
+    def test_threshold_adapts_to_background_noise(self):
+        """
+        Test that a noisy room raises the threshold so steady noise is not treated as speech.
+        """
+        vad = VoiceActivityDetector(min_threshold=200, hangover_chunks=0)
+        noise = tone(700)
+        assert vad.is_speech(noise)
+        for _ in range(1000):
+            vad.is_speech(tone(400))
+        assert vad.threshold > 600
+        assert not vad.is_speech(noise)
+        assert vad.is_speech(tone(8000))